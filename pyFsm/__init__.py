@@ -3,5 +3,15 @@ from . import pyStateGram # noqa
 from . import fsmGlobals # noqa
 from . import fsmLib # noqa
 from . import heuristics # noqa
+from . import graphAnalysis # noqa
 from . import eventHandler # noqa
-from . import mermaidHandler # noqa
\ No newline at end of file
+from . import mermaidHandler # noqa
+from . import routeStores # noqa
+from . import dispatchPlan # noqa
+from . import destQueues # noqa
+from . import machineDefinition # noqa
+from . import fsmBatch # noqa
+from . import scheduler # noqa
+from . import profiling # noqa
+from . import tracing # noqa
+from . import concurrentFsm # noqa
@@ -0,0 +1,224 @@
+from . import fsmGlobals as globals
+from .fsmLib import FSM, FSMStates
+
+import asyncio
+import inspect
+
+class AsyncFSM(FSM):
+    """
+    A FSM driven by an asyncio event loop.\n
+    States, transitions and event handlers may be `async def` functions, they are awaited when called.
+    Off-thread transitions are awaited through `loop.run_in_executor` on the executor set with `setTransitionExecutor`.
+    A state waiting for a callback suspends the `arun` coroutine on a future which `nextState` resolves,
+    so waiting machines neither block the thread nor grow the stack, and any number of machines
+    can be multiplexed on one event loop by running their `arun` coroutines as tasks.
+    """
+
+    def __init__(self, initialState, routeStore = None, destQueue = None):
+        """
+        Constructs an asyncio driven FSM instance with empty states and transitions.
+
+        Args:
+           initialState (:class:`str` or `func`): The initial state must either be the state string name or the state function.
+           routeStore (:class:`EagerRouteStore`, `LazyRouteStore` or `CompactRouteStore`, default = None): The store computing and keeping the state to state routes.
+           destQueue (:class:`DestQueue` or `ThreadSafeDestQueue`, default = None): The queue backend of the piped destination states.
+
+        Attributes:
+            ~ pyFsm.asyncFsm.AsyncFSM._loop: The event loop running `arun`, None when it is not running.
+            ~ pyFsm.asyncFsm.AsyncFSM._resumeFuture: The future a waiting state is suspended on, None when not waiting.
+            ~ pyFsm.asyncFsm.AsyncFSM._resumeRequested: Whether `nextState` was called while the current state was running.
+        """
+
+        super().__init__(initialState, routeStore, destQueue)
+
+        self._loop = None
+        """The event loop running `arun`, None when it is not running."""
+        self._resumeFuture = None
+        """The future a waiting state is suspended on, None when not waiting."""
+        self._resumeRequested = False
+        """Whether `nextState` was called while the current state was running."""
+        pass
+
+    async def arun(self, maxSteps:int = None) -> int:
+        """
+        Consumes the queued destinations, awaiting asynchronous states, transitions and event handlers
+        and the callbacks of waiting states.
+
+        Args:
+            maxSteps (:class:`int`, default = None): The maximum number of queued destinations to consume, None to drain the queue.
+
+        Returns:
+            The number of queued destinations consumed.
+        """
+
+        self._loop = asyncio.get_running_loop()
+        destQueue = self._destQueue
+        steps = 0
+
+        try:
+            #Finish the route interrupted by a waiting state of a synchronous run
+            if self._cachedDestState is not None:
+                destStateName, args, kwargs = self._cachedDestState
+                await self._atraverseToState(destStateName, *args, **kwargs)
+
+            while destQueue.qsize() and (maxSteps is None or steps < maxSteps):
+                cState, args, kwargs = destQueue.get()
+                await self._atraverseToState(cState, *args, **kwargs)
+                steps += 1
+        finally:
+            self._loop = None
+
+        return steps
+
+    def nextState(self):
+        """
+        Resumes the state waiting for its callback.\n
+        It can be called from the state itself, from another coroutine or from another thread.
+        While `arun` is running the resume future and the resume request are only touched on the event loop thread:
+        calls from other threads are scheduled on the loop with `call_soon_threadsafe`, so no wakeup is lost.
+        """
+
+        loop = self._loop
+        if loop is None or _runningLoop() is loop:
+            self._resume()
+        else:
+            loop.call_soon_threadsafe(self._resume)
+        pass
+
+    def _resume(self):
+        """
+        Resolves the future the waiting state is suspended on, or records the resume request if no state is waiting yet.
+        It runs on the event loop thread while `arun` is running.
+        """
+
+        future = self._resumeFuture
+        if future is None:
+            self._resumeRequested = True
+        elif not future.done():
+            future.set_result(None)
+        pass
+
+    async def _atraverseToState(self, destStateName:str, *args, **kwargs):
+        """
+        Traverses to the passed destination state from the current state the FSM is at, awaiting the awaitable results.
+
+        Args:
+            destStateName (:class:`str`): The state to traverse to.
+            args: The arguments to pass to the destination method.
+            kwargs: The arguments to pass to the destination method.
+        """
+
+        plan = self._plan if self._plan is not None else self.compile()
+        stateReachedHandlers = self._stateReachedHandlers
+
+        self._cachedDestState = (destStateName, args, kwargs)
+        destRecord = plan.states[plan.stateIds[destStateName]]
+        hops = plan.iterHops(plan.stateIds[self.currentGraphState], plan.stateIds[destStateName])
+
+        for stateRecord, transRecord in hops:
+            fromState = self.currentGraphState
+
+            #Transition handling
+            if transRecord is not None:
+                self._fsmInternalState = FSMStates.IN_TRANSITION
+                if transRecord[4] and self._executor is not None:
+                    await self._loop.run_in_executor(self._executor, transRecord[1])
+                else:
+                    await _awaitIfNeeded(transRecord[1]())
+                if stateReachedHandlers:
+                    await self._araiseEvent(stateReachedHandlers, fromState, stateRecord, transRecord, stateRecord is destRecord)
+
+            self._fsmInternalState = FSMStates.IN_RUNNING_STATE
+
+            #State handling
+            stateName, state, wfc, argsKind, stateId = stateRecord
+            self.currentGraphState = stateName
+            self._resumeRequested = False
+
+            if stateRecord is destRecord:
+                if self._destReachedHandlers:
+                    await self._araiseEvent(self._destReachedHandlers, fromState, stateRecord, transRecord, True)
+                self._cachedDestState = None
+                await _awaitIfNeeded(globals._callWithArguments(state, argsKind, args, kwargs))
+            else:
+                if stateReachedHandlers:
+                    await self._araiseEvent(stateReachedHandlers, fromState, stateRecord, transRecord, False)
+                await _awaitIfNeeded(state())
+
+            self._determineInternalFsmState()
+
+            #Suspend on the state until its callback resumes the FSM
+            if wfc:
+                await self._waitForCallback()
+        pass
+
+    async def _araiseEvent(self, handlers:tuple, fromState:str, stateRecord:tuple, transRecord:tuple, isDestination:bool):
+        """
+        Fills the reused event record with the passed hop and calls the passed event handlers, awaiting the coroutine handlers.
+        """
+
+        event = self._event
+        event.fromState = fromState
+        event.toState = stateRecord[0]
+        event.transition = transRecord[0] if transRecord is not None else None
+        event.isDestination = isDestination
+
+        for handler, takesEvent in handlers:
+            await _awaitIfNeeded(handler(event) if takesEvent else handler())
+        pass
+
+    async def _waitForCallback(self):
+        """
+        Suspends the traversal until `nextState` is called, unless the state already called it.
+        """
+
+        if self._resumeRequested:
+            self._resumeRequested = False
+            return
+
+        resting = self._fsmInternalState
+        self._fsmInternalState = FSMStates.WAITING_FOR_CB
+        self._resumeFuture = self._loop.create_future()
+
+        try:
+            await self._resumeFuture
+        finally:
+            self._resumeFuture = None
+            self._fsmInternalState = resting
+        pass
+
+def _runningLoop():
+    """
+    Returns the event loop running in the current thread, None if there is none.
+    """
+
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+async def _awaitIfNeeded(result):
+    """
+    Awaits the passed function result if it is awaitable.
+    """
+
+    if inspect.isawaitable(result):
+        await result
+    pass
+
+async def deliverEvents(buffer, interval:float = 0.01):
+    """
+    Delivers the events of the passed `EventBuffer` in batches from an asyncio task until it is cancelled.\n
+    Use it instead of `EventBuffer.start` to run the handlers on the event loop, e.g.
+    `asyncio.ensure_future(deliverEvents(myFsm.bufferEvents()))`.
+
+    Args:
+        buffer (:class:`EventBuffer`): The buffer to deliver.
+        interval (:class:`float`, default = 0.01): The seconds the task sleeps while the buffer is empty.
+    """
+
+    while True:
+        if not buffer.drain(buffer.batchSize):
+            await asyncio.sleep(interval)
+        else:
+            await asyncio.sleep(0)
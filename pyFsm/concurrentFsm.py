@@ -0,0 +1,206 @@
+from .fsmLib import FSM, FSMStates
+from . import destQueues as queues
+
+import threading
+
+class ConcurrentFSM(FSM):
+    """
+    A FSM whose `nextState` callbacks and piped destinations may come from any thread.\n
+    The FSM is owned by one thread, the one which created it or last called `serve`, or by its `Scheduler` if it is scheduled.
+    Only the owner runs it: a `nextState` or a piped destination from another thread is posted to the mailbox of the FSM
+    and handed over to the owner, which picks it up in `serve`, instead of running the states inline on the calling thread.
+    `run` holds a per-instance lock, so the states, the current state and the internal state are only ever mutated
+    by one thread at a time and a concurrent `run` returns at once instead of stepping the FSM twice.
+    """
+
+    def __init__(self, initialState, routeStore = None, destQueue = None):
+        """
+        Constructs a concurrency-safe FSM instance with empty states and transitions, owned by the calling thread.
+
+        Args:
+           initialState (:class:`str` or `func`): The initial state must either be the state string name or the state function.
+           routeStore (:class:`EagerRouteStore`, `LazyRouteStore` or `CompactRouteStore`, default = None): The store computing and keeping the state to state routes.
+           destQueue (:class:`ThreadSafeDestQueue`, default = None): The queue backend of the piped destination states, a `ThreadSafeDestQueue` by default.
+
+        Attributes:
+            ~ pyFsm.concurrentFsm.ConcurrentFSM.handoffs: The number of `nextState` calls handed over to the owner by other threads.
+            ~ pyFsm.concurrentFsm.ConcurrentFSM._owner: The ident of the thread owning the FSM.
+            ~ pyFsm.concurrentFsm.ConcurrentFSM._runLock: The lock held by the thread running the FSM.
+            ~ pyFsm.concurrentFsm.ConcurrentFSM._mailbox: The condition the owner waits on in `serve`, guarding the posted callbacks.
+            ~ pyFsm.concurrentFsm.ConcurrentFSM._stopRequested: Whether `stop` was called and not yet seen by `serve`.
+            ~ pyFsm.concurrentFsm.ConcurrentFSM._watchedTransition: The off-thread transition future the owner is already woken by.
+        """
+
+        super().__init__(initialState, routeStore, destQueue if destQueue is not None else queues.ThreadSafeDestQueue())
+
+        self.handoffs = 0
+        """The number of `nextState` calls handed over to the owner by other threads."""
+        self._owner = threading.get_ident()
+        """The ident of the thread owning the FSM."""
+        self._runLock = threading.Lock()
+        """The lock held by the thread running the FSM."""
+        self._mailbox = threading.Condition(threading.Lock())
+        """The condition the owner waits on in `serve`, guarding the posted callbacks."""
+        self._stopRequested = False
+        """Whether `stop` was called and not yet seen by `serve`."""
+        self._watchedTransition = None
+        """The off-thread transition future the owner is already woken by."""
+        pass
+
+    def isOwner(self) -> bool:
+        """
+        Returns whether the calling thread owns the FSM.
+        """
+        return threading.get_ident() == self._owner
+
+    def run(self, maxSteps:int = None) -> int:
+        """
+        Runs the FSM like `FSM.run` while holding its run lock.\n
+        If another thread is running the FSM, or it is called from inside a running state, it returns at once.
+
+        Args:
+            maxSteps (:class:`int`, default = None): The maximum number of queued destinations to consume, None to drain the queue.
+
+        Returns:
+            The number of queued destinations consumed.
+        """
+
+        if not self._runLock.acquire(False):
+            return 0
+
+        try:
+            steps = super().run(maxSteps)
+        finally:
+            self._runLock.release()
+
+        #The owner is woken once the off-thread transition completes, the callback is added once per future
+        pendingTransition = self._pendingTransition
+        if pendingTransition is not None and pendingTransition is not self._watchedTransition:
+            self._watchedTransition = pendingTransition
+            pendingTransition.add_done_callback(lambda future: self._notify())
+        return steps
+
+    def nextState(self):
+        """
+        Continues the state waiting for its callback.\n
+        Called by the owner it behaves like `FSM.nextState`. Called by any other thread it only posts the callback
+        to the mailbox and wakes the owner or the scheduler, the states are never run on the calling thread.
+        """
+
+        if self._scheduler is None and threading.get_ident() == self._owner:
+            return super().nextState()
+
+        with self._mailbox:
+            #The same rule as `FSM.nextState`, applied under the mailbox lock the owner checks its work under
+            super()._requestResume()
+            self.handoffs += 1
+            self._mailbox.notify_all()
+
+        if self._scheduler is not None:
+            self._scheduler.wake(self)
+        pass
+
+    def serve(self, timeout:float = None) -> int:
+        """
+        Makes the calling thread the owner of the FSM, waits until it has work and runs it.\n
+        The FSM has work when its waiting state was called back, when a destination is queued
+        or when an off-thread transition completed.
+
+        Args:
+            timeout (:class:`float`, default = None): The maximum number of seconds to wait for work, None to wait until there is work or `stop` is called.
+
+        Returns:
+            The number of queued destinations consumed, 0 if it timed out or was stopped.
+        """
+
+        self._owner = threading.get_ident()
+        if not self._waitForWork(timeout):
+            return 0
+        return self.run()
+
+    def serveForever(self):
+        """
+        Makes the calling thread the owner of the FSM and serves it until `stop` is called.
+        """
+
+        self._owner = threading.get_ident()
+        while self._waitForWork(None):
+            self.run()
+        pass
+
+    def stop(self):
+        """
+        Makes the `serve` call of the owner return, it may be called from any thread.
+        """
+
+        with self._mailbox:
+            self._stopRequested = True
+            self._mailbox.notify_all()
+        pass
+
+    def _requestResume(self):
+        """
+        Records a `nextState` call of the owner under the mailbox lock.
+        """
+
+        with self._mailbox:
+            super()._requestResume()
+        pass
+
+    def _resetResume(self):
+        """
+        Forgets the earlier `nextState` calls under the mailbox lock.
+        """
+
+        with self._mailbox:
+            self._resumeRequested = False
+        pass
+
+    def _takeResume(self) -> bool:
+        """
+        Returns and forgets the `nextState` call for the waiting state under the mailbox lock.
+        """
+
+        with self._mailbox:
+            return super()._takeResume()
+
+    def _addToDestQueue(self, methodName:str, *args, **kwargs):
+        """
+        Adds the passed destination to the destination queue of the FSM and wakes its owner.
+        """
+
+        super()._addToDestQueue(methodName, *args, **kwargs)
+        self._notify()
+        return self
+
+    def _notify(self):
+        """
+        Wakes the owner waiting in `serve`.
+        """
+
+        with self._mailbox:
+            self._mailbox.notify_all()
+        pass
+
+    def _waitForWork(self, timeout:float) -> bool:
+        """
+        Waits until the FSM has work and returns True, or returns False if it timed out or `stop` was called.
+        """
+
+        with self._mailbox:
+            hasWork = self._mailbox.wait_for(lambda: self._stopRequested or self._hasWork(), timeout)
+            if self._stopRequested:
+                self._stopRequested = False
+                return False
+            return hasWork
+
+    def _hasWork(self) -> bool:
+        """
+        Returns whether the FSM can make progress, called under the mailbox lock.
+        """
+
+        if self._pendingTransition is not None:
+            return self._pendingTransition.done()
+        if self._fsmInternalState is FSMStates.WAITING_FOR_CB:
+            return self._resumeRequested
+        return self._cachedDestState is not None or not self._destQueue.empty()
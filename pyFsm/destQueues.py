@@ -0,0 +1,166 @@
+from collections import deque
+from threading import Lock
+
+LATEST_WINS = "latestWins"
+"""Queue policy: a piped destination drops every queued one, only the newest destination is walked to"""
+DEDUPE = "dedupe"
+"""Queue policy: a piped destination identical to the newest queued one, arguments included, is dropped"""
+FUSE = "fuse"
+"""Queue policy: an argument-free destination replaces the argument-free newest queued one when its route passes through it"""
+QUEUE_POLICIES = (LATEST_WINS, DEDUPE, FUSE)
+"""Every available queue policy"""
+
+class DestQueue:
+    """
+    The default destination queue of a FSM, backed by a `collections.deque`.\n
+    It takes no locks, so it must only be used by the thread that owns the FSM.
+    """
+
+    def __init__(self):
+        """
+        Constructs an empty destination queue.
+        """
+
+        self._items = deque()
+        """The queued `(destStateName, args, kwargs)` commands."""
+        pass
+
+    def put(self, item):
+        """
+        Appends the passed command at the end of the queue.
+        """
+
+        self._items.append(item)
+        pass
+
+    def putWith(self, item, combine):
+        """
+        Adds the passed command with the passed `combine(items, item)` function,
+        which may append it to the `deque` of the queued commands or merge it with them.
+        """
+
+        combine(self._items, item)
+        pass
+
+    def get(self):
+        """
+        Removes and returns the command at the front of the queue.
+
+        Raises:
+            (:class:`IndexError`): if the queue is empty.
+        """
+
+        return self._items.popleft()
+
+    def qsize(self) -> int:
+        """
+        Returns the number of queued commands.
+        """
+
+        return len(self._items)
+
+    def empty(self) -> bool:
+        """
+        Returns whether the queue has no commands.
+        """
+
+        return not self._items
+
+    def clear(self):
+        """
+        Drops every queued command.
+        """
+
+        self._items.clear()
+        pass
+
+    def items(self) -> list:
+        """
+        Returns a copy of the queued commands, oldest first, without consuming them.
+        """
+
+        return list(self._items)
+
+    def last(self):
+        """
+        Returns the newest queued command without consuming it, None if the queue is empty.
+        """
+
+        return self._items[-1] if self._items else None
+
+class ThreadSafeDestQueue(DestQueue):
+    """
+    Destination queue guarded by a lock, for FSMs whose commands are produced by other threads.
+    """
+
+    def __init__(self):
+        """
+        Constructs an empty thread-safe destination queue.
+        """
+
+        super().__init__()
+        self._lock = Lock()
+        """The lock guarding the queued commands."""
+        pass
+
+    def put(self, item):
+        """
+        Appends the passed command at the end of the queue.
+        """
+
+        with self._lock:
+            self._items.append(item)
+        pass
+
+    def putWith(self, item, combine):
+        """
+        Adds the passed command with the passed `combine(items, item)` function, called while the queue is locked.
+        """
+
+        with self._lock:
+            combine(self._items, item)
+        pass
+
+    def get(self):
+        """
+        Removes and returns the command at the front of the queue.
+
+        Raises:
+            (:class:`IndexError`): if the queue is empty.
+        """
+
+        with self._lock:
+            return self._items.popleft()
+
+    def qsize(self) -> int:
+        """
+        Returns the number of queued commands.
+        """
+
+        with self._lock:
+            return len(self._items)
+
+    def clear(self):
+        """
+        Drops every queued command.
+        """
+
+        with self._lock:
+            self._items.clear()
+        pass
+
+    def items(self) -> list:
+        """
+        Returns a copy of the queued commands, oldest first, without consuming them.
+        """
+
+        with self._lock:
+            return list(self._items)
+
+    def last(self):
+        """
+        Returns the newest queued command without consuming it, None if the queue is empty.
+        """
+
+        with self._lock:
+            return self._items[-1] if self._items else None
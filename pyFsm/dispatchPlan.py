@@ -0,0 +1,336 @@
+from array import array
+import sys
+
+class DispatchPlan:
+    """
+    The compiled form of a FSM graph used by `FSM.run`.\n
+    States and transitions are interned to integer IDs and stored as flat records,
+    and the routes of a precomputed route store are read through `array` backed predecessor tables,
+    so traversing a route needs no string keyed lookups or reflection per step.
+    The tables hold the routes of the route store itself: the tables of a `CompactRouteStore` are read in place
+    and the tables of the other precomputed stores are filled from their routes, one source state the first time it is routed from.\n
+
+    State records are `(stateName, stateFunc, waitsForCallback, argsKind, stateId)` tuples and
+    transition records are `(transName, transFunc, waitsForCallback, argsKind, offThread)` tuples,
+    where `argsKind` holds the `fsmGlobals.ARGS_*` flags inspected when the function was registered.
+    """
+
+    def __init__(self, stateGraph:dict, states:dict, transitions:dict, routeStore, routeTables:tuple = None):
+        """
+        Compiles the passed FSM graph.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph created by `heuristics.buildStateGraph`.
+            states (:class:`dict`): The `(stateFunc, waitsForCallback, argsKind)` tuples of the FSM accessed by the state names.
+            transitions (:class:`dict`): The `(transFunc, waitsForCallback, argsKind, offThread)` tuples of the FSM accessed by the transition names.
+            routeStore (:class:`EagerRouteStore`, `LazyRouteStore`, `CompactRouteStore`, `WeightedRouteStore` or `AStarRouteStore`): The route store of the FSM.
+            routeTables (:class:`tuple`, default = None): The `(predStates, predTransitions)` tables of a previous compilation of the same graph, see `exportRouteTables`.
+
+        Attributes:
+            ~ pyFsm.dispatchPlan.DispatchPlan.stateIds: The state IDs accessed by the state names.
+            ~ pyFsm.dispatchPlan.DispatchPlan.states: The state records accessed by the state IDs.
+            ~ pyFsm.dispatchPlan.DispatchPlan.transitionIds: The transition IDs accessed by the transition names.
+            ~ pyFsm.dispatchPlan.DispatchPlan.transitions: The transition records accessed by the transition IDs.
+            ~ pyFsm.dispatchPlan.DispatchPlan.predStates: The predecessor state ID tables accessed by `[stateId][destStateId]`: the state the route from the state enters the destination state from, -1 if it is unreachable.
+            The rows are None until they are first used, the tables are None if the routes are not read from filled tables.
+            ~ pyFsm.dispatchPlan.DispatchPlan.predTransitions: The transition ID tables of the last hop accessed by `[stateId][destStateId]`, -1 for instant transitions.
+        """
+
+        self.stateIds = {}
+        """The state IDs accessed by the state names."""
+        self.states = []
+        """The state records accessed by the state IDs."""
+        self.transitionIds = {}
+        """The transition IDs accessed by the transition names."""
+        self.transitions = []
+        """The transition records accessed by the transition IDs."""
+        self.predStates = None
+        """The predecessor state ID tables accessed by `[stateId][destStateId]`, the rows are None until they are first used, None if the routes are not read from filled tables."""
+        self.predTransitions = None
+        """The transition ID tables of the last hop accessed by `[stateId][destStateId]`, -1 for instant transitions."""
+
+        self._routeStore = routeStore
+        """The route store the routes are read from."""
+        self._storeTables = None
+        """The `(predEdges, edgeSources, storeIds, edgeStateIds, edgeTransitionIds)` tables read in place from a `CompactRouteStore`, None for the other stores."""
+        self._nextHops = None
+        """The `(nextStates, nextTransitions)` tables of `nextHopTables`, None until they are requested."""
+
+        for stateName in stateGraph:
+            stateFunc, waitsForCallback, argsKind = states[stateName]
+            self.stateIds[stateName] = len(self.states)
+            self.states.append((stateName, stateFunc, waitsForCallback, argsKind, len(self.states)))
+
+        for transName, (transFunc, waitsForCallback, argsKind, offThread) in transitions.items():
+            self.transitionIds[transName] = len(self.transitions)
+            self.transitions.append((transName, transFunc, waitsForCallback, argsKind, offThread))
+
+        if routeTables is not None:
+            self.predStates, self.predTransitions = routeTables
+        elif routeStore.precomputed and hasattr(routeStore, "getPredecessorTables"):
+            self._bindStoreTables()
+        elif routeStore.precomputed:
+            self.predStates = [None] * len(self.states)
+            self.predTransitions = [None] * len(self.states)
+        pass
+
+    def routeTables(self) -> tuple:
+        """
+        Returns the complete `(predStates, predTransitions)` tables of the routes, filling the rows not used yet,
+        None if the routes are resolved through the route store.
+        """
+
+        if self._storeTables is not None:
+            return self._convertStoreTables()
+        if self.predStates is None:
+            return None
+
+        for stateId, row in enumerate(self.predStates):
+            if row is None:
+                self._compileRow(stateId)
+        return self.predStates, self.predTransitions
+
+    def exportRouteTables(self):
+        """
+        Returns the route tables flattened into a `(predStates, predTransitions, byteorder)` tuple of bytes,
+        None if the routes are resolved through the route store. `importRouteTables` turns them back into tables.
+        """
+
+        tables = self.routeTables()
+        if tables is None:
+            return None
+
+        predStates, predTransitions = tables
+        return (b"".join(row.tobytes() for row in predStates),
+                b"".join(row.tobytes() for row in predTransitions),
+                sys.byteorder)
+
+    @staticmethod
+    def importRouteTables(exported:tuple, stateCount:int) -> tuple:
+        """
+        Returns the `(predStates, predTransitions)` tables of the passed `exportRouteTables` result.
+
+        Args:
+            exported (:class:`tuple`): The exported route tables.
+            stateCount (:class:`int`): The number of states of the graph.
+
+        Raises:
+            (:class:`ValueError`): if the tables do not match the number of states.
+        """
+
+        predStatesBytes, predTransitionsBytes, byteorder = exported
+        tables = []
+
+        for packed in (predStatesBytes, predTransitionsBytes):
+            flat = array('i')
+            flat.frombytes(packed)
+            if byteorder != sys.byteorder:
+                flat.byteswap()
+            if len(flat) != stateCount * stateCount:
+                raise ValueError("The route tables do not match the " + str(stateCount) + " states of the graph.")
+            tables.append([flat[row * stateCount:(row + 1) * stateCount] for row in range(stateCount)])
+
+        return tables[0], tables[1]
+
+    def nextHopTables(self) -> tuple:
+        """
+        Returns the `(nextStates, nextTransitions)` tables accessed by `[stateId][destStateId]`
+        holding the first hop of the route from every state to every other state, -1 if it is unreachable
+        and -1 transitions for instant transitions, None if the routes are resolved through the route store.\n
+        Following the first hops one state at a time walks a route as long, or as cheap, as the one `iterHops` returns,
+        which may be another of the routes of equal length. The tables are computed on the first call.
+        """
+
+        if self._nextHops is not None:
+            return self._nextHops
+
+        tables = self.routeTables()
+        if tables is None:
+            return None
+
+        stateCount = len(self.states)
+        nextStatesTable = []
+        nextTransitionsTable = []
+
+        for src, (predStates, predTransitions) in enumerate(zip(*tables)):
+            nextStates = array('i', [-1]) * stateCount
+            nextTransitions = array('i', [-1]) * stateCount
+
+            for dest in range(stateCount):
+                if dest == src or predStates[dest] < 0 or nextStates[dest] >= 0:
+                    continue
+
+                #Walks back to the first hop, or to a state whose first hop is known, and shares it along the way
+                chain = []
+                stateId = dest
+                while nextStates[stateId] < 0 and predStates[stateId] != src:
+                    chain.append(stateId)
+                    stateId = predStates[stateId]
+                if nextStates[stateId] < 0:
+                    nextStates[stateId] = stateId
+                    nextTransitions[stateId] = predTransitions[stateId]
+                for chainId in chain:
+                    nextStates[chainId] = nextStates[stateId]
+                    nextTransitions[chainId] = nextTransitions[stateId]
+
+            nextStatesTable.append(nextStates)
+            nextTransitionsTable.append(nextTransitions)
+
+        self._nextHops = (nextStatesTable, nextTransitionsTable)
+        return self._nextHops
+
+    def iterHops(self, stateId:int, destStateId:int):
+        """
+        Returns an iterator over the `(stateRecord, transRecord)` hops of the route the route store holds
+        from the passed state to the destination state.\n
+        The transition record is None for instant transitions.
+
+        Raises:
+            (:class:`KeyError`): if the destination state is unreachable.
+        """
+
+        if self._storeTables is not None:
+            return self._iterStoreTableHops(stateId, destStateId)
+
+        if self.predStates is None:
+            return self._iterStoreHops(stateId, destStateId)
+
+        predStates = self.predStates[stateId]
+        if predStates is None:
+            predStates = self._compileRow(stateId)
+
+        if stateId != destStateId and predStates[destStateId] < 0:
+            raise KeyError(self.states[destStateId][0])
+
+        return self._iterTableHops(stateId, destStateId)
+
+    def _iterTableHops(self, stateId:int, destStateId:int):
+        """
+        Returns an iterator over the hops rebuilt by walking the predecessor tables of the state backwards.
+        """
+
+        states = self.states
+        transitions = self.transitions
+        predStates = self.predStates[stateId]
+        predTransitions = self.predTransitions[stateId]
+        hops = []
+
+        while destStateId != stateId:
+            transId = predTransitions[destStateId]
+            hops.append((states[destStateId], transitions[transId] if transId >= 0 else None))
+            destStateId = predStates[destStateId]
+
+        return reversed(hops)
+
+    def _iterStoreTableHops(self, stateId:int, destStateId:int):
+        """
+        Returns an iterator over the hops rebuilt by walking the predecessor edge table of a `CompactRouteStore` backwards.
+
+        Raises:
+            (:class:`KeyError`): if the destination state is unreachable.
+        """
+
+        predEdges, edgeSources, storeIds, edgeStateIds, edgeTransitionIds = self._storeTables
+        src = storeIds[stateId]
+        dest = storeIds[destStateId]
+        row = predEdges[src]
+
+        if src != dest and row[dest] < 0:
+            raise KeyError(self.states[destStateId][0])
+
+        states = self.states
+        transitions = self.transitions
+        hops = []
+
+        while dest != src:
+            edge = row[dest]
+            transId = edgeTransitionIds[edge]
+            hops.append((states[edgeStateIds[edge]], transitions[transId] if transId >= 0 else None))
+            dest = edgeSources[edge]
+
+        return reversed(hops)
+
+    def _iterStoreHops(self, stateId:int, destStateId:int):
+        """
+        Yields the hops of the route the route store returns for the passed state IDs.
+        """
+
+        route = self._routeStore.getRoute(self.states[stateId][0], self.states[destStateId][0])
+        for stateName, transName in route:
+            yield self.states[self.stateIds[stateName]], (self.transitions[self.transitionIds[transName]] if transName is not None else None)
+
+    def _compileRow(self, stateId:int) -> array:
+        """
+        Fills the predecessor table rows of the passed state from the routes the route store holds for it
+        and returns its predecessor state row.
+        """
+
+        stateCount = len(self.states)
+        stateIds = self.stateIds
+        transitionIds = self.transitionIds
+        stateName = self.states[stateId][0]
+        predStates = array('i', [-1]) * stateCount
+        predTransitions = array('i', [-1]) * stateCount
+
+        for destStateName, route in self._routeStore.getRoutes(stateName).items():
+            if route:
+                destStateId = stateIds[destStateName]
+                predStates[destStateId] = stateIds[route[-2][0]] if len(route) > 1 else stateId
+                trans = route[-1][1]
+                predTransitions[destStateId] = transitionIds[trans] if trans is not None else -1
+
+        self.predTransitions[stateId] = predTransitions
+        self.predStates[stateId] = predStates
+        return predStates
+
+    def _bindStoreTables(self):
+        """
+        Maps the predecessor edge tables of a `CompactRouteStore` to the state and transition IDs of the plan without copying them.
+        """
+
+        predEdges, edgeSources, edgeTargets, edgeTrans, stateNames, transNames = self._routeStore.getPredecessorTables()
+        stateIds = self.stateIds
+        transitionIds = self.transitionIds
+
+        storeIds = array('i', [-1]) * len(self.states)
+        for storeId, stateName in enumerate(stateNames):
+            storeIds[stateIds[stateName]] = storeId
+
+        planStateIds = [stateIds[stateName] for stateName in stateNames]
+        planTransitionIds = [transitionIds[transName] if transName is not None else -1 for transName in transNames]
+        edgeStateIds = array('i', [planStateIds[target] for target in edgeTargets])
+        edgeTransitionIds = array('i', [planTransitionIds[trans] for trans in edgeTrans])
+
+        self._storeTables = (predEdges, edgeSources, storeIds, edgeStateIds, edgeTransitionIds)
+        pass
+
+    def _convertStoreTables(self) -> tuple:
+        """
+        Returns the `(predStates, predTransitions)` tables of the routes of the bound `CompactRouteStore`.
+        """
+
+        predEdges, edgeSources, storeIds, edgeStateIds, edgeTransitionIds = self._storeTables
+        stateCount = len(self.states)
+        storeToPlan = array('i', [-1]) * stateCount
+        for stateId, storeId in enumerate(storeIds):
+            storeToPlan[storeId] = stateId
+
+        predStatesTable = []
+        predTransitionsTable = []
+
+        for stateId in range(stateCount):
+            row = predEdges[storeIds[stateId]]
+            predStates = array('i', [-1]) * stateCount
+            predTransitions = array('i', [-1]) * stateCount
+
+            for dest in range(stateCount):
+                edge = int(row[dest])
+                if edge >= 0:
+                    destStateId = storeToPlan[dest]
+                    predStates[destStateId] = storeToPlan[edgeSources[edge]]
+                    predTransitions[destStateId] = edgeTransitionIds[edge]
+
+            predStatesTable.append(predStates)
+            predTransitionsTable.append(predTransitions)
+
+        return predStatesTable, predTransitionsTable
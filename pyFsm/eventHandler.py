@@ -1,18 +1,80 @@
+from collections import deque
+import inspect
+import threading
+import time
+
+class FsmEvent:
+    """
+    The event record passed to the FSM event handlers with a required positional parameter.\n
+    Every FSM reuses a single record which is filled in before its handlers are called,
+    so handlers must copy the fields they need to keep after they return.
+    """
+
+    __slots__ = ("uid", "fromState", "toState", "transition", "isDestination")
+
+    def __init__(self, uid:int):
+        """
+        Constructs an empty event record of the passed FSM.
+
+        Args:
+            uid (:class:`int`): The ID of the FSM raising the event.
+
+        Attributes:
+            ~ pyFsm.eventHandler.FsmEvent.uid: The ID of the FSM raising the event.
+            ~ pyFsm.eventHandler.FsmEvent.fromState: The state name the FSM left.
+            ~ pyFsm.eventHandler.FsmEvent.toState: The state name the FSM reached.
+            ~ pyFsm.eventHandler.FsmEvent.transition: The transition name between the states, None for instant transitions.
+            ~ pyFsm.eventHandler.FsmEvent.isDestination: Whether the reached state is the destination of the route.
+        """
+
+        self.uid = uid
+        self.fromState = None
+        self.toState = None
+        self.transition = None
+        self.isDestination = False
+        pass
+
+    def __repr__(self) -> str:
+        return "FsmEvent(uid={}, fromState={!r}, toState={!r}, transition={!r}, isDestination={})".format(
+            self.uid, self.fromState, self.toState, self.transition, self.isDestination)
+
+DROP_OLDEST = "dropOldest"
+"""A full event buffer evicts its oldest event for the new one"""
+BLOCK = "block"
+"""A full event buffer blocks the raising FSM until the delivery frees a slot"""
+SAMPLE = "sample"
+"""A full event buffer keeps only every `sampleRate`-th new event, evicting its oldest event for it"""
+
 class EventDispatcher:
     """
-    Simple implementation of an event dispatcher to handle FSM events.
+    Simple implementation of an event dispatcher to handle FSM events.\n
+    The handlers of every event are kept in a frozen tuple of `(handler, takesEvent)` pairs which is only rebuilt
+    when a handler is subscribed or unsubscribed, so raising an event allocates nothing and an event
+    with no handlers costs a single truth test.\n
+
+    With `enableBuffering` the raised handler tuples are replaced by a single `EventBuffer` append,
+    and the subscribed handlers are called when the buffer delivers the events.
     """
-    
+
     def __init__(self, *eventNames:str):
         """
         Constructs an event dispatcher instance with no events.
 
         Args:
             eventNames (:class:`str`): The events to create
+
+        Attributes:
+            ~ pyFsm.eventHandler.EventDispatcher.handlers: The frozen `(handler, takesEvent)` tuples called when an event is raised, accessed by the event names.
+            ~ pyFsm.eventHandler.EventDispatcher.subscribers: The frozen `(handler, takesEvent)` tuples of the subscribed handlers, accessed by the event names.
+            ~ pyFsm.eventHandler.EventDispatcher.buffer: The `EventBuffer` delivering the events, None for synchronous delivery.
         """
-        
+
         self.handlers = self._createEvents(*eventNames)
-        """The event handlers"""
+        """The frozen `(handler, takesEvent)` tuples called when an event is raised, accessed by the event names"""
+        self.subscribers = self._createEvents(*eventNames)
+        """The frozen `(handler, takesEvent)` tuples of the subscribed handlers, accessed by the event names"""
+        self.buffer = None
+        """The `EventBuffer` delivering the events, None for synchronous delivery"""
 
     def _createEvents(self, *eventNames:str) -> dict:
         """
@@ -24,33 +86,369 @@ class EventDispatcher:
 
         temp = {}
         for event in eventNames:
-            temp[event] = []
+            temp[event] = ()
 
         return temp
 
     def subscribeToEvent(self, eventName:str, *method):
         """
-        Adds the passed handler methods to the passed event.
+        Adds the passed handler methods to the passed event.\n
+        Handlers with a required positional parameter receive the event record, the others are called without arguments.
 
         Args:
             eventName (:class:`str`): The event name
             method (:class:`func`): The method to add to this event
         """
 
+        self.subscribers[eventName] = self.subscribers[eventName] + tuple((func, _takesEvent(func)) for func in method)
+        self._publishHandlers(eventName)
+        pass
+
+    def unsubscribeFromEvent(self, eventName:str, *method):
+        """
+        Removes the passed handler methods from the passed event.
+
+        Args:
+            eventName (:class:`str`): The event name
+            method (:class:`func`): The method to remove from this event
+
+        Raises:
+            (:class:`ValueError`): if a method is not subscribed to the event.
+        """
+
+        handlers = list(self.subscribers[eventName])
         for func in method:
-            self.handlers[eventName].append(func)
+            for index, (handler, takesEvent) in enumerate(handlers):
+                if handler == func:
+                    del handlers[index]
+                    break
+            else:
+                raise ValueError("{} is not subscribed to {}".format(func, eventName))
+
+        self.subscribers[eventName] = tuple(handlers)
+        self._publishHandlers(eventName)
+        pass
+
+    def getHandlers(self, eventName:str) -> tuple:
+        """
+        Returns the frozen `(handler, takesEvent)` tuple called when the passed event is raised.\n
+        The tuple is replaced on every subscribe, unsubscribe and buffering change, so callers caching it must fetch it again after those.
+
+        Args:
+            eventName (:class:`str`): The event name
+        """
+
+        return self.handlers[eventName]
+
+    def enableBuffering(self, capacity:int = 4096, overflow:str = DROP_OLDEST, batchSize:int = 256, sampleRate:int = 8):
+        """
+        Switches the dispatcher to buffered delivery. Raising an event only appends a copy of its record to an `EventBuffer`,
+        which calls the subscribed handlers when it is drained, by `EventBuffer.drain`, its background thread or an asyncio task.
+
+        Args:
+            capacity (:class:`int`, default = 4096): The maximum number of buffered events.
+            overflow (:class:`str`, default = DROP_OLDEST): The policy of a full buffer, `DROP_OLDEST`, `BLOCK` or `SAMPLE`.
+            batchSize (:class:`int`, default = 256): The maximum number of events delivered per batch.
+            sampleRate (:class:`int`, default = 8): The `SAMPLE` policy keeps one in this many events while the buffer is full.
+
+        Returns:
+            The `EventBuffer` of the dispatcher.
+        """
+
+        if self.buffer is None:
+            self.buffer = EventBuffer(self, capacity, overflow, batchSize, sampleRate)
+            for eventName in self.subscribers:
+                self._publishHandlers(eventName)
+        return self.buffer
+
+    def disableBuffering(self):
+        """
+        Stops the event buffer, delivering the events still in it, and switches the dispatcher back to synchronous delivery.
+        """
+
+        if self.buffer is None:
+            return
+
+        buffer = self.buffer
+        self.buffer = None
+        for eventName in self.subscribers:
+            self._publishHandlers(eventName)
+        buffer.stop()
         pass
 
-    def raiseEvent(self, eventName:str):
+    def raiseEvent(self, eventName:str, event:FsmEvent = None):
         """
         Raises the requested event.
 
         Args:
             eventName (:class:`str`): The event name.
+            event (:class:`FsmEvent`, default = None): The event record passed to the handlers with a required positional parameter, required for buffered delivery.
         """
 
-        if eventName in self.handlers:
-            for handler in self.handlers[eventName]:
+        for handler, takesEvent in self.handlers.get(eventName, ()):
+            if takesEvent:
+                handler(event)
+            else:
                 handler()
-        
-        pass
\ No newline at end of file
+        pass
+
+    def _publishHandlers(self, eventName:str):
+        """
+        Rebuilds the raised handler tuple of the passed event from its subscribers and the delivery mode.
+        """
+
+        subscribers = self.subscribers[eventName]
+        if self.buffer is not None and subscribers:
+            self.handlers[eventName] = ((self.buffer.pusher(eventName), True),)
+        else:
+            self.handlers[eventName] = subscribers
+        pass
+
+class EventBuffer:
+    """
+    A bounded buffer of raised events delivered to the subscribers of an `EventDispatcher` in batches.\n
+    The raising FSM only pays for copying the event record into the buffer, the handlers run when the buffer is drained,
+    either explicitly with `drain`, by the background thread of `start` or by the `asyncFsm.deliverEvents` coroutine.
+    Events are delivered in the order they were raised.
+    """
+
+    def __init__(self, dispatcher:EventDispatcher, capacity:int, overflow:str, batchSize:int, sampleRate:int):
+        """
+        Constructs an empty event buffer. Use `EventDispatcher.enableBuffering` to create one.
+
+        Args:
+            dispatcher (:class:`EventDispatcher`): The dispatcher whose subscribers receive the events.
+            capacity (:class:`int`): The maximum number of buffered events.
+            overflow (:class:`str`): The policy of a full buffer, `DROP_OLDEST`, `BLOCK` or `SAMPLE`.
+            batchSize (:class:`int`): The maximum number of events delivered per batch.
+            sampleRate (:class:`int`): The `SAMPLE` policy keeps one in this many events while the buffer is full.
+
+        Attributes:
+            ~ pyFsm.eventHandler.EventBuffer.capacity: The maximum number of buffered events.
+            ~ pyFsm.eventHandler.EventBuffer.overflow: The policy of a full buffer.
+            ~ pyFsm.eventHandler.EventBuffer.batchSize: The maximum number of events delivered per batch.
+            ~ pyFsm.eventHandler.EventBuffer.delivered: The number of events delivered to the handlers.
+            ~ pyFsm.eventHandler.EventBuffer.dropped: The number of events dropped or evicted by the overflow policy.
+
+        Raises:
+            (:class:`ValueError`): if the overflow policy is unknown.
+        """
+
+        if overflow not in (DROP_OLDEST, BLOCK, SAMPLE):
+            raise ValueError("Unknown overflow policy: {}".format(overflow))
+
+        self.capacity = capacity
+        """The maximum number of buffered events."""
+        self.overflow = overflow
+        """The policy of a full buffer."""
+        self.batchSize = batchSize
+        """The maximum number of events delivered per batch."""
+        self.delivered = 0
+        """The number of events delivered to the handlers."""
+        self.dropped = 0
+        """The number of events dropped or evicted by the overflow policy."""
+
+        self._dispatcher = dispatcher
+        """The dispatcher whose subscribers receive the events."""
+        self._sampleRate = sampleRate
+        """The `SAMPLE` policy keeps one in this many events while the buffer is full."""
+        self._sampleCounter = 0
+        """The events seen while the buffer was full, for the `SAMPLE` policy."""
+        self._events = deque(maxlen = capacity) if overflow == DROP_OLDEST else deque()
+        """The buffered `(eventName, uid, fromState, toState, transition, isDestination)` tuples."""
+        self._event = FsmEvent(-1)
+        """The event record reused for every delivered event."""
+        self._drainLock = threading.RLock()
+        """Serializes the deliveries so the handlers see the events in order."""
+        self._wakeup = threading.Event()
+        """Wakes the background thread before its poll interval elapses."""
+        self._spaceFreed = threading.Event()
+        """Signals a producer blocked by the `BLOCK` policy that events were delivered."""
+        self._thread = None
+        """The background delivery thread, None if the buffer is drained explicitly."""
+        self._stopping = False
+        """Whether the background delivery thread was asked to stop."""
+        pass
+
+    def pusher(self, eventName:str):
+        """
+        Returns the event handler appending the events raised as the passed event name to the buffer.
+        """
+
+        if self.overflow == DROP_OLDEST:
+            events = self._events
+            capacity = self.capacity
+
+            def push(event):
+                if len(events) == capacity:
+                    self.dropped += 1
+                events.append((eventName, event.uid, event.fromState, event.toState, event.transition, event.isDestination))
+            return push
+
+        def pushWithPolicy(event):
+            self._pushWithPolicy((eventName, event.uid, event.fromState, event.toState, event.transition, event.isDestination))
+        return pushWithPolicy
+
+    def _pushWithPolicy(self, record:tuple):
+        """
+        Appends the passed event tuple applying the `BLOCK` or `SAMPLE` overflow policy.
+        """
+
+        events = self._events
+        if len(events) < self.capacity:
+            events.append(record)
+            return
+
+        if self.overflow == SAMPLE:
+            self._sampleCounter += 1
+            if self._sampleCounter % self._sampleRate:
+                self.dropped += 1
+                return
+
+            #The sampled event takes the place of the oldest one
+            events.popleft()
+            self.dropped += 1
+            events.append(record)
+            return
+
+        #BLOCK waits for the background thread, or delivers on the raising thread when there is none
+        while len(events) >= self.capacity:
+            if self._thread is None:
+                self.drain(self.batchSize)
+            else:
+                self._spaceFreed.clear()
+                self._wakeup.set()
+                self._spaceFreed.wait(0.01)
+        events.append(record)
+        pass
+
+    def __len__(self) -> int:
+        """
+        Returns the number of buffered events.
+        """
+        return len(self._events)
+
+    def drain(self, maxEvents:int = None) -> int:
+        """
+        Delivers the buffered events to the subscribed handlers on the calling thread.
+
+        Args:
+            maxEvents (:class:`int`, default = None): The maximum number of events to deliver, None to empty the buffer.
+
+        Returns:
+            The number of delivered events.
+        """
+
+        events = self._events
+        subscribers = self._dispatcher.subscribers
+        event = self._event
+        count = 0
+
+        with self._drainLock:
+            while events and (maxEvents is None or count < maxEvents):
+                try:
+                    eventName, event.uid, event.fromState, event.toState, event.transition, event.isDestination = events.popleft()
+                except IndexError:
+                    break
+
+                for handler, takesEvent in subscribers.get(eventName, ()):
+                    if takesEvent:
+                        handler(event)
+                    else:
+                        handler()
+                count += 1
+
+            self.delivered += count
+
+        if count and self.overflow == BLOCK:
+            self._spaceFreed.set()
+        return count
+
+    def flush(self, timeout:float = None) -> bool:
+        """
+        Waits until every buffered event is delivered. Without a background thread the events are delivered on the calling thread.
+
+        Args:
+            timeout (:class:`float`, default = None): The maximum seconds to wait for the background thread, None to wait until it empties the buffer.
+
+        Returns:
+            Whether the buffer was emptied.
+        """
+
+        if self._thread is None:
+            self.drain()
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._events:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self._wakeup.set()
+            time.sleep(0.001)
+
+        #Waits for the batch the background thread may still be delivering
+        with self._drainLock:
+            pass
+        return True
+
+    def start(self, interval:float = 0.01):
+        """
+        Starts a daemon thread delivering the buffered events in batches.
+
+        Args:
+            interval (:class:`float`, default = 0.01): The seconds the thread sleeps while the buffer is empty.
+        """
+
+        if self._thread is not None:
+            return
+
+        self._stopping = False
+        self._thread = threading.Thread(target = self._deliverForever, args = (interval,), name = "pyFsm-events", daemon = True)
+        self._thread.start()
+        pass
+
+    def stop(self, flush:bool = True):
+        """
+        Stops the background delivery thread, if any.
+
+        Args:
+            flush (:class:`bool`, default = True): Whether the events still buffered are delivered before returning.
+        """
+
+        thread = self._thread
+        if thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            thread.join()
+            self._thread = None
+
+        if flush:
+            self.drain()
+        pass
+
+    def _deliverForever(self, interval:float):
+        """
+        The background thread loop, delivering batches until `stop` is called.
+        """
+
+        while not self._stopping:
+            if not self.drain(self.batchSize):
+                self._wakeup.wait(interval)
+                self._wakeup.clear()
+        pass
+
+def _takesEvent(func) -> bool:
+    """
+    Returns whether the passed handler receives the event record: only handlers with a required positional parameter do.\n
+    Handlers whose positional parameters are all optional or only `*args` are called without arguments,
+    as handlers always were before the event record existed.
+    """
+
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        #Callables without an inspectable signature keep the argumentless handler convention
+        return False
+
+    return any(param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD) and param.default is param.empty
+               for param in parameters)
@@ -0,0 +1,312 @@
+from . import fsmGlobals as globals
+from .fsmLib import FSMStates
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_NO_DESTINATION = -1
+"""The destination column value of an instance with no destination"""
+
+class FSMBatch:
+    """
+    A population of FSM instances sharing one `MachineDefinition`, stepped together.\n
+    The current state, destination and internal `FSMStates` value of every instance are kept in columns
+    (NumPy arrays when NumPy is installed, `array` columns otherwise). Each `step` advances every instance
+    one hop towards its destination with a single gather against the next hop tables of the definition,
+    then calls every transition and state function once with the index array of the instances in it.
+    Every hop is the first hop of the route from the state the instance is at, see `DispatchPlan.nextHopTables`.\n
+
+    States and transitions taking arguments receive the index array of their instances,
+    functions without arguments are called once per group with no arguments.
+    """
+
+    def __init__(self, definition, count:int, useNumpy:bool = None):
+        """
+        Constructs a population of `count` instances in the initial state of the definition.
+
+        Args:
+            definition (:class:`MachineDefinition`): The shared machine definition.
+            count (:class:`int`): The number of instances.
+            useNumpy (:class:`bool`, default = None): Whether the columns are NumPy arrays, None to use NumPy when it is installed.
+
+        Attributes:
+            ~ pyFsm.fsmBatch.FSMBatch.definition: The shared machine definition.
+            ~ pyFsm.fsmBatch.FSMBatch.count: The number of instances.
+            ~ pyFsm.fsmBatch.FSMBatch.stateIds: The current state ID column.
+            ~ pyFsm.fsmBatch.FSMBatch.destIds: The destination state ID column, -1 for instances with no destination.
+            ~ pyFsm.fsmBatch.FSMBatch.internalStates: The internal `FSMStates` code column.
+
+        Raises:
+            (:class:`ValueError`): if the routes of the definition are not precomputed.
+            (:class:`ImportError`): if `useNumpy` is True and NumPy is not installed.
+        """
+
+        plan = definition.plan
+        nextHops = plan.nextHopTables()
+        if nextHops is None:
+            raise ValueError("FSMBatch requires a definition with precomputed routes.")
+
+        if useNumpy is None:
+            useNumpy = numpy is not None
+        elif useNumpy and numpy is None:
+            raise ImportError("NumPy is required for a NumPy backed FSMBatch.")
+
+        self.definition = definition
+        """The shared machine definition."""
+        self.count = count
+        """The number of instances."""
+
+        self._useNumpy = useNumpy
+        """Whether the columns are NumPy arrays."""
+        self._waitsForCallback = [record[2] for record in plan.states]
+        """Whether each state ID waits for a callback."""
+        self._nextStates, self._nextTransitions = nextHops
+        """The next hop state and transition ID tables of the definition, a NumPy matrix each with NumPy columns."""
+
+        if useNumpy:
+            self._nextStates = numpy.array(self._nextStates, dtype = numpy.int32).reshape(len(plan.states), len(plan.states))
+            self._nextTransitions = numpy.array(self._nextTransitions, dtype = numpy.int32).reshape(len(plan.states), len(plan.states))
+            self._waitsMask = numpy.array(self._waitsForCallback, dtype = bool)
+            self.stateIds = numpy.full(count, definition.initialStateId, dtype = numpy.int32)
+            self.destIds = numpy.full(count, _NO_DESTINATION, dtype = numpy.int32)
+            self.internalStates = numpy.full(count, _code(FSMStates.IN_INITIAL_STATE), dtype = numpy.int8)
+        else:
+            self.stateIds = array('i', [definition.initialStateId]) * count
+            self.destIds = array('i', [_NO_DESTINATION]) * count
+            self.internalStates = array('b', [_code(FSMStates.IN_INITIAL_STATE)]) * count
+        pass
+
+    def setDestination(self, indices, stateName:str):
+        """
+        Sets the destination of the passed instances.
+
+        Args:
+            indices (:class:`iterable`): The instance indices.
+            stateName (:class:`str`): The destination state name.
+        """
+
+        destId = self.definition.plan.stateIds[stateName]
+        if self._useNumpy:
+            self.destIds[numpy.asarray(indices, dtype = numpy.intp)] = destId
+        else:
+            for index in indices:
+                self.destIds[index] = destId
+        pass
+
+    def setDestinations(self, destIds):
+        """
+        Replaces the destination column with the passed per-instance destination state IDs, -1 for no destination.
+
+        Args:
+            destIds (:class:`iterable`): The destination state ID of every instance.
+        """
+
+        if self._useNumpy:
+            self.destIds[:] = numpy.asarray(destIds, dtype = numpy.int32)
+        else:
+            self.destIds = array('i', destIds)
+        pass
+
+    def getCurrentFsmState(self, index:int) -> str:
+        """
+        Returns the current state name of the passed instance.
+        """
+        return self.definition.plan.states[int(self.stateIds[index])][0]
+
+    def getInternalFsmState(self, index:int):
+        """
+        Returns the internal `FSMStates` state of the passed instance.
+        """
+        return _STATES_BY_CODE[int(self.internalStates[index])]
+
+    def nextState(self, indices):
+        """
+        Releases the passed instances waiting for a callback, they continue on the next `step`.
+
+        Args:
+            indices (:class:`iterable`): The instance indices.
+        """
+
+        if self._useNumpy:
+            indices = numpy.asarray(indices, dtype = numpy.intp)
+            waiting = indices[self.internalStates[indices] == _WAITING]
+            self.internalStates[waiting] = self._restingCodes(self.stateIds[waiting])
+        else:
+            initialId = self.definition.initialStateId
+            for index in indices:
+                if self.internalStates[index] == _WAITING:
+                    self.internalStates[index] = _INITIAL if self.stateIds[index] == initialId else _IDLING
+        pass
+
+    def step(self) -> int:
+        """
+        Advances every instance with a destination one hop towards it.
+
+        Returns:
+            The number of instances which moved.
+
+        Raises:
+            (:class:`KeyError`): if a destination is unreachable from the current state of an instance, before any instance moves.
+        """
+
+        if self._useNumpy:
+            return self._stepNumpy()
+        return self._stepArray()
+
+    def _stepNumpy(self) -> int:
+        """
+        The NumPy implementation of `step`.
+        """
+
+        plan = self.definition.plan
+        stateIds = self.stateIds
+        destIds = self.destIds
+        internal = self.internalStates
+
+        moving = numpy.flatnonzero((destIds >= 0) & (internal != _WAITING))
+        if moving.size == 0:
+            return 0
+
+        #Instances already at their destination are done without moving
+        current = stateIds[moving]
+        dest = destIds[moving]
+        arrived = current == dest
+        destIds[moving[arrived]] = _NO_DESTINATION
+        moving, current, dest = moving[~arrived], current[~arrived], dest[~arrived]
+        if moving.size == 0:
+            return 0
+
+        nextStates = self._nextStates[current, dest]
+        nextTransitions = self._nextTransitions[current, dest]
+
+        if (nextStates < 0).any():
+            raise KeyError(plan.states[int(dest[nextStates < 0][0])][0])
+
+        #Transition handling, grouped by transition
+        for transId in numpy.unique(nextTransitions[nextTransitions >= 0]):
+            group = moving[nextTransitions == transId]
+            internal[group] = _IN_TRANSITION
+            record = plan.transitions[transId]
+            _callGroup(record[1], record[3], group)
+
+        stateIds[moving] = nextStates
+        internal[moving] = _RUNNING
+
+        #State handling, grouped by state
+        order = numpy.argsort(nextStates, kind = "stable")
+        sortedStates = nextStates[order]
+        groupIds, starts = numpy.unique(sortedStates, return_index = True)
+        ends = numpy.append(starts[1:], sortedStates.size)
+
+        for stateId, start, end in zip(groupIds, starts, ends):
+            record = plan.states[stateId]
+            _callGroup(record[1], record[3], moving[order[start:end]])
+
+        destIds[moving[nextStates == dest]] = _NO_DESTINATION
+        internal[moving] = self._restingCodes(nextStates)
+        internal[moving[self._waitsMask[nextStates]]] = _WAITING
+
+        return int(moving.size)
+
+    def _stepArray(self) -> int:
+        """
+        The `array` implementation of `step`.
+        """
+
+        plan = self.definition.plan
+        stateIds = self.stateIds
+        destIds = self.destIds
+        internal = self.internalStates
+        nextStates = self._nextStates
+        nextTransitions = self._nextTransitions
+
+        moves = []
+        for index in range(self.count):
+            dest = destIds[index]
+            if dest < 0 or internal[index] == _WAITING:
+                continue
+
+            current = stateIds[index]
+            if current == dest:
+                destIds[index] = _NO_DESTINATION
+                continue
+
+            nextState = nextStates[current][dest]
+            if nextState < 0:
+                raise KeyError(plan.states[dest][0])
+            moves.append((index, nextState, nextTransitions[current][dest]))
+
+        if not moves:
+            return 0
+
+        #Transition handling, grouped by transition
+        transGroups = {}
+        for index, nextState, transId in moves:
+            if transId >= 0:
+                transGroups.setdefault(transId, []).append(index)
+
+        for transId, group in transGroups.items():
+            for index in group:
+                internal[index] = _IN_TRANSITION
+            record = plan.transitions[transId]
+            _callGroup(record[1], record[3], group)
+
+        #State handling, grouped by state
+        stateGroups = {}
+        for index, nextState, transId in moves:
+            stateIds[index] = nextState
+            internal[index] = _RUNNING
+            stateGroups.setdefault(nextState, []).append(index)
+
+        for stateId in sorted(stateGroups):
+            record = plan.states[stateId]
+            _callGroup(record[1], record[3], stateGroups[stateId])
+
+        initialId = self.definition.initialStateId
+        for index, nextState, transId in moves:
+            if nextState == destIds[index]:
+                destIds[index] = _NO_DESTINATION
+
+            if self._waitsForCallback[nextState]:
+                internal[index] = _WAITING
+            else:
+                internal[index] = _INITIAL if nextState == initialId else _IDLING
+
+        return len(moves)
+
+    def _restingCodes(self, stateIds):
+        """
+        Returns the internal state codes of instances resting in the passed NumPy state ID column.
+        """
+        return numpy.where(stateIds == self.definition.initialStateId, _INITIAL, _IDLING).astype(numpy.int8)
+
+def _code(fsmState:FSMStates) -> int:
+    """
+    Returns the integer code of the passed `FSMStates` value stored in the internal state column.
+    """
+    value = fsmState.value
+    return value[0] if isinstance(value, tuple) else value
+
+def _callGroup(func, argsKind:int, indices):
+    """
+    Calls a state or transition function once for a group of instances,
+    passing the index array if the function takes positional arguments.
+    """
+
+    if argsKind & globals.ARGS_POSITIONAL:
+        func(indices)
+    else:
+        func()
+    pass
+
+_STATES_BY_CODE = {_code(fsmState): fsmState for fsmState in FSMStates}
+"""The `FSMStates` values accessed by their column codes"""
+_IDLING = _code(FSMStates.IDLING)
+_INITIAL = _code(FSMStates.IN_INITIAL_STATE)
+_RUNNING = _code(FSMStates.IN_RUNNING_STATE)
+_IN_TRANSITION = _code(FSMStates.IN_TRANSITION)
+_WAITING = _code(FSMStates.WAITING_FOR_CB)
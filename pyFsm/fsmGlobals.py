@@ -1,15 +1,127 @@
-fsms = {}
-"""Stores every fsm with a unique ID"""
+import heapq
+import inspect
+import sys
+import weakref
+
+ARGS_NONE = 0
+"""The registered function takes no arguments"""
+ARGS_POSITIONAL = 1
+"""The registered function takes positional arguments"""
+ARGS_KEYWORD = 2
+"""The registered function takes keyword arguments"""
+ARGS_ANY = ARGS_POSITIONAL | ARGS_KEYWORD
+"""The registered function takes both positional and keyword arguments"""
+
+fsms = weakref.WeakValueDictionary()
+"""Stores every live fsm with a unique ID, the FSMs are weakly referenced"""
 
 stateCache = {}
-"""Stores the registered state methods"""
+"""Stores the registered state methods as `(stateFunc, waitsForCallback, argsKind)` tuples"""
 transCache = {}
-"""Stores the registered transitions methods"""
+"""Stores the registered transitions methods as `(transFunc, waitsForCallback, argsKind, offThread)` tuples"""
+transCosts = {}
+"""Stores the route costs passed to the `transition` decorator accessed by the transition names"""
 
 gStates = []
-"""Contains the state dictionaries of each FSM accessed by the FSMs UID"""
+"""Contains the state dictionaries of each FSM accessed by the FSMs UID, None for released UIDs"""
 gTransitions = []
-"""Contains the transition dictionaries of each FSM accessed by the FSMs UID"""
+"""Contains the transition dictionaries of each FSM accessed by the FSMs UID, None for released UIDs"""
+
+_freeUids = []
+"""Heap of the released UIDs available for recycling"""
+
+def _acquireUid() -> int:
+    """
+    Returns the smallest released UID or a new one and allocates its state and transition dictionaries.
+    """
+
+    if _freeUids:
+        uid = heapq.heappop(_freeUids)
+        gStates[uid] = {}
+        gTransitions[uid] = {}
+        return uid
+
+    gStates.append({})
+    gTransitions.append({})
+    return len(gStates) - 1
+
+def _releaseUid(uid:int):
+    """
+    Releases the passed UID and the state and transition dictionaries of its FSM, the UID is recycled by the next FSM.\n
+    Releasing an already released UID does nothing.
+
+    Args:
+        uid (:class:`int`): The UID to release.
+    """
+
+    if uid >= len(gStates) or gStates[uid] is None:
+        return
+
+    gStates[uid] = None
+    gTransitions[uid] = None
+    fsms.pop(uid, None)
+    heapq.heappush(_freeUids, uid)
+    pass
+
+def registryStats() -> dict:
+    """
+    Returns the global FSM registry statistics as a dictionary with the keys:\n
+    `liveFsms`: the registered FSMs which are still alive,\n
+    `allocatedUids`: the UIDs ever allocated, live and free,\n
+    `freeUids`: the released UIDs waiting to be recycled,\n
+    `bytesHeld`: the approximate bytes held by the registry containers and the per-FSM state and transition dictionaries.
+    """
+
+    bytesHeld = sys.getsizeof(fsms.data) + sys.getsizeof(gStates) + sys.getsizeof(gTransitions) + sys.getsizeof(_freeUids)
+    for states, transitions in zip(gStates, gTransitions):
+        if states is not None:
+            bytesHeld += sys.getsizeof(states) + sys.getsizeof(transitions)
+
+    return {
+        "liveFsms": len(fsms),
+        "allocatedUids": len(gStates),
+        "freeUids": len(_freeUids),
+        "bytesHeld": bytesHeld,
+    }
+
+def _inspectArguments(func) -> int:
+    """
+    Inspects the signature of the passed function once and returns which arguments it accepts
+    as a combination of the `ARGS_POSITIONAL` and `ARGS_KEYWORD` flags, `ARGS_NONE` if it takes no arguments.
+
+    Args:
+        func (:class:`func`): The function to inspect.
+    """
+
+    argsKind = ARGS_NONE
+    for param in inspect.signature(func).parameters.values():
+        if param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD, param.VAR_POSITIONAL):
+            argsKind |= ARGS_POSITIONAL
+        if param.kind in (param.POSITIONAL_OR_KEYWORD, param.KEYWORD_ONLY, param.VAR_KEYWORD):
+            argsKind |= ARGS_KEYWORD
+
+    return argsKind
+
+def _callWithArguments(func, argsKind:int, args:tuple, kwargs:dict):
+    """
+    Calls the passed function with the passed arguments, functions taking no arguments are called without them.\n
+    The positional-only and keyword-only calls are only taken when no argument of the other kind is passed,
+    otherwise every argument is passed and Python raises the `TypeError` of the call, so no argument is dropped silently.
+
+    Args:
+        func (:class:`func`): The function to call.
+        argsKind (:class:`int`): The `ARGS_*` flags of the function.
+        args (:class:`tuple`): The positional arguments.
+        kwargs (:class:`dict`): The keyword arguments.
+    """
+
+    if argsKind == ARGS_NONE:
+        return func()
+    if argsKind == ARGS_POSITIONAL and not kwargs:
+        return func(*args)
+    if argsKind == ARGS_KEYWORD and not args:
+        return func(**kwargs)
+    return func(*args, **kwargs)
 
 def _addToTempStates(stateFunc, waitsForCallback):
     """
@@ -29,18 +141,20 @@ def _addToTempStates(stateFunc, waitsForCallback):
     if transCache.get(stateFunc.__name__):
         raise ValueError("Passed transition " + stateFunc.__name__ + " is registered as a state.")
     
-    stateCache[stateFunc.__name__] = (stateFunc, waitsForCallback)
+    stateCache[stateFunc.__name__] = (stateFunc, waitsForCallback, _inspectArguments(stateFunc))
 
-def _addToTempTransitions(transFunc, waitsForCallback):
+def _addToTempTransitions(transFunc, waitsForCallback, offThread = False, cost = None):
     """
     Adds the passed transition function to the internal transitions list.
 
     Args:
         transFunc (:class:`func`): The function containing the transition logic.
         waitsForCallback (:class:`bool`): Whether the FSM should wait for the callNextState callback to continue execution.
+        offThread (:class:`bool`, default = False): Whether the transition runs in the executor of the FSM, if it has one.
+        cost (:class:`float`, default = None): The route cost of the transition used by the weighted route stores, None for the default cost.
 
     Raises:
-        (:class:`ValueError`): if the transition function is already imported or registered as a state.
+        (:class:`ValueError`): if the transition function is already imported or registered as a state, or if the cost is negative.
     """
 
     if transCache.get(transFunc.__name__):
@@ -49,7 +163,12 @@ def _addToTempTransitions(transFunc, waitsForCallback):
     if stateCache.get(transFunc.__name__):
         raise ValueError("Passed transition " + transFunc.__name__ + " is registered as a state.")
     
-    transCache[transFunc.__name__] = (transFunc, waitsForCallback)
+    if cost is not None and cost < 0:
+        raise ValueError("Passed transition " + transFunc.__name__ + " has a negative cost.")
+
+    transCache[transFunc.__name__] = (transFunc, waitsForCallback, _inspectArguments(transFunc), offThread)
+    if cost is not None:
+        transCosts[transFunc.__name__] = float(cost)
 
 def state(waitsForCallback = False):
     """
@@ -69,12 +188,15 @@ def state(waitsForCallback = False):
 
     return wrapper
 
-def transition(waitsForCallback = False):
+def transition(waitsForCallback = False, offThread = False, cost = None):
     """
     Decorator used to add the decorated method to the transition list.
 
     Args:
         waitsForCallback(:class:`bool`, default = False): Whether the FSM should wait for the callNextState callback to continue execution.
+        offThread(:class:`bool`, default = False): Whether the transition runs in the executor set with `FSM.setTransitionExecutor` instead of inline.
+        Off-thread transitions must not touch the FSM and, for process pools, must be picklable module level functions.
+        cost(:class:`float`, default = None): The route cost of the transition, used by the `WeightedRouteStore` and `AStarRouteStore` to pick the cheapest routes.
     """
 
     if callable(waitsForCallback):
@@ -82,7 +204,7 @@ def transition(waitsForCallback = False):
         return waitsForCallback
 
     def wrapper(func):
-        _addToTempTransitions(func, waitsForCallback)
+        _addToTempTransitions(func, waitsForCallback, offThread, cost)
         return func
 
     return wrapper
\ No newline at end of file
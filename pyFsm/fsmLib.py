@@ -2,13 +2,19 @@
 from . import fsmGlobals as globals
 from . import heuristics as sort
 from . import eventHandler as events
+from . import routeStores as routing
+from . import dispatchPlan as plans
+from . import destQueues as queues
+from . import graphAnalysis as analysis
 #Merparser integration
 from . import mermaidHandler as merParser
 
 #Python relative
-import inspect
+from contextlib import contextmanager
 from enum import Enum
-from queue import Queue
+import gc
+import itertools
+import weakref
 
 #region FSM Local
 class FSMStates(Enum):
@@ -26,6 +32,8 @@ class FSMStates(Enum):
 class FSM:
     EVENT_STATE_REACHED_NAME = 'StateReached'
     EVENT_DESTINATION_REACHED_NAME = 'DestinationReached'
+    SNAPSHOT_VERSION = 1
+    """The version of the snapshots created by `snapshot` and `snapshotAll`"""
 
     def getCurrentFsmState(self):
         """
@@ -39,37 +47,294 @@ class FSM:
         """
         return self._fsmInternalState
 
+    def getRouteStore(self):
+        """
+        Returns the route store of the FSM.
+        """
+        if self._routesDirty and self._deferredBuildDepth == 0:
+            self._buildRoutesGraph()
+        return self._routeStore
+
+    def getGraphAnalysis(self):
+        """
+        Returns the `GraphAnalysis` of the state graph, with its strongly connected components, reachability index
+        and dead-end, trap and unreachable states. It is computed on the first call after the graph changes.
+        """
+
+        if self._analysis is None:
+            self._analysis = analysis.GraphAnalysis(self._stateGraph)
+        return self._analysis
+
+    def setAdmissionChecks(self, enabled:bool = True):
+        """
+        Enables or disables the admission checks of the piped destinations.\n
+        With the checks enabled a destination which cannot be reached from the previous queued destination,
+        or from the current state if there is none, raises a `ValueError` when it is piped instead of a `KeyError` when it is run.
+        A check is a constant time lookup in the reachability index of `getGraphAnalysis`.
+
+        Args:
+            enabled (:class:`bool`, default = True): Whether to check the piped destinations.
+        """
+        self._admissionChecks = enabled
+        pass
+
+    def setQueuePolicies(self, *policies):
+        """
+        Sets the policies applied to every piped destination, for producers piping destinations faster than the FSM walks to them.
+        Call it without policies to queue every destination again.\n
+        * `LATEST_WINS`: a piped destination drops every queued one, the FSM only walks to the newest destination.
+        * `DEDUPE`: a destination identical to the newest queued one, arguments included, is dropped.
+        * `FUSE`: when two argument-free destinations are queued one after the other and the route to the second one,
+        from the destination queued before them, passes through the first one, the first one is dropped.
+        When the first one is the only queued destination the route is taken from the destination the FSM is walking to, or from its current state.
+        The first destination is then only passed through as an intermediate state of the route to the second one.\n
+        The destination the FSM is walking to when a destination is piped is never dropped.
+
+        Args:
+            policies (:class:`str`): The `destQueues.LATEST_WINS`, `DEDUPE` or `FUSE` policies.
+
+        Raises:
+            (:class:`ValueError`): if a policy is unknown.
+        """
+
+        for policy in policies:
+            if policy not in queues.QUEUE_POLICIES:
+                raise ValueError("Unknown queue policy: {}".format(policy))
+
+        self._queuePolicies = frozenset(policies)
+        pass
+
+    def queueInfo(self) -> dict:
+        """
+        Returns the destination queue statistics as a dictionary with the
+        `depth`, `policies`, `dropped`, `deduped` and `fused` keys.
+        """
+
+        return {
+            "depth": self._destQueue.qsize(),
+            "policies": sorted(self._queuePolicies),
+            "dropped": self.droppedCommands,
+            "deduped": self.dedupedCommands,
+            "fused": self.fusedCommands,
+        }
+
+    def getCostTable(self):
+        """
+        Returns the `CostTable` of the transitions of the FSM, followed by its route store if it is a weighted one.
+        Call `setTransitionCost`, `setStateCost` or `applyMeasuredCosts` to change it, so the routes are recomputed.
+        """
+        return self._costs
+
+    def setTransitionCost(self, transition, cost:float):
+        """
+        Sets the route cost of the passed transition between any states of this FSM, overriding the cost of its decorator.
+
+        Args:
+            transition (:class:`str`, `tuple` or `func`): The transition name or function.
+            cost (:class:`float`): The cost of the transition, None to drop the set cost.
+
+        Raises:
+            (:class:`ValueError`): if the cost is negative.
+        """
+
+        self._costs.setTransitionCost(_transitionName(transition) if not isinstance(transition, str) else transition, cost)
+        self._invalidateRoutes(self._costs)
+        pass
+
+    def setStateCost(self, state, cost:float):
+        """
+        Sets the route cost of entering the passed state, added to the cost of every transition leading to it.
+
+        Args:
+            state (:class:`str`, `tuple` or `func`): The state name or function.
+            cost (:class:`float`): The cost of the state, None to drop the set cost.
+
+        Raises:
+            (:class:`ValueError`): if the cost is negative.
+        """
+
+        stateName = state if isinstance(state, str) else (state[0].__name__ if isinstance(state, tuple) else state.__name__)
+        self._costs.setStateCost(stateName, cost)
+        self._invalidateRoutes(self._costs)
+        pass
+
+    def applyMeasuredCosts(self, profiler, percentile:float = None) -> int:
+        """
+        Sets the cost of every transition and state of the FSM measured by the passed profiler to its measured call time in seconds,
+        so the weighted route stores follow the routes which actually ran fastest.\n
+        Transitions and states without samples keep their cost, so the other costs should be in seconds too.
+
+        Args:
+            profiler (:class:`Profiler`): The profiler which recorded the FSM.
+            percentile (:class:`float`, default = None): The percentile of the latest samples to use as the cost, None to use the mean.
+
+        Returns:
+            The number of transitions and states whose cost was set.
+        """
+
+        applied = 0
+        for names, metrics, setCost in ((globals.gTransitions[self.uid], profiler.transitions, self._costs.setTransitionCost),
+                                        (globals.gStates[self.uid], profiler.states, self._costs.setStateCost)):
+            for name in names:
+                stat = metrics.get(name)
+                if stat is None or not stat.count:
+                    continue
+                setCost(name, stat.percentile(percentile) if percentile is not None else stat.total / stat.count)
+                applied += 1
+
+        if applied:
+            self._invalidateRoutes(self._costs)
+        return applied
+
+    def _invalidateRoutes(self, table):
+        """
+        Makes the FSM recompute its routes and plan on the next traversal if its route store follows the passed cost table or levels.
+        """
+
+        if getattr(self._routeStore, "costs", None) is table or getattr(self._routeStore, "levels", None) is table:
+            self._routesDirty = True
+            self._plan = None
+        pass
+
+    def setTransitionExecutor(self, executor):
+        """
+        Sets the executor running the transitions registered with `@transition(offThread = True)`.\n
+        While such a transition runs the FSM stays `FSMStates.IN_TRANSITION` and `run` returns,
+        so the thread can keep stepping other FSMs. Call `run` again to continue once `isTransitionPending` is False.
+
+        Args:
+            executor (:class:`concurrent.futures.Executor`): A thread or process pool executor, None to run every transition inline.
+        """
+        self._executor = executor
+        pass
+
+    def isTransitionPending(self) -> bool:
+        """
+        Returns whether the FSM is waiting for an off-thread transition to complete.
+        """
+        return self._pendingTransition is not None and not self._pendingTransition.done()
+
     def onStateReached(self, *func):
         """
-        Adds the passed functions as an event callback of the state reached event.
+        Adds the passed functions as an event callback of the state reached event.\n
+        Functions with a required positional parameter receive the `FsmEvent` record of the event,
+        the others, including functions whose parameters are all optional or only `*args`, are called without arguments.
         """
         self._eventHandler.subscribeToEvent(self.EVENT_STATE_REACHED_NAME, *func)
+        self._refreshHandlers()
         pass
 
     def onDestinationReached(self, *func):
         """
-        Adds the passed function as an event callback of the destination reached event.
+        Adds the passed function as an event callback of the destination reached event.\n
+        Functions with a required positional parameter receive the `FsmEvent` record of the event,
+        the others, including functions whose parameters are all optional or only `*args`, are called without arguments.
         """
         self._eventHandler.subscribeToEvent(self.EVENT_DESTINATION_REACHED_NAME, *func)
+        self._refreshHandlers()
+        pass
+
+    def offStateReached(self, *func):
+        """
+        Removes the passed functions from the callbacks of the state reached event.
+        """
+        self._eventHandler.unsubscribeFromEvent(self.EVENT_STATE_REACHED_NAME, *func)
+        self._refreshHandlers()
+        pass
+
+    def offDestinationReached(self, *func):
+        """
+        Removes the passed functions from the callbacks of the destination reached event.
+        """
+        self._eventHandler.unsubscribeFromEvent(self.EVENT_DESTINATION_REACHED_NAME, *func)
+        self._refreshHandlers()
+        pass
+
+    def bufferEvents(self, capacity:int = 4096, overflow:str = events.DROP_OLDEST, batchSize:int = 256, sampleRate:int = 8):
+        """
+        Switches the events of the FSM to buffered delivery, so raising an event only appends it to an `EventBuffer`.\n
+        The handlers are called when the buffer is drained, call `start` on the returned buffer to deliver from a background thread.
+
+        Args:
+            capacity (:class:`int`, default = 4096): The maximum number of buffered events.
+            overflow (:class:`str`, default = DROP_OLDEST): The policy of a full buffer, `DROP_OLDEST`, `BLOCK` or `SAMPLE`.
+            batchSize (:class:`int`, default = 256): The maximum number of events delivered per batch.
+            sampleRate (:class:`int`, default = 8): The `SAMPLE` policy keeps one in this many events while the buffer is full.
+
+        Returns:
+            The `EventBuffer` of the FSM.
+        """
+
+        buffer = self._eventHandler.enableBuffering(capacity, overflow, batchSize, sampleRate)
+        self._refreshHandlers()
+        return buffer
+
+    def unbufferEvents(self):
+        """
+        Delivers the buffered events and switches the events of the FSM back to synchronous delivery.
+        """
+        self._eventHandler.disableBuffering()
+        self._refreshHandlers()
+        pass
+
+    def _refreshHandlers(self):
+        """
+        Caches the handler tuples raised by the FSM, they are replaced by the dispatcher on every change.
+        """
+        self._stateReachedHandlers = self._eventHandler.getHandlers(self.EVENT_STATE_REACHED_NAME)
+        self._destReachedHandlers = self._eventHandler.getHandlers(self.EVENT_DESTINATION_REACHED_NAME)
         pass
 
-    def __init__(self, initialState):
+    def __init__(self, initialState, routeStore = None, destQueue = None):
         """
         Constructs a FSM instance with empty states and transitions.\n
         
         Args:
            initialState (:class:`str` or `func`): The initial state must either be the state string name or the state function.
+           routeStore (:class:`EagerRouteStore` or `LazyRouteStore`, default = None): The store computing and keeping the state to state routes.
+           Defaults to an `EagerRouteStore`, pass a `LazyRouteStore` to compute the routes on demand
+           or a `WeightedRouteStore` or `AStarRouteStore` to follow the cheapest routes instead of the shortest ones.
+           A `HierarchicalRouteStore` routes the FSMs made of composite states level by level.
+           destQueue (:class:`DestQueue` or `ThreadSafeDestQueue`, default = None): The queue backend of the piped destination states.
+           Defaults to a lock-free `DestQueue`, pass a `ThreadSafeDestQueue` when other threads enqueue states.
 
         Attributes:
             ~ pyFsm.fsmLib.FSM.uid: The FSM assigned to this fsm
+            ~ pyFsm.fsmLib.FSM._registration: The finalizer releasing the UID of the FSM when it is closed or garbage collected
             ~ pyFsm.fsmLib.FSM._eventHandler: The FSM event handler
+            ~ pyFsm.fsmLib.FSM._stateReachedHandlers: The frozen handler tuple of the state reached event
+            ~ pyFsm.fsmLib.FSM._destReachedHandlers: The frozen handler tuple of the destination reached event
+            ~ pyFsm.fsmLib.FSM._event: The event record reused by every raised event
             ~ pyFsm.fsmLib.FSM._fsmInternalState: The FSM `FSMStates` state for FSM management
             ~ pyFsm.fsmLib.FSM.initialState: The FSM initial state given from the constructor
             ~ pyFsm.fsmLib.FSM.currentGraphState: The same as `initialState`
             ~ pyFsm.fsmLib.FSM._statePairs: The state-transition pairs of this FSM
-            ~ pyFsm.fsmLib.FSM._routes: The state to state shortest routes.
-            ~ pyFsm.fsmLib.FSM._destQueue: The destination state name when transitions from state to state.
+            ~ pyFsm.fsmLib.FSM._stateGraph: The state graph built from the state-transition pairs.
+            ~ pyFsm.fsmLib.FSM._routeStore: The store computing and keeping the state to state shortest routes.
+            ~ pyFsm.fsmLib.FSM._costs: The `CostTable` of the transitions, shared with the route store if it is weighted.
+            ~ pyFsm.fsmLib.FSM._levels: The name of the composite state owning every state, accessed by the state names, shared with the route store if it is hierarchical.
+            ~ pyFsm.fsmLib.FSM._compositeParents: The name of the composite state owning every composite state, None at the top level.
+            ~ pyFsm.fsmLib.FSM._deferredBuildDepth: The nesting depth of the active `deferredRouteBuild` blocks.
+            ~ pyFsm.fsmLib.FSM._routesDirty: Whether the routes must be rebuilt when the deferred build ends.
+            ~ pyFsm.fsmLib.FSM._plan: The compiled `DispatchPlan` of the FSM graph, None until the next `compile` call.
+            ~ pyFsm.fsmLib.FSM._cachedDestState: The `(destStateName, args, kwargs)` of the destination when transitions from state to state.
             ~ pyFsm.fsmLib.FSM._destQueue: A queue used in conjuction with the nextState method to cache the states that must be passed until the destination state is reached.
+            ~ pyFsm.fsmLib.FSM._running: Whether the `run` loop is currently driving the FSM.
+            ~ pyFsm.fsmLib.FSM._resumeRequested: Whether `nextState` was called for the state currently running or waiting.
+            ~ pyFsm.fsmLib.FSM._executor: The executor running the off-thread transitions, None to run them inline.
+            ~ pyFsm.fsmLib.FSM._pendingTransition: The future of the off-thread transition the FSM is waiting for, if any.
+            ~ pyFsm.fsmLib.FSM._transitionCompleted: Whether the next transition of the route was already completed off-thread.
+            ~ pyFsm.fsmLib.FSM._pendingHops: The hops left of the route interrupted by an off-thread transition, starting with its hop, None if no route is interrupted.
+            ~ pyFsm.fsmLib.FSM._scheduler: The `Scheduler` driving the FSM, None if it is driven by its own `run` calls.
+            ~ pyFsm.fsmLib.FSM._profiler: The `Profiler` instrumenting the FSM, None if it is not profiled.
+            ~ pyFsm.fsmLib.FSM._tracer: The `TraceRecorder` recording the FSM, None if it is not recorded.
+            ~ pyFsm.fsmLib.FSM._sharesDefinition: Whether the state graph, state pairs and plan are shared with other restored FSMs, they are copied before the first change.
+            ~ pyFsm.fsmLib.FSM._analysis: The `GraphAnalysis` of the state graph, None until the next `getGraphAnalysis` call.
+            ~ pyFsm.fsmLib.FSM._admissionChecks: Whether piped destinations which cannot be reached are rejected before they are queued.
+            ~ pyFsm.fsmLib.FSM._queuePolicies: The `destQueues` policies applied to the piped destinations, empty to queue every one.
+            ~ pyFsm.fsmLib.FSM.droppedCommands: The number of queued destinations dropped by the `LATEST_WINS` policy.
+            ~ pyFsm.fsmLib.FSM.dedupedCommands: The number of piped destinations dropped by the `DEDUPE` policy.
+            ~ pyFsm.fsmLib.FSM.fusedCommands: The number of queued destinations merged into the next one by the `FUSE` policy.
             ~ pyFsm.fsmLib.FSM.mermaidHandler: The `MermaidHandler` of this FSM used for Mermaid JS parsing.
         """
 
@@ -78,6 +343,12 @@ class FSM:
         self._registerFsm()
         self._eventHandler = events.EventDispatcher(self.EVENT_STATE_REACHED_NAME, self.EVENT_DESTINATION_REACHED_NAME)
         """The FSM event handler"""
+        self._stateReachedHandlers = self._eventHandler.getHandlers(self.EVENT_STATE_REACHED_NAME)
+        """The frozen handler tuple of the state reached event"""
+        self._destReachedHandlers = self._eventHandler.getHandlers(self.EVENT_DESTINATION_REACHED_NAME)
+        """The frozen handler tuple of the destination reached event"""
+        self._event = events.FsmEvent(self.uid)
+        """The event record reused by every raised event"""
         self._fsmInternalState = FSMStates.IN_INITIAL_STATE
         """The FSM `FSMStates` state for FSM management"""
 
@@ -87,12 +358,60 @@ class FSM:
         """The current state the FSM is in until it reaches the destination state"""
         self._statePairs = []
         """The state-transition pairs of this FSM"""
-        self._routes = {}
-        """The state to state shortest routes."""
+        self._stateGraph = {}
+        """The state graph built from the state-transition pairs."""
+        self._routeStore = routeStore if routeStore is not None else routing.EagerRouteStore()
+        """The store computing and keeping the state to state shortest routes."""
+        self._costs = getattr(self._routeStore, "costs", None) or routing.CostTable()
+        """The `CostTable` of the transitions, shared with the route store if it is weighted."""
+        self._levels = getattr(self._routeStore, "levels", None)
+        """The name of the composite state owning every state, accessed by the state names, shared with the route store if it is hierarchical."""
+        if self._levels is None:
+            self._levels = {}
+        self._compositeParents = {}
+        """The name of the composite state owning every composite state, None at the top level."""
+        self._deferredBuildDepth = 0
+        """The nesting depth of the active `deferredRouteBuild` blocks."""
+        self._routesDirty = False
+        """Whether the routes must be rebuilt when the deferred build ends."""
+        self._plan = None
+        """The compiled `DispatchPlan` of the FSM graph, None until the next `compile` call."""
         self._cachedDestState = None
-        """The destination state name when transitions from state to state."""
-        self._destQueue = Queue()
+        """The `(destStateName, args, kwargs)` of the destination when transitions from state to state."""
+        self._destQueue = destQueue if destQueue is not None else queues.DestQueue()
         """A queue used in conjuction with the nextState method to cache the states that must be passed until the destination state is reached."""
+        self._running = False
+        """Whether the `run` loop is currently driving the FSM."""
+        self._resumeRequested = False
+        """Whether `nextState` was called for the state currently running or waiting."""
+        self._executor = None
+        """The executor running the off-thread transitions, None to run them inline."""
+        self._pendingTransition = None
+        """The future of the off-thread transition the FSM is waiting for, if any."""
+        self._transitionCompleted = False
+        """Whether the next transition of the route was already completed off-thread."""
+        self._pendingHops = None
+        """The hops left of the route interrupted by an off-thread transition, starting with its hop, None if no route is interrupted."""
+        self._scheduler = None
+        """The `Scheduler` driving the FSM, None if it is driven by its own `run` calls."""
+        self._profiler = None
+        """The `Profiler` instrumenting the FSM, None if it is not profiled."""
+        self._tracer = None
+        """The `TraceRecorder` recording the FSM, None if it is not recorded."""
+        self._sharesDefinition = False
+        """Whether the state graph, state pairs and plan are shared with other restored FSMs, they are copied before the first change."""
+        self._analysis = None
+        """The `GraphAnalysis` of the state graph, None until the next `getGraphAnalysis` call."""
+        self._admissionChecks = False
+        """Whether piped destinations which cannot be reached are rejected before they are queued."""
+        self._queuePolicies = frozenset()
+        """The `destQueues` policies applied to the piped destinations, empty to queue every one."""
+        self.droppedCommands = 0
+        """The number of queued destinations dropped by the `LATEST_WINS` policy."""
+        self.dedupedCommands = 0
+        """The number of piped destinations dropped by the `DEDUPE` policy."""
+        self.fusedCommands = 0
+        """The number of queued destinations merged into the next one by the `FUSE` policy."""
 
         #Merparser integration
         self.mermaidHandler = merParser.MermaidHandler(self)
@@ -102,23 +421,57 @@ class FSM:
     def _registerFsm(self):
         """
         Registers the FSM instance to the global FSM cache of the script.\n
-        The UID of the FSM is also assigned here.\n
+        The UID of the FSM is also assigned here, reusing the UID of a closed or collected FSM if there is one.\n
+        The registry only keeps a weak reference to the FSM, its UID is released when it is closed or garbage collected.
 
         Raises:
             (:class:`KeyError`): In case the FSM is already registered.
         """
         
-        self.uid = len(globals.fsms)
+        self.uid = globals._acquireUid()
 
         if globals.fsms.get(self.uid):
-            raise KeyError("FSM with UID: " + self.uid + " already registered.")
+            raise KeyError("FSM with UID: " + str(self.uid) + " already registered.")
         
         globals.fsms[self.uid] = self
-        globals.gStates.append({})
-        globals.gTransitions.append({})
+        self._registration = weakref.finalize(self, globals._releaseUid, self.uid)
+        """Releases the UID of the FSM when it is closed or garbage collected"""
+        pass
+
+    def close(self):
+        """
+        Releases the FSM from the global registry and drops its pending destinations.\n
+        The UID of the FSM is recycled by the next created FSM, so the FSM must not be used afterwards.
+        """
+
+        if self._scheduler is not None:
+            self._scheduler.remove(self)
+
+        self._registration()
+        self._destQueue.clear()
+        self._cachedDestState = None
         pass
 
-    def createTransition(self, currentState, nextState, transition = None):
+    def isClosed(self) -> bool:
+        """
+        Returns whether the FSM was released from the global registry.
+        """
+        return not self._registration.alive
+
+    def __enter__(self):
+        """
+        Returns the FSM, which is closed when the `with` block exits.
+        """
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        """
+        Closes the FSM at the end of its `with` block.
+        """
+        self.close()
+        pass
+
+    def createTransition(self, currentState, nextState, transition = None, cost = None):
         """
         Creates a new state transition which the current state transits to the next state through the passed transition.\n
         If the passed transition is None, then the state transition is instant.
@@ -127,16 +480,32 @@ class FSM:
             currentState (:class:`tuple` or `func`): The source state function
             nextState (:class:`tuple` or `func`): The target state function
             transition (:class:`tuple` or `func`, default = None): The transition function, if any
+            cost (:class:`float`, default = None): The route cost of this state transition only, see `CostTable`
+
+        Raises:
+            (:class:`ValueError`): if the cost is negative.
         """
 
+        if self.isClosed():
+            raise RuntimeError("FSM with UID: " + str(self.uid) + " is closed.")
+
+        if self._sharesDefinition:
+            self._stateGraph = {stateName: list(edges) for stateName, edges in self._stateGraph.items()}
+            self._statePairs = list(self._statePairs)
+            self._sharesDefinition = False
+
         cStateName = currentState[0].__name__ if isinstance(currentState, tuple) else currentState.__name__
         nStateName = nextState[0].__name__ if isinstance(nextState, tuple) else nextState.__name__
 
         #Checks for None transition
+        trName = None
         if transition is not None:
             trName = transition[0].__name__ if isinstance(transition, tuple) else transition.__name__
             globals.gTransitions[self.uid][trName] = globals.transCache[trName]
 
+        if cost is not None:
+            self._costs.setPairCost(cStateName, nStateName, trName, cost)
+
         #Register the retrieved states and transitions to this FSM instance
         globals.gStates[self.uid][cStateName] = globals.stateCache[cStateName]
         globals.gStates[self.uid][nStateName] = globals.stateCache[nStateName]
@@ -151,10 +520,150 @@ class FSM:
         if getattr(self, nStateName, self._dynamicMethodWrapper(globals.gStates[self.uid][nStateName])) is not None:
             setattr(self, nStateName, self._dynamicMethodWrapper(globals.gStates[self.uid][nStateName]))
 
-        self._buildRoutesGraph()
+        self._addRouteEdge(cStateName, nStateName, trName)
+
+        return self
+
+    def createTransitions(self, transitions):
+        """
+        Creates every state transition of the passed iterable and computes the routes once at the end.\n
+        Each item is a `(currentState, nextState)`, `(currentState, nextState, transition)`
+        or `(currentState, nextState, transition, cost)` tuple with the same meaning as the `createTransition` arguments.
+
+        Args:
+            transitions (:class:`iterable`): The state transitions to create.
+        """
+
+        with self.deferredRouteBuild():
+            for stateTransition in transitions:
+                self.createTransition(*stateTransition)
+
+        return self
+
+    def _createNamedTransitions(self, transitions):
+        """
+        Creates every state transition of the passed `(cStateName, nStateName, trName, cost)` tuples of registered names.\n
+        It is the bulk form of `createTransition` used by the streaming diagram loader:
+        the piping methods are only created for the states the FSM did not have yet.
+
+        Args:
+            transitions (:class:`iterable`): The state and transition names and costs, `trName` is None for instant transitions and `cost` None for the default cost.
+        """
+
+        if self.isClosed():
+            raise RuntimeError("FSM with UID: " + str(self.uid) + " is closed.")
+
+        if self._sharesDefinition:
+            self._stateGraph = {stateName: list(edges) for stateName, edges in self._stateGraph.items()}
+            self._statePairs = list(self._statePairs)
+            self._sharesDefinition = False
+
+        fsmStates = globals.gStates[self.uid]
+        fsmTransitions = globals.gTransitions[self.uid]
+
+        for cStateName, nStateName, trName, cost in transitions:
+            for stateName in (cStateName, nStateName):
+                if stateName not in fsmStates:
+                    stateTuple = fsmStates[stateName] = globals.stateCache[stateName]
+                    if getattr(self, stateName, True) is not None:
+                        setattr(self, stateName, self._dynamicMethodWrapper(stateTuple))
+
+            transTuple = None
+            if trName is not None:
+                transTuple = fsmTransitions[trName] = globals.transCache[trName]
+            if cost is not None:
+                self._costs.setPairCost(cStateName, nStateName, trName, cost)
+
+            self._statePairs.append((fsmStates[cStateName], fsmStates[nStateName], transTuple))
+            self._addRouteEdge(cStateName, nStateName, trName)
 
         return self
 
+    def addCompositeState(self, compositeState, childFsm, finalStates = ()):
+        """
+        Makes the passed state a composite state owning the sub-machine of the passed child FSM.\n
+        The transitions of the child FSM are copied into this FSM, an instant transition enters its initial state
+        from the composite state and an instant transition returns from every final state to the composite state,
+        whose own transitions leave the sub-machine. The states of the child FSM are owned by the composite state,
+        or keep their own composite state if the child FSM has composite states too.
+        The child FSM is only read and can be closed afterwards.\n
+        A `HierarchicalRouteStore` routes every sub-machine on its own instead of the whole graph at once.
+
+        Args:
+            compositeState (:class:`tuple` or `func`): The composite state function.
+            childFsm (:class:`FSM`): The FSM defining the sub-machine, its initial state is the one entered.
+            finalStates (:class:`iterable`, default = ()): The state functions of the child FSM returning to the composite state.
+
+        Raises:
+            (:class:`ValueError`): if the composite state already owns a sub-machine, is a state of the child FSM,
+            or if a state of the child FSM already belongs to another level of this FSM.
+        """
+
+        compositeName = compositeState[0].__name__ if isinstance(compositeState, tuple) else compositeState.__name__
+        childGraph = childFsm._stateGraph if childFsm._stateGraph else {childFsm.initialState: []}
+
+        if compositeName in self._compositeParents:
+            raise ValueError("State " + compositeName + " already owns a sub-machine.")
+        if compositeName in childGraph:
+            raise ValueError("Composite state " + compositeName + " cannot be a state of its own sub-machine.")
+
+        childLevels = {stateName: childFsm._levels.get(stateName, compositeName) for stateName in childGraph}
+        for stateName, level in childLevels.items():
+            if stateName in self._stateGraph and self._levels.get(stateName) != level:
+                raise ValueError("State " + stateName + " already belongs to another level of the FSM.")
+
+        self._levels.update(childLevels)
+        for childComposite, parentComposite in childFsm._compositeParents.items():
+            self._compositeParents[childComposite] = parentComposite if parentComposite is not None else compositeName
+        self._compositeParents[compositeName] = self._levels.get(compositeName)
+        self._invalidateRoutes(self._levels)
+
+        childCosts = childFsm._costs.pairCosts
+        with self.deferredRouteBuild():
+            for cState, nState, trans in childFsm._statePairs:
+                cost = childCosts.get((cState[0].__name__, nState[0].__name__, _transitionName(trans)))
+                self.createTransition(cState, nState, trans, cost)
+
+            self.createTransition(compositeState, globals.stateCache[childFsm.initialState])
+            for finalState in finalStates:
+                self.createTransition(finalState, compositeState)
+
+        return self
+
+    def getCompositeOf(self, state) -> str:
+        """
+        Returns the name of the composite state owning the passed state, None if it is at the top level.
+
+        Args:
+            state (:class:`str`, `tuple` or `func`): The state name or function.
+        """
+
+        stateName = state if isinstance(state, str) else (state[0].__name__ if isinstance(state, tuple) else state.__name__)
+        return self._levels.get(stateName)
+
+    def getCompositeStates(self) -> dict:
+        """
+        Returns the names of the composite states of the FSM mapped to the name of the composite state owning each one, None at the top level.
+        """
+        return dict(self._compositeParents)
+
+    @contextmanager
+    def deferredRouteBuild(self):
+        """
+        Context manager which postpones the route computation of every `createTransition` call
+        made inside it until the outermost block exits.\n
+        Use it when creating many transitions at once to build the routes with a single pass.
+        """
+
+        self._deferredBuildDepth += 1
+        try:
+            yield self
+        finally:
+            self._deferredBuildDepth -= 1
+            if self._deferredBuildDepth == 0 and self._routesDirty:
+                self._buildRoutesGraph()
+        pass
+
     def createTransitionsFromDiagram(self, mermaidDiagram:str):
         """
         Dynamically creates the states and transitions from the provided mermaid diagram.\n
@@ -173,6 +682,23 @@ class FSM:
         self.mermaidHandler.createTransitionsFromDiagram(mermaidDiagram)
         pass
 
+    def createTransitionsFromStream(self, source, batchSize:int = 10000, progress = None) -> dict:
+        """
+        Creates the states and transitions of a Mermaid state diagram read line by line from a file or an iterable of lines,
+        in bounded memory and with the routes computed once at the end.\n
+        Pass a `LazyRouteStore` or a `CompactRouteStore` to the FSM for diagrams with millions of edges.
+        See `MermaidHandler.createTransitionsFromStream`.
+
+        Args:
+            source (:class:`str`, `os.PathLike` or `iterable`): The path of the diagram file or an iterable of its lines.
+            batchSize (:class:`int`, default = 10000): The number of edges registered per batch.
+            progress (:class:`func`, default = None): Called after every batch with the number of registered edges and the edges per second so far.
+
+        Returns:
+            A dictionary with the read `lines`, the registered `edges`, the elapsed `seconds` and the `edgesPerSecond`.
+        """
+        return self.mermaidHandler.createTransitionsFromStream(source, batchSize, progress)
+
     def _dynamicMethodWrapper(self, stateFuncTuple):
         """
         This method is a state function wrapper to add the `self return` at each state method.\n
@@ -191,39 +717,496 @@ class FSM:
             return self._addToDestQueue(stateFuncTuple[0].__name__, *args, **kwargs)
         return wrapper
 
-    def _addToDestQueue(self, methodName:str, *args):
+    def _addToDestQueue(self, methodName:str, *args, **kwargs):
         """
         Adds the passed method string and its arguments to the _destQueue of the FSM.
         
         Args:
             methodName (:class:`str`): The method name to add to the destination queue
-            args: The arguments to pass to the method.
+            args: The positional arguments to pass to the method.
+            kwargs: The keyword arguments to pass to the method.
         """
-        self._destQueue.put((methodName, *args))
+        if self._admissionChecks:
+            self._admitDestination(methodName)
+
+        if self._queuePolicies:
+            #FUSE reads the routes of the plan while the queue is locked, so the plan is compiled before taking the lock
+            if self._plan is None and queues.FUSE in self._queuePolicies and not args and not kwargs:
+                self.compile()
+            self._destQueue.putWith((methodName, args, kwargs), self._combineCommand)
+        else:
+            self._destQueue.put((methodName, args, kwargs))
+
+        if self._scheduler is not None:
+            self._scheduler.wake(self)
         return self
 
+    def _admitDestination(self, destStateName:str):
+        """
+        Raises a `ValueError` if the passed destination cannot be reached from the state the FSM will be in
+        once it consumed its queued destinations.
+        """
+
+        lastCommand = self._destQueue.last()
+        if lastCommand is not None:
+            fromState = lastCommand[0]
+        elif self._cachedDestState is not None:
+            fromState = self._cachedDestState[0]
+        else:
+            fromState = self.currentGraphState
+
+        if not self.getGraphAnalysis().canReach(fromState, destStateName):
+            raise ValueError("State " + destStateName + " cannot be reached from state " + fromState + ".")
+        pass
+
+    def _combineCommand(self, items, command:tuple):
+        """
+        Adds the passed command to the `deque` of the queued commands applying the queue policies of the FSM,
+        called by the destination queue while it is locked.
+        """
+
+        policies = self._queuePolicies
+        if queues.LATEST_WINS in policies:
+            self.droppedCommands += len(items)
+            items.clear()
+            items.append(command)
+            return
+
+        if items:
+            last = items[-1]
+            if queues.DEDUPE in policies and last[0] == command[0] and last[1] == command[1] and last[2] == command[2]:
+                self.dedupedCommands += 1
+                return
+
+            if queues.FUSE in policies and not last[1] and not last[2] and not command[1] and not command[2]:
+                #The route is taken from where the FSM will be once it reaches the last command, as in `_admitDestination`
+                if len(items) > 1:
+                    fromState = items[-2][0]
+                elif self._cachedDestState is not None:
+                    fromState = self._cachedDestState[0]
+                else:
+                    fromState = self.currentGraphState
+
+                if self._routePassesThrough(fromState, last[0], command[0]):
+                    items[-1] = command
+                    self.fusedCommands += 1
+                    return
+
+        items.append(command)
+        pass
+
+    def _routePassesThrough(self, stateName:str, waypointName:str, destStateName:str) -> bool:
+        """
+        Returns whether the route from the passed state to the destination state passes through the waypoint state,
+        False if it is unreachable or if the FSM has no compiled plan, as it is called while the queue is locked.
+        """
+
+        if stateName == waypointName:
+            return True
+
+        plan = self._plan
+        if plan is None:
+            return False
+
+        stateIds = plan.stateIds
+        if stateName not in stateIds or destStateName not in stateIds:
+            return False
+
+        try:
+            for stateRecord, transRecord in plan.iterHops(stateIds[stateName], stateIds[destStateName]):
+                if stateRecord[0] == waypointName:
+                    return True
+        except KeyError:
+            pass
+        return False
+
+    def _addRouteEdge(self, cStateName:str, nStateName:str, trName:str):
+        """
+        Adds the passed transition to the state graph and updates only the routes affected by it,
+        the updated routes are the ones a full rebuild computes.\n
+        Inside a `deferredRouteBuild` block the routes are only marked for a rebuild.
+
+        Args:
+            cStateName (:class:`str`): The source state name
+            nStateName (:class:`str`): The target state name
+            trName (:class:`str`): The transition name, if any
+        """
+
+        sort.addTransitionToGraph(self._stateGraph, cStateName, nStateName, trName)
+        self._plan = None
+        self._analysis = None
+
+        if self._deferredBuildDepth > 0 or self._routesDirty:
+            self._routesDirty = True
+            if self._deferredBuildDepth == 0:
+                self._buildRoutesGraph()
+            return
+
+        self._routeStore.addTransition(self._stateGraph, cStateName, nStateName, trName)
+        pass
+
     def _buildRoutesGraph(self):
         """
         Creates the routes graph containing all possible state transitions along with their shortest routes and transitions.
         """
         
-        graph = sort.buildStateGraph(self._statePairs)
-        self._routes = sort.findShortestRoutes(graph)
+        self._stateGraph = sort.buildStateGraph(self._statePairs)
+        self._routeStore.rebuild(self._stateGraph)
+        self._routesDirty = False
+        self._plan = None
+        self._analysis = None
         pass
 
-    def run(self):
+    def compile(self):
         """
-        Call this method to start the FSM normal execution of states and transitioning.
+        Compiles the registered states, transitions and routes into the `DispatchPlan` used by `run`.\n
+        The FSM compiles itself on the first traversal after its graph changes,
+        call this method to pay the compilation cost up front.
+
+        Returns:
+            The compiled `DispatchPlan`.
         """
-        while not self._destQueue.qsize() == 0:
-            if self.getInternalFsmState() is FSMStates.WAITING_FOR_CB:
-                break
 
-            cState, *args = self._destQueue.get()
-            self._traverseToState(cState, *args)
+        if self._plan is None:
+            #A restored FSM keeps its plan while the routes of its store are rebuilt on demand
+            if self._routesDirty:
+                self._buildRoutesGraph()
+
+            if self.isClosed():
+                raise RuntimeError("FSM with UID: " + str(self.uid) + " is closed.")
+            self._plan = self._instrumentPlan(plans.DispatchPlan(self._stateGraph, globals.gStates[self.uid], globals.gTransitions[self.uid], self._routeStore))
+
+        return self._plan
+
+    def _instrumentPlan(self, plan):
+        """
+        Returns the passed plan instrumented by the profiler and the trace recorder of the FSM, if any.
+        """
+
+        if self._profiler is not None:
+            plan = self._profiler.instrumentPlan(plan)
+        if self._tracer is not None:
+            plan = self._tracer.instrumentPlan(plan)
+        return plan
+
+    def enableProfiling(self, profiler):
+        """
+        Records the state and transition call times, route lengths, queue depths and callback waiting times of the FSM
+        in the passed profiler, which may be shared by many FSMs.\n
+        Only profiled FSMs run the instrumented code path.
+
+        Args:
+            profiler (:class:`Profiler`): The profiler recording the metrics.
+        """
+
+        self.disableProfiling()
+        self._profiler = profiler
+        profiler.attach(self)
+        self._plan = None
+        pass
+
+    def disableProfiling(self):
+        """
+        Stops profiling the FSM, it runs the plain code path again.
+        """
+
+        if self._profiler is None:
+            return
+
+        self._profiler.detach(self)
+        self._profiler = None
+        self._plan = None
+        pass
+
+    def recordTrace(self, recorder):
+        """
+        Appends a record of every state the FSM enters to the passed trace recorder.\n
+        Only recorded FSMs run the instrumented code path.
+
+        Args:
+            recorder (:class:`TraceRecorder`): The recorder of the FSM, a recorder can only record one FSM.
+        """
+
+        self.stopTrace()
+        self._tracer = recorder
+        recorder.attach(self)
+        self._plan = None
+        pass
+
+    def stopTrace(self):
+        """
+        Stops recording the FSM. The recorder is not closed.
+        """
+
+        if self._tracer is None:
+            return
+
+        self._tracer = None
+        self._plan = None
+        pass
+
+    def snapshot(self) -> dict:
+        """
+        Returns the runtime state of the FSM and its compiled definition as a dictionary,
+        which can be pickled and passed to `FSM.restore` in another process.\n
+        States and transitions are stored by name, event handlers, executors and schedulers are not stored.
+
+        Returns:
+            A dictionary with the snapshot `version`, the `definition` (the state pairs and the precomputed route tables)
+            and the `machine` (the initial, current and internal state, the cached destination and the queued destinations).
+        """
+
+        return {"version": self.SNAPSHOT_VERSION, "definition": self._snapshotDefinition(), "machine": self._snapshotMachine()}
+
+    @classmethod
+    def restore(cls, snapshot:dict, destQueue = None):
+        """
+        Creates a FSM from a `snapshot` result, resolving its states and transitions by name from the registered ones.\n
+        The precomputed routes of the snapshot are reused, so no route is computed until the graph changes.
+
+        Args:
+            snapshot (:class:`dict`): The snapshot of the FSM.
+            destQueue (:class:`DestQueue` or `ThreadSafeDestQueue`, default = None): The queue backend of the restored FSM.
+
+        Raises:
+            (:class:`ValueError`): if the snapshot version is not supported.
+            (:class:`KeyError`): if a state or transition of the snapshot is not registered.
+        """
+
+        _checkSnapshotVersion(snapshot)
+        definition = cls._restoreDefinition(snapshot["definition"])
+        return cls._restoreMachine(definition, snapshot["machine"], destQueue)
+
+    @classmethod
+    def snapshotAll(cls) -> dict:
+        """
+        Returns the snapshot of every open registered FSM, storing every distinct definition once.
+
+        Returns:
+            A dictionary with the snapshot `version`, the `definitions` list and the `machines` list,
+            where every machine refers to its definition by its index.
+        """
+
+        definitions = []
+        definitionIndices = {}
+        machines = []
+
+        for uid, fsm in sorted(globals.fsms.items()):
+            if fsm.isClosed():
+                continue
+
+            key = (type(fsm._routeStore).__name__, tuple((pair[0][0].__name__, pair[1][0].__name__, _transitionName(pair[2])) for pair in fsm._statePairs),
+                   fsm._costs.export(), tuple(sorted(fsm._levels.items())))
+            index = definitionIndices.get(key)
+            if index is None:
+                index = definitionIndices[key] = len(definitions)
+                definitions.append(fsm._snapshotDefinition())
+
+            machine = fsm._snapshotMachine()
+            machine["definition"] = index
+            machines.append(machine)
+
+        return {"version": cls.SNAPSHOT_VERSION, "definitions": definitions, "machines": machines}
+
+    @classmethod
+    def restoreAll(cls, snapshot:dict) -> list:
+        """
+        Creates the FSMs of a `snapshotAll` result. FSMs restored from the same definition share its state graph
+        and dispatch plan until their graph changes.
+
+        Returns:
+            The restored FSMs, in the order of the snapshot.
+
+        Raises:
+            (:class:`ValueError`): if the snapshot version is not supported.
+            (:class:`KeyError`): if a state or transition of the snapshot is not registered.
+        """
+
+        _checkSnapshotVersion(snapshot)
+        definitions = [cls._restoreDefinition(definition) for definition in snapshot["definitions"]]
+
+        #Every restored FSM allocates its piping wrappers, which would trigger repeated full collections
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            return [cls._restoreMachine(definitions[machine["definition"]], machine, None) for machine in snapshot["machines"]]
+        finally:
+            if gcEnabled:
+                gc.enable()
+
+    def _snapshotDefinition(self) -> dict:
+        """
+        Returns the serializable definition of the FSM: its states, transitions and state pairs by name and its route tables.
+        """
+
+        plan = self.compile()
+        return {
+            "routeStore": type(self._routeStore).__name__,
+            "states": [record[0] for record in plan.states],
+            "transitions": [record[0] for record in plan.transitions],
+            "pairs": [(pair[0][0].__name__, pair[1][0].__name__, _transitionName(pair[2])) for pair in self._statePairs],
+            "routeTables": plan.exportRouteTables(),
+            "costs": self._costs.export(),
+            "levels": tuple(sorted(self._levels.items())),
+            "composites": tuple(sorted(self._compositeParents.items())),
+        }
+
+    def _snapshotMachine(self) -> dict:
+        """
+        Returns the serializable runtime state of the FSM.
+        """
+
+        return {
+            "initialState": self.initialState,
+            "currentState": self.currentGraphState,
+            "internalState": self._fsmInternalState.name,
+            "cachedDestState": self._cachedDestState,
+            "destinations": self._destQueue.items(),
+        }
+
+    @staticmethod
+    def _restoreDefinition(definition:dict) -> dict:
+        """
+        Resolves the states and transitions of a serialized definition and rebuilds its graph and plan without computing any route.
+        """
+
+        states = {}
+        for stateName in definition["states"]:
+            if stateName not in globals.stateCache:
+                raise KeyError("State " + stateName + " of the snapshot is not registered.")
+            states[stateName] = globals.stateCache[stateName]
+
+        transitions = {}
+        for transName in definition["transitions"]:
+            if transName not in globals.transCache:
+                raise KeyError("Transition " + transName + " of the snapshot is not registered.")
+            transitions[transName] = globals.transCache[transName]
+
+        #The graph keeps the state order of the snapshot, which the route tables are indexed by
+        stateGraph = {stateName: [] for stateName in definition["states"]}
+        statePairs = []
+        for cStateName, nStateName, transName in definition["pairs"]:
+            stateGraph[cStateName].append((nStateName, transName))
+            statePairs.append((states[cStateName], states[nStateName], transitions[transName] if transName is not None else None))
+
+        routeStoreType = getattr(routing, definition["routeStore"])
+        routeTables = definition.get("routeTables")
+        plan = None
+        if routeTables is not None:
+            routeTables = plans.DispatchPlan.importRouteTables(routeTables, len(stateGraph))
+            plan = plans.DispatchPlan(stateGraph, states, transitions, routeStoreType(), routeTables)
+
+        return {"states": states, "transitions": transitions, "stateGraph": stateGraph, "statePairs": statePairs,
+                "routeStoreType": routeStoreType, "plan": plan, "costs": definition.get("costs"),
+                "levels": definition.get("levels", ()), "composites": definition.get("composites", ())}
+
+    @classmethod
+    def _restoreMachine(cls, definition:dict, machine:dict, destQueue):
+        """
+        Creates a FSM running the passed restored definition with the runtime state of the passed machine.
+        """
 
+        fsm = cls(machine["initialState"], definition["routeStoreType"](), destQueue)
+        fsm._applyDefinition(definition)
+
+        fsm.currentGraphState = machine["currentState"]
+        fsm._cachedDestState = machine["cachedDestState"]
+        for destination in machine["destinations"]:
+            fsm._destQueue.put(destination)
+
+        internalState = FSMStates[machine["internalState"]]
+        if internalState is FSMStates.WAITING_FOR_CB:
+            fsm._fsmInternalState = internalState
+        else:
+            fsm._determineInternalFsmState()
+        return fsm
+
+    def _applyDefinition(self, definition:dict):
+        """
+        Makes the FSM, which must have no transitions yet, run the passed restored definition,
+        sharing its state graph, state pairs and plan until its graph changes.\n
+        The route store of the FSM must be of the `routeStoreType` of the definition.
+        """
+
+        globals.gStates[self.uid].update(definition["states"])
+        globals.gTransitions[self.uid].update(definition["transitions"])
+
+        self._stateGraph = definition["stateGraph"]
+        self._statePairs = definition["statePairs"]
+        self._sharesDefinition = True
+        self._analysis = None
+        if definition["costs"] is not None:
+            self._costs.load(definition["costs"])
+        self._levels.update(definition["levels"])
+        self._compositeParents.update(definition["composites"])
+
+        if definition["plan"] is not None:
+            #The route store is only rebuilt if the routes are needed before the graph changes
+            self._plan = self._instrumentPlan(definition["plan"])
+            self._routesDirty = True
+        else:
+            self._plan = None
+            self._routeStore.rebuild(self._stateGraph)
+
+        for stateName, stateTuple in definition["states"].items():
+            if getattr(self, stateName, True) is not None:
+                setattr(self, stateName, self._dynamicMethodWrapper(stateTuple))
         pass
 
+    def run(self, maxSteps:int = None) -> int:
+        """
+        Call this method to start the FSM normal execution of states and transitioning.\n
+        The loop is a trampoline: a waiting state resumed by `nextState` continues here instead of
+        in a nested call, so the stack depth stays constant over any number of steps.
+
+        Args:
+            maxSteps (:class:`int`, default = None): The maximum number of queued destinations to consume, None to drain the queue.
+
+        Returns:
+            The number of queued destinations consumed.
+        """
+
+        #A run requested from inside a state is picked up by the active loop
+        if self._running:
+            return 0
+
+        destQueue = self._destQueue
+        steps = 0
+        self._running = True
+
+        try:
+            while True:
+                #Wait for the off-thread transition before continuing its route
+                if self._pendingTransition is not None:
+                    if not self._pendingTransition.done():
+                        break
+                    future = self._pendingTransition
+                    self._pendingTransition = None
+                    future.result()
+                    self._transitionCompleted = True
+
+                if self._fsmInternalState is FSMStates.WAITING_FOR_CB:
+                    if not self._takeResume():
+                        break
+                    self._determineInternalFsmState()
+
+                #Continue the route interrupted by a waiting state
+                if self._cachedDestState is not None:
+                    destStateName, args, kwargs = self._cachedDestState
+                    self._traverseToState(destStateName, *args, **kwargs)
+                    continue
+
+                if not destQueue.qsize() or (maxSteps is not None and steps >= maxSteps):
+                    break
+
+                cState, args, kwargs = destQueue.get()
+                self._traverseToState(cState, *args, **kwargs)
+                steps += 1
+        finally:
+            self._running = False
+
+        return steps
+
     def _traverseToState(self, destStateName:str, *args, **kwargs):
         """
         Traverses to the passed destination state from the current state the FSM is at.
@@ -236,63 +1219,139 @@ class FSM:
             kwargs: The arguments to pass to the destination method.
         """
         
-        self._cachedDestState = (destStateName, *args, *kwargs)
-        route = self._routes[self.currentGraphState][destStateName]
-        #print("Route to {} is {}".format(destStateName, str(route)))
+        plan = self._plan if self._plan is not None else self.compile()
+        stateReachedHandlers = self._stateReachedHandlers
+
+        self._cachedDestState = (destStateName, args, kwargs)
+        destRecord = plan.states[plan.stateIds[destStateName]]
+        hops = self._pendingHops
+        if hops is not None:
+            self._pendingHops = None
+        else:
+            hops = plan.iterHops(plan.stateIds[self.currentGraphState], plan.stateIds[destStateName])
+
+        #iterates in the compiled state-transition records of the route
+        for stateRecord, transRecord in hops:
+            fromState = self.currentGraphState
 
-        #iterates in the state-transition tuples inside the route queue
-        for stateTupple, transTuple in route:
             #Transition handling
-            if transTuple is not None:
-                self._setInternalFsmState(FSMStates.IN_TRANSITION)
-                trans, wfc = globals.gTransitions[self.uid][transTuple]
-                trans()
-                self._eventHandler.raiseEvent(self.EVENT_STATE_REACHED_NAME)
+            if transRecord is not None:
+                self._fsmInternalState = FSMStates.IN_TRANSITION
+                if self._transitionCompleted:
+                    self._transitionCompleted = False
+                elif transRecord[4] and self._executor is not None:
+                    #The route continues from the same hop once the transition completes
+                    self._pendingTransition = self._executor.submit(transRecord[1])
+                    self._pendingHops = itertools.chain(((stateRecord, transRecord),), hops)
+                    return
+                else:
+                    transRecord[1]()
+                if stateReachedHandlers:
+                    self._raiseEvent(stateReachedHandlers, fromState, stateRecord, transRecord, stateRecord is destRecord)
     
-            self._setInternalFsmState(FSMStates.IN_RUNNING_STATE)
+            self._fsmInternalState = FSMStates.IN_RUNNING_STATE
 
             #State handling
-            state, wfc = globals.gStates[self.uid][stateTupple]
-            self.currentGraphState = state.__name__
+            stateName, state, wfc, argsKind, stateId = stateRecord
+            self.currentGraphState = stateName
+            if wfc:
+                self._resetResume()
 
-            if state.__name__ is destStateName:
-                self._eventHandler.raiseEvent(self.EVENT_DESTINATION_REACHED_NAME)
+            if stateRecord is destRecord:
+                if self._destReachedHandlers:
+                    self._raiseEvent(self._destReachedHandlers, fromState, stateRecord, transRecord, True)
                 self._cachedDestState = None
                 
-                if inspect.signature(state).parameters:
-                    state(*args, **kwargs)
-                else:
-                    state()
+                globals._callWithArguments(state, argsKind, args, kwargs)
                     
             else:
-                self._eventHandler.raiseEvent(self.EVENT_STATE_REACHED_NAME)
+                if stateReachedHandlers:
+                    self._raiseEvent(stateReachedHandlers, fromState, stateRecord, transRecord, False)
                 state()
 
             self._determineInternalFsmState()
 
             #Do not continue on the next state if the currentState is waiting for a callback
             if wfc:
+                #The state already called nextState from its body
+                if self._takeResume():
+                    continue
+
                 self._setInternalFsmState(FSMStates.WAITING_FOR_CB)
                 break
+        else:
+            #The route is complete, even if it was empty
+            self._cachedDestState = None
         pass
     
+    def _raiseEvent(self, handlers:tuple, fromState:str, stateRecord:tuple, transRecord:tuple, isDestination:bool):
+        """
+        Fills the reused event record with the passed hop and calls the passed event handlers.
+        """
+
+        event = self._event
+        event.fromState = fromState
+        event.toState = stateRecord[0]
+        event.transition = transRecord[0] if transRecord is not None else None
+        event.isDestination = isDestination
+
+        for handler, takesEvent in handlers:
+            if takesEvent:
+                handler(event)
+            else:
+                handler()
+        pass
+
     def nextState(self):
         '''
         Pass this method as a callback function to an external source to continue with
-        the FSMs normal traversing flow. 
+        the FSMs normal traversing flow.\n
+        Called from inside a running state it only signals the `run` loop to continue after the state returns,
+        otherwise it resumes the FSM by driving the `run` loop itself, or by waking it on its `Scheduler`.
         '''
 
-        if self._cachedDestState == None:
-            self.run()
+        self._requestResume()
+        if self._running:
+            return
+
+        if self._scheduler is not None:
+            self._scheduler.wake(self)
         else:
-            self._traverseToState(self._cachedDestState[0], self._cachedDestState[1] if self._cachedDestState.__len__() > 1 else None)
+            self.run()
         pass
 
+    def _requestResume(self):
+        """
+        Records a `nextState` call for the state running or waiting for its callback, if any.
+        """
+
+        if self._running or self._fsmInternalState is FSMStates.WAITING_FOR_CB:
+            self._resumeRequested = True
+        pass
+
+    def _resetResume(self):
+        """
+        Forgets the `nextState` calls made before the waiting state about to run.
+        """
+
+        self._resumeRequested = False
+        pass
+
+    def _takeResume(self) -> bool:
+        """
+        Returns whether `nextState` was called for the waiting state, forgetting the call.
+        """
+
+        if self._resumeRequested:
+            self._resumeRequested = False
+            return True
+        return False
+
     def _determineInternalFsmState(self):
         """
         Sets the internal FSM state based on its self.currentState value.
         """
-        if self.currentGraphState is not self.initialState:
+        if self.currentGraphState != self.initialState:
             self._fsmInternalState = FSMStates.IDLING
         else:
             self._fsmInternalState = FSMStates.IN_INITIAL_STATE    
@@ -328,4 +1387,23 @@ class FSM:
         globals.gStates[self.uid][self.initialState]()
         self.currentGraphState = self.initialState
         pass
+
+
+def _transitionName(transition):
+    """
+    Returns the name of the passed transition function or tuple, None for instant transitions.
+    """
+
+    if transition is None:
+        return None
+    return transition[0].__name__ if isinstance(transition, tuple) else transition.__name__
+
+def _checkSnapshotVersion(snapshot:dict):
+    """
+    Raises a `ValueError` if the passed snapshot was created by an unsupported version.
+    """
+
+    if snapshot.get("version") != FSM.SNAPSHOT_VERSION:
+        raise ValueError("Unsupported FSM snapshot version: " + str(snapshot.get("version")))
+    pass
 #endregion
\ No newline at end of file
@@ -0,0 +1,267 @@
+import gc
+from collections import OrderedDict
+
+_EAGER_COMPONENTS = 1 << 14
+"""The most components whose reachability bitsets are all built up front, 32 MB at most"""
+_REACH_CACHE_BYTES = 1 << 25
+"""The most bytes of reachability bitsets kept above `_EAGER_COMPONENTS` components, the least recently used ones are dropped first"""
+
+def stronglyConnectedComponents(stateGraph:{}) -> list:
+    """
+    Returns the strongly connected components of the passed state graph as lists of state names,
+    in reverse topological order: every component only has transitions to itself and to the components before it.\n
+    It is an iterative Tarjan search, linear in the states and transitions and free of the recursion limit.
+    """
+
+    stateNames, adjacency = _indexGraph(stateGraph)
+    componentIds, componentCount = _componentIds(adjacency)
+
+    components = [[] for _ in range(componentCount)]
+    for stateId, componentId in enumerate(componentIds):
+        components[componentId].append(stateNames[stateId])
+    return components
+
+def _indexGraph(stateGraph:{}) -> tuple:
+    """
+    Returns the state names of the passed state graph and its adjacency lists of state indices.
+    """
+
+    stateNames = list(stateGraph)
+    stateIds = {stateName: stateId for stateId, stateName in enumerate(stateNames)}
+    adjacency = [[stateIds[nextState] for nextState, trans in stateGraph[stateName]] for stateName in stateNames]
+    return stateNames, adjacency
+
+def _componentIds(adjacency:list) -> tuple:
+    """
+    Returns the component index of every state of the passed adjacency lists, in reverse topological order, and the number of components.
+    """
+
+    stateCount = len(adjacency)
+    index = [-1] * stateCount
+    lowLink = [0] * stateCount
+    componentIds = [-1] * stateCount
+    stack = []
+    componentCount = 0
+    nextIndex = 0
+
+    for root in range(stateCount):
+        if index[root] >= 0:
+            continue
+
+        index[root] = lowLink[root] = nextIndex
+        nextIndex += 1
+        stack.append(root)
+        #The search path and the neighbour iterators of its states, visited neighbours are skipped without leaving the inner loop
+        path = [root]
+        iterators = [iter(adjacency[root])]
+
+        while path:
+            stateId = path[-1]
+            for nextState in iterators[-1]:
+                if index[nextState] < 0:
+                    index[nextState] = lowLink[nextState] = nextIndex
+                    nextIndex += 1
+                    stack.append(nextState)
+                    path.append(nextState)
+                    iterators.append(iter(adjacency[nextState]))
+                    break
+                #States of finished components are no longer on the stack
+                if componentIds[nextState] < 0 and index[nextState] < lowLink[stateId]:
+                    lowLink[stateId] = index[nextState]
+            else:
+                path.pop()
+                iterators.pop()
+                if path and lowLink[stateId] < lowLink[path[-1]]:
+                    lowLink[path[-1]] = lowLink[stateId]
+
+                if lowLink[stateId] == index[stateId]:
+                    while True:
+                        member = stack.pop()
+                        componentIds[member] = componentCount
+                        if member == stateId:
+                            break
+                    componentCount += 1
+
+    return componentIds, componentCount
+
+class GraphAnalysis:
+    """
+    The precomputed structure of a FSM state graph: its strongly connected components,
+    a reachability index answering whether a state can reach another in constant time,
+    and its dead-end, trap and unreachable states.\n
+    The index keeps one bitset of the reachable components per component, stored as bytes so a check indexes one byte
+    instead of shifting the whole bitset. Typical FSM graphs are mostly one large component,
+    so the bitsets are built up front in reverse topological order for up to 16384 components.
+    Above that the bitset of a component is built by a search of the component graph when it is needed,
+    which keeps the analysis linear in the transitions however many components the graph has,
+    and only the most recently used bitsets are kept, up to 32 MB.
+    """
+
+    def __init__(self, stateGraph:dict):
+        """
+        Analyses the passed state graph.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph created by `heuristics.buildStateGraph`.
+
+        Attributes:
+            ~ pyFsm.graphAnalysis.GraphAnalysis.components: The state names of every strongly connected component, in reverse topological order.
+            ~ pyFsm.graphAnalysis.GraphAnalysis.componentOf: The component index of every state, accessed by the state names.
+            ~ pyFsm.graphAnalysis.GraphAnalysis.successors: The indices of the other components every component has transitions to.
+            ~ pyFsm.graphAnalysis.GraphAnalysis._reach: The byte bitsets of the components every component can reach, itself included,
+              a list of every bitset up to `_EAGER_COMPONENTS` components, else the recently used ones in least recently used order.
+            ~ pyFsm.graphAnalysis.GraphAnalysis._reachLimit: The most bitsets kept in `_reach`, None when every bitset is kept.
+            ~ pyFsm.graphAnalysis.GraphAnalysis._stateGraph: The analysed state graph.
+        """
+
+        #The analysis allocates containers per state, which would trigger repeated full collections on large graphs
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            stateNames, adjacency = _indexGraph(stateGraph)
+            componentIds, componentCount = _componentIds(adjacency)
+        finally:
+            if gcEnabled:
+                gc.enable()
+
+        self.components = [[] for _ in range(componentCount)]
+        """The state names of every strongly connected component, in reverse topological order."""
+        self.componentOf = dict(zip(stateNames, componentIds))
+        """The component index of every state, accessed by the state names."""
+        self.successors = [[] for _ in range(componentCount)]
+        """The indices of the other components every component has transitions to."""
+
+        self._reach = [None] * componentCount if componentCount <= _EAGER_COMPONENTS else OrderedDict()
+        """The byte bitsets of the components every component can reach, itself included."""
+        self._reachLimit = None if componentCount <= _EAGER_COMPONENTS else max(1, _REACH_CACHE_BYTES // (componentCount // 8 + 1))
+        """The most bitsets kept in `_reach`, None when every bitset is kept."""
+        self._stateGraph = stateGraph
+        """The analysed state graph."""
+
+        components = self.components
+        successors = self.successors
+        for stateId, componentId in enumerate(componentIds):
+            components[componentId].append(stateNames[stateId])
+            for nextState in adjacency[stateId]:
+                nextComponent = componentIds[nextState]
+                if nextComponent != componentId:
+                    successors[componentId].append(nextComponent)
+
+        for componentId, componentSuccessors in enumerate(successors):
+            if len(componentSuccessors) > 1:
+                successors[componentId] = list(set(componentSuccessors))
+
+        #Successor components always come first in reverse topological order, so their bitsets are complete
+        if self._reachLimit is None:
+            reach = self._reach
+            for componentId, componentSuccessors in enumerate(successors):
+                bits = 1 << componentId
+                for nextComponent in componentSuccessors:
+                    bits |= reach[nextComponent]
+                reach[componentId] = bits
+
+            byteCount = componentCount // 8 + 1
+            for componentId, bits in enumerate(reach):
+                reach[componentId] = bits.to_bytes(byteCount, "little")
+        pass
+
+    def reach(self, componentId:int) -> int:
+        """
+        Returns the bitset of the components the passed component can reach, itself included.
+        """
+        return int.from_bytes(self._reachBits(componentId), "little")
+
+    def _reachBits(self, componentId:int):
+        """
+        Returns the byte bitset of the components the passed component can reach, searching it if it is not kept.
+        """
+
+        reach = self._reach
+        if self._reachLimit is None:
+            return reach[componentId]
+
+        bits = reach.get(componentId)
+        if bits is not None:
+            reach.move_to_end(componentId)
+            return bits
+
+        bits = reach[componentId] = self._searchReach(componentId)
+        if len(reach) > self._reachLimit:
+            reach.popitem(last = False)
+        return bits
+
+    def canReach(self, stateName:str, destStateName:str) -> bool:
+        """
+        Returns whether the destination state can be reached from the passed state, False if either state is not in the graph.
+        """
+
+        componentOf = self.componentOf
+        component = componentOf.get(stateName)
+        destComponent = componentOf.get(destStateName)
+        if component is None or destComponent is None:
+            return False
+        return component == destComponent or (self._reachBits(component)[destComponent >> 3] >> (destComponent & 7)) & 1 == 1
+
+    def reachableStates(self, stateName:str) -> set:
+        """
+        Returns the names of the states reachable from the passed state, itself included.
+
+        Raises:
+            (:class:`KeyError`): if the state is not in the graph.
+        """
+
+        reachable = self._reachBits(self.componentOf[stateName])
+        states = set()
+        for componentId, component in enumerate(self.components):
+            if (reachable[componentId >> 3] >> (componentId & 7)) & 1:
+                states.update(component)
+        return states
+
+    def unreachableStates(self, initialState:str) -> list:
+        """
+        Returns the names of the states which cannot be reached from the passed initial state, every state if it is not in the graph.
+        """
+
+        if initialState not in self.componentOf:
+            return list(self._stateGraph)
+
+        reachable = self._reachBits(self.componentOf[initialState])
+        componentOf = self.componentOf
+        return [stateName for stateName in self._stateGraph
+                if not (reachable[componentOf[stateName] >> 3] >> (componentOf[stateName] & 7)) & 1]
+
+    def deadEndStates(self) -> list:
+        """
+        Returns the names of the states without outgoing transitions.
+        """
+        return [stateName for stateName, edges in self._stateGraph.items() if not edges]
+
+    def trapStates(self) -> list:
+        """
+        Returns the names of the states which can never leave their strongly connected component,
+        the states of every component without transitions to other components, dead ends included.
+        When the whole graph is one component there are none.
+        """
+
+        if len(self.components) < 2:
+            return []
+
+        return [stateName for componentId, component in enumerate(self.components)
+                if not self.successors[componentId] for stateName in component]
+
+    def _searchReach(self, componentId:int) -> bytearray:
+        """
+        Returns the byte bitset of the components the passed component can reach with a search of the component graph.
+        """
+
+        visited = bytearray(len(self.components) // 8 + 1)
+        visited[componentId >> 3] |= 1 << (componentId & 7)
+        stack = [componentId]
+        successors = self.successors
+
+        while stack:
+            for nextComponent in successors[stack.pop()]:
+                if not (visited[nextComponent >> 3] >> (nextComponent & 7)) & 1:
+                    visited[nextComponent >> 3] |= 1 << (nextComponent & 7)
+                    stack.append(nextComponent)
+        return visited
@@ -1,4 +1,5 @@
 from collections import deque
+import heapq
 
 def buildStateGraph(statePairs:[]) -> dict:
     """
@@ -32,6 +33,9 @@ def buildStateGraph(statePairs:[]) -> dict:
 def findShortestRoutes(stateGraph:{}) -> dict:
     """
     Creates a dictionary which contains the shortest route from one state to all of the other states.\n
+    Routes of equal length are broken by the order the transitions were created: the stored route is the one
+    whose transitions, compared hop by hop from the start state, were created first from their states,
+    which is the route a BFS visiting the transitions of every state in creation order discovers first.
     Accessible by the state names.
     """
     
@@ -52,4 +56,291 @@ def findShortestRoutes(stateGraph:{}) -> dict:
                     if nextState not in visited:
                         queue.append((nextState, path + [(nextState, trans)]))
 
-    return shortestRoutes
\ No newline at end of file
+    return shortestRoutes
+
+def addTransitionToGraph(stateGraph:{}, stateName:str, nextStateName:str, transName:str) -> list:
+    """
+    Adds a single state -> state transition to an existing state graph in place.\n
+    Returns the list of state names that were not part of the graph before the call.
+    """
+
+    newStates = []
+    for name in (stateName, nextStateName):
+        if name not in stateGraph:
+            stateGraph[name] = []
+            newStates.append(name)
+
+    stateGraph[stateName].append((nextStateName, transName))
+
+    return newStates
+
+def updateShortestRoutes(shortestRoutes:{}, stateGraph:{}, stateName:str, nextStateName:str, transName:str) -> dict:
+    """
+    Updates the shortest routes dictionary in place after the stateName -> nextStateName transition
+    has been added to the state graph.\n
+    Only the routes the new transition shortens, or precedes under the tie rule of `findShortestRoutes`, are rebuilt,
+    so adding an edge costs the size of the affected region instead of a full all-pairs BFS
+    and the routes stay the ones `findShortestRoutes` computes for the whole graph.
+    """
+
+    for name in (stateName, nextStateName):
+        if name not in shortestRoutes:
+            shortestRoutes[name] = {name: []}
+
+    for startState, routes in shortestRoutes.items():
+        srcRoute = routes.get(stateName)
+        if srcRoute is None:
+            continue
+
+        hop = (nextStateName, transName)
+        if not _precedesRoute(stateGraph, startState, srcRoute, hop, routes.get(nextStateName)):
+            continue
+
+        routes[nextStateName] = srcRoute + [hop]
+
+        #Propagates the preceding route to the states reachable from the new target
+        queue = deque([nextStateName])
+        while queue:
+            currentState = queue.popleft()
+            path = routes[currentState]
+
+            for hop in stateGraph[currentState]:
+                if _precedesRoute(stateGraph, startState, path, hop, routes.get(hop[0])):
+                    routes[hop[0]] = path + [hop]
+                    queue.append(hop[0])
+
+    return shortestRoutes
+
+def _precedesRoute(stateGraph:{}, startState:str, route:list, hop:tuple, otherRoute:list) -> bool:
+    """
+    Returns whether the route from the start state extended by the passed `(nextStateName, transName)` hop
+    comes before the other route to the same state under the tie rule of `findShortestRoutes`:
+    shorter routes first, then the route leaving the first state the two routes part at through the earlier created transition.
+    Any route precedes a missing one.
+    """
+
+    if otherRoute is None:
+        return True
+
+    length = len(route)
+    if length + 1 != len(otherRoute):
+        return length + 1 < len(otherRoute)
+
+    #Routes extended from the same route only part at their last hop, which is checked without a Python loop
+    if otherRoute[:length] == route:
+        currentState = route[-1][0] if length else startState
+        ownHop, otherHop = hop, otherRoute[length]
+        if ownHop == otherHop:
+            return False
+    else:
+        currentState = startState
+        for ownHop, otherHop in zip(route, otherRoute):
+            if ownHop != otherHop:
+                break
+            currentState = ownHop[0]
+
+    transitions = stateGraph[currentState]
+    return transitions.index(ownHop) < transitions.index(otherHop)
+
+def buildReverseStateGraph(stateGraph:{}) -> dict:
+    """
+    Creates the reversed state graph of the passed state graph.\n
+    Returns a dictionary containing all the transitions leading into a state
+    as `(previousStateName, transName)` tuples with stateNames as keys.
+    """
+
+    reverseGraph = {}
+    for stateName in stateGraph:
+        reverseGraph.setdefault(stateName, [])
+        for nextState, trans in stateGraph[stateName]:
+            reverseGraph.setdefault(nextState, []).append((stateName, trans))
+
+    return reverseGraph
+
+def findShortestRoute(stateGraph:{}, startState:str, destState:str) -> list:
+    """
+    Finds the shortest route from the start state to the destination state with a BFS that stops
+    as soon as the destination is discovered.\n
+    Returns the same route `findShortestRoutes` stores for the pair or None if the destination is unreachable.
+    """
+
+    if startState not in stateGraph or destState not in stateGraph:
+        return None
+
+    parents = {startState: None}
+    queue = deque([startState])
+
+    while queue and destState not in parents:
+        currentState = queue.popleft()
+        for nextState, trans in stateGraph[currentState]:
+            if nextState not in parents:
+                parents[nextState] = (currentState, trans)
+                queue.append(nextState)
+
+    return _routeFromParents(parents, destState)
+
+def findShortestRouteBidirectional(stateGraph:{}, reverseGraph:{}, startState:str, destState:str) -> list:
+    """
+    Finds a shortest route from the start state to the destination state by expanding a forward BFS
+    from the start state and a backward BFS from the destination state, one level at a time on the smaller frontier.\n
+    Returns a route of the same length as `findShortestRoute` or None if the destination is unreachable.
+    """
+
+    if startState not in stateGraph or destState not in stateGraph:
+        return None
+
+    if startState == destState:
+        return []
+
+    parents = {startState: None}
+    children = {destState: None}
+    forward = [startState]
+    backward = [destState]
+
+    while forward and backward:
+        meeting = None
+
+        if len(forward) <= len(backward):
+            nextFrontier = []
+            for currentState in forward:
+                for nextState, trans in stateGraph[currentState]:
+                    if nextState not in parents:
+                        parents[nextState] = (currentState, trans)
+                        nextFrontier.append(nextState)
+                        if meeting is None and nextState in children:
+                            meeting = nextState
+            forward = nextFrontier
+        else:
+            nextFrontier = []
+            for currentState in backward:
+                for prevState, trans in reverseGraph[currentState]:
+                    if prevState not in children:
+                        children[prevState] = (currentState, trans)
+                        nextFrontier.append(prevState)
+                        if meeting is None and prevState in parents:
+                            meeting = prevState
+            backward = nextFrontier
+
+        if meeting is not None:
+            route = _routeFromParents(parents, meeting)
+            stateName = meeting
+            while children[stateName] is not None:
+                nextState, trans = children[stateName]
+                route.append((nextState, trans))
+                stateName = nextState
+            return route
+
+    return None
+
+def buildWeightedStateGraph(stateGraph:{}, costOf) -> dict:
+    """
+    Creates the weighted state graph of the passed state graph.\n
+    Returns a dictionary containing all the transitions from a state as `(nextStateName, transName, cost)` tuples
+    with stateNames as keys, where the cost is `costOf(stateName, nextStateName, transName)`.
+
+    Raises:
+        (:class:`ValueError`): if a transition has a negative cost.
+    """
+
+    weightedGraph = {}
+    for stateName, transitions in stateGraph.items():
+        weightedEdges = weightedGraph[stateName] = []
+        for nextState, trans in transitions:
+            cost = costOf(stateName, nextState, trans)
+            if cost < 0:
+                raise ValueError("The transition from " + stateName + " to " + nextState + " has a negative cost.")
+            weightedEdges.append((nextState, trans, cost))
+
+    return weightedGraph
+
+def findCheapestRoutes(stateGraph:{}, costOf) -> dict:
+    """
+    Creates a dictionary which contains the cheapest route from one state to all of the other states
+    with a Dijkstra search from every state, where `costOf(stateName, nextStateName, transName)` returns the cost of a transition.\n
+    Routes of equal cost are broken by their number of hops. Accessible by the state names.
+    """
+
+    weightedGraph = buildWeightedStateGraph(stateGraph, costOf)
+    cheapestRoutes = {}
+
+    for startState in weightedGraph:
+        routes = cheapestRoutes[startState] = {}
+        #States are settled after their parents, so the parent route is always complete
+        for stateName, parent in _searchCheapest(weightedGraph, startState, None, None):
+            routes[stateName] = routes[parent[0]] + [(stateName, parent[1])] if parent is not None else []
+
+    return cheapestRoutes
+
+def findCheapestRoute(weightedGraph:{}, startState:str, destState:str, heuristic = None) -> list:
+    """
+    Finds the cheapest route from the start state to the destination state of a `buildWeightedStateGraph` graph
+    with a Dijkstra search that stops as soon as the destination is settled.\n
+    With a heuristic it is an A* search: `heuristic(stateName, destStateName)` must return a lower bound of the cost
+    left from the state to the destination, otherwise the route may not be the cheapest.\n
+    Returns a route of the same cost as the one `findCheapestRoutes` stores for the pair or None if the destination is unreachable.
+    """
+
+    if startState not in weightedGraph or destState not in weightedGraph:
+        return None
+
+    parents = {}
+    for stateName, parent in _searchCheapest(weightedGraph, startState, destState, heuristic):
+        parents[stateName] = parent
+        if stateName == destState:
+            return _routeFromParents(parents, destState)
+
+    return None
+
+def _searchCheapest(weightedGraph:{}, startState:str, destState:str, heuristic):
+    """
+    Yields the `(stateName, parent)` pairs of the states of a weighted graph in the order a Dijkstra or A* search settles them,
+    where the parent is the `(previousStateName, transName)` tuple of the cheapest route or None for the start state.
+    """
+
+    costs = {startState: (0, 0)}
+    parents = {startState: None}
+    settled = set()
+    counter = 0
+    heap = [(heuristic(startState, destState) if heuristic is not None else 0, 0, counter, startState)]
+
+    while heap:
+        stateName = heapq.heappop(heap)[3]
+        if stateName in settled:
+            continue
+
+        settled.add(stateName)
+        yield stateName, parents[stateName]
+
+        cost, hops = costs[stateName]
+        for nextState, trans, edgeCost in weightedGraph[stateName]:
+            if nextState in settled:
+                continue
+
+            #The number of hops breaks the ties, so free instant transitions are not walked needlessly
+            nextCost = (cost + edgeCost, hops + 1)
+            best = costs.get(nextState)
+            if best is None or nextCost < best:
+                costs[nextState] = nextCost
+                parents[nextState] = (stateName, trans)
+                counter += 1
+                priority = nextCost[0] + heuristic(nextState, destState) if heuristic is not None else nextCost[0]
+                heapq.heappush(heap, (priority, nextCost[1], counter, nextState))
+
+def _routeFromParents(parents:{}, destState:str) -> list:
+    """
+    Rebuilds the `(stateName, transName)` route ending at the destination state from a BFS parents dictionary.\n
+    Returns None if the destination state was never discovered.
+    """
+
+    if destState not in parents:
+        return None
+
+    route = []
+    stateName = destState
+    while parents[stateName] is not None:
+        prevState, trans = parents[stateName]
+        route.append((stateName, trans))
+        stateName = prevState
+
+    route.reverse()
+    return route
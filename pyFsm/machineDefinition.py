@@ -0,0 +1,315 @@
+from . import fsmGlobals as globals
+from . import heuristics as sort
+from . import routeStores as routing
+from . import dispatchPlan as plans
+from .fsmLib import FSMStates
+
+from collections import deque
+from types import MethodType
+
+class MachineDefinition:
+    """
+    An immutable, compiled FSM graph shared by any number of `MachineInstance` objects.\n
+    The state graph, the routes and the `DispatchPlan` are built once, every instance only keeps its own runtime state.
+    """
+
+    def __init__(self, initialState:str, stateGraph:dict, routeStore, plan):
+        """
+        Constructs a machine definition from an already compiled graph.\n
+        Use `MachineDefinition.fromFsm` or `MachineDefinition.fromTransitions` to build one.
+
+        Args:
+            initialState (:class:`str`): The initial state name of the instances.
+            stateGraph (:class:`dict`): The state graph created by `heuristics.buildStateGraph`.
+            routeStore (:class:`EagerRouteStore`, `LazyRouteStore` or `CompactRouteStore`): The route store of the graph.
+            plan (:class:`DispatchPlan`): The compiled dispatch plan of the graph.
+
+        Attributes:
+            ~ pyFsm.machineDefinition.MachineDefinition.initialState: The initial state name of the instances.
+            ~ pyFsm.machineDefinition.MachineDefinition.initialStateId: The initial state ID of the instances.
+            ~ pyFsm.machineDefinition.MachineDefinition.stateGraph: The state graph of the definition.
+            ~ pyFsm.machineDefinition.MachineDefinition.routeStore: The route store of the definition.
+            ~ pyFsm.machineDefinition.MachineDefinition.plan: The compiled dispatch plan shared by the instances.
+            ~ pyFsm.machineDefinition.MachineDefinition._queueingFunctions: The functions queueing a state as a destination of the instance passed to them, accessed by the state names.
+            ~ pyFsm.machineDefinition.MachineDefinition._instanceType: The `MachineInstance` subclass spawned by the definition, whose methods are the queueing functions of the states.
+        """
+
+        self.initialState = initialState
+        """The initial state name of the instances."""
+        self.initialStateId = plan.stateIds[initialState]
+        """The initial state ID of the instances."""
+        self.stateGraph = stateGraph
+        """The state graph of the definition."""
+        self.routeStore = routeStore
+        """The route store of the definition."""
+        self.plan = plan
+        """The compiled dispatch plan shared by the instances."""
+
+        self._queueingFunctions = {stateName: _queueingFunction(stateId) for stateName, stateId in plan.stateIds.items()}
+        """The functions queueing a state as a destination of the instance passed to them, accessed by the state names."""
+        self._instanceType = type(MachineInstance.__name__, (MachineInstance,), dict(
+            {stateName: func for stateName, func in self._queueingFunctions.items() if not hasattr(MachineInstance, stateName)},
+            __slots__ = ()))
+        """The `MachineInstance` subclass spawned by the definition, whose methods are the queueing functions of the states."""
+        pass
+
+    def getQueueingFunction(self, stateName:str):
+        """
+        Returns the function `queue(instance, *args, **kwargs)` queueing the passed state as a destination of the passed instance.\n
+        The function is created once per state and shared by every instance of the definition.
+
+        Raises:
+            (:class:`AttributeError`): if the definition has no such state.
+        """
+
+        queueingFunction = self._queueingFunctions.get(stateName)
+        if queueingFunction is None:
+            raise AttributeError(stateName)
+        return queueingFunction
+
+    @classmethod
+    def fromFsm(cls, fsm):
+        """
+        Builds a machine definition sharing the compiled graph and routes of the passed FSM.
+
+        Args:
+            fsm (:class:`FSM`): The FSM whose transitions are already created.
+        """
+
+        plan = fsm.compile()
+        return cls(fsm.initialState, fsm._stateGraph, fsm.getRouteStore(), plan)
+
+    @classmethod
+    def fromTransitions(cls, initialState, transitions, routeStore = None):
+        """
+        Builds a machine definition from the passed state transitions without registering a FSM.
+
+        Args:
+            initialState (:class:`str` or `func`): The initial state of the instances.
+            transitions (:class:`iterable`): `(currentState, nextState)` or `(currentState, nextState, transition)` tuples, as in `FSM.createTransitions`.
+            routeStore (:class:`EagerRouteStore`, `LazyRouteStore` or `CompactRouteStore`, default = None): The route store of the definition.
+        """
+
+        states = {}
+        transFuncs = {}
+        statePairs = []
+
+        for stateTransition in transitions:
+            cState, nState = stateTransition[0], stateTransition[1]
+            trans = stateTransition[2] if len(stateTransition) > 2 else None
+
+            cStateName = cState[0].__name__ if isinstance(cState, tuple) else cState.__name__
+            nStateName = nState[0].__name__ if isinstance(nState, tuple) else nState.__name__
+            states[cStateName] = globals.stateCache[cStateName]
+            states[nStateName] = globals.stateCache[nStateName]
+
+            if trans is not None:
+                trName = trans[0].__name__ if isinstance(trans, tuple) else trans.__name__
+                transFuncs[trName] = globals.transCache[trName]
+
+            statePairs.append((states[cStateName], states[nStateName], trans))
+
+        stateGraph = sort.buildStateGraph(statePairs)
+        routeStore = routeStore if routeStore is not None else routing.EagerRouteStore()
+        routeStore.rebuild(stateGraph)
+        plan = plans.DispatchPlan(stateGraph, states, transFuncs, routeStore)
+
+        initialStateName = initialState.__name__ if not isinstance(initialState, str) else initialState
+        return cls(initialStateName, stateGraph, routeStore, plan)
+
+    def spawn(self):
+        """
+        Creates a new `MachineInstance` of this definition in its initial state.\n
+        The instance is of a subclass shared by the instances of the definition whose methods queue the states,
+        so piping a state is a plain method call.
+        """
+
+        return self._instanceType(self)
+
+class MachineInstance:
+    """
+    A lightweight FSM instance running a shared `MachineDefinition`.\n
+    It only holds its current state ID, internal `FSMStates` value, pending destinations and cached destination,
+    and it raises no events. Queued destinations are piped like on a FSM, e.g. `instance.fire(5).idle().run()`.
+    """
+
+    __slots__ = ("definition", "stateId", "internalState", "_destQueue", "_cachedDestState", "_running", "_resumeRequested")
+
+    def __init__(self, definition:MachineDefinition):
+        """
+        Constructs an instance of the passed definition in its initial state.
+
+        Args:
+            definition (:class:`MachineDefinition`): The shared machine definition.
+
+        Attributes:
+            ~ pyFsm.machineDefinition.MachineInstance.definition: The shared machine definition.
+            ~ pyFsm.machineDefinition.MachineInstance.stateId: The current state ID.
+            ~ pyFsm.machineDefinition.MachineInstance.internalState: The `FSMStates` state of the instance.
+            ~ pyFsm.machineDefinition.MachineInstance._destQueue: The piped destinations, None until the first one is queued.
+            ~ pyFsm.machineDefinition.MachineInstance._cachedDestState: The `(destStateId, args, kwargs)` of the destination being traversed to.
+            ~ pyFsm.machineDefinition.MachineInstance._running: Whether the `run` loop is currently driving the instance.
+            ~ pyFsm.machineDefinition.MachineInstance._resumeRequested: Whether `nextState` was called for the state currently running or waiting.
+        """
+
+        self.definition = definition
+        self.stateId = definition.initialStateId
+        self.internalState = FSMStates.IN_INITIAL_STATE
+        self._destQueue = None
+        self._cachedDestState = None
+        self._running = False
+        self._resumeRequested = False
+        pass
+
+    def __getattr__(self, stateName:str):
+        """
+        Returns a method which queues the passed state as a destination, enabling method piping.\n
+        Spawned instances find their queueing methods on their class, this binds the queueing function
+        the definition keeps for the state to instances created directly.
+
+        Raises:
+            (:class:`AttributeError`): if the definition has no such state.
+        """
+
+        return MethodType(self.definition.getQueueingFunction(stateName), self)
+
+    def getCurrentFsmState(self) -> str:
+        """
+        Returns the current state name the instance is at.
+        """
+        return self.definition.plan.states[self.stateId][0]
+
+    def getInternalFsmState(self):
+        """
+        Returns the internal state of the instance.
+        """
+        return self.internalState
+
+    def goTo(self, stateName:str, *args, **kwargs):
+        """
+        Queues the passed state as a destination of the instance.
+
+        Args:
+            stateName (:class:`str`): The destination state name.
+            args: The positional arguments to pass to the destination state.
+            kwargs: The keyword arguments to pass to the destination state.
+        """
+
+        if self._destQueue is None:
+            self._destQueue = deque()
+
+        self._destQueue.append((self.definition.plan.stateIds[stateName], args, kwargs))
+        return self
+
+    def run(self, maxSteps:int = None) -> int:
+        """
+        Consumes the queued destinations with the same trampoline loop as `FSM.run`.
+
+        Args:
+            maxSteps (:class:`int`, default = None): The maximum number of queued destinations to consume, None to drain the queue.
+
+        Returns:
+            The number of queued destinations consumed.
+        """
+
+        if self._running:
+            return 0
+
+        steps = 0
+        self._running = True
+
+        try:
+            while True:
+                if self.internalState is FSMStates.WAITING_FOR_CB:
+                    if not self._resumeRequested:
+                        break
+                    self._resumeRequested = False
+                    self.internalState = self._restingState()
+
+                if self._cachedDestState is not None:
+                    destStateId, args, kwargs = self._cachedDestState
+                    self._traverseToState(destStateId, args, kwargs)
+                    continue
+
+                if not self._destQueue or (maxSteps is not None and steps >= maxSteps):
+                    break
+
+                destStateId, args, kwargs = self._destQueue.popleft()
+                self._traverseToState(destStateId, args, kwargs)
+                steps += 1
+        finally:
+            self._running = False
+
+        return steps
+
+    def nextState(self):
+        """
+        Continues the traversal of an instance waiting on a callback, as `FSM.nextState` does.
+        """
+
+        if self._running or self.internalState is FSMStates.WAITING_FOR_CB:
+            self._resumeRequested = True
+
+        if not self._running:
+            self.run()
+        pass
+
+    def _traverseToState(self, destStateId:int, args:tuple, kwargs:dict):
+        """
+        Traverses to the passed destination state ID through the shared dispatch plan.
+        """
+
+        plan = self.definition.plan
+        destRecord = plan.states[destStateId]
+        self._cachedDestState = (destStateId, args, kwargs)
+
+        for stateRecord, transRecord in plan.iterHops(self.stateId, destStateId):
+            if transRecord is not None:
+                self.internalState = FSMStates.IN_TRANSITION
+                transRecord[1]()
+
+            self.internalState = FSMStates.IN_RUNNING_STATE
+            stateName, state, wfc, argsKind, stateId = stateRecord
+            self.stateId = stateId
+            self._resumeRequested = False
+
+            if stateRecord is destRecord:
+                self._cachedDestState = None
+                globals._callWithArguments(state, argsKind, args, kwargs)
+            else:
+                state()
+
+            self.internalState = self._restingState()
+
+            #Do not continue on the next state if the currentState is waiting for a callback
+            if wfc:
+                if self._resumeRequested:
+                    self._resumeRequested = False
+                    continue
+
+                self.internalState = FSMStates.WAITING_FOR_CB
+                break
+        else:
+            self._cachedDestState = None
+        pass
+
+    def _restingState(self):
+        """
+        Returns the `FSMStates` value of the instance when it is not running a state.
+        """
+        return FSMStates.IN_INITIAL_STATE if self.stateId == self.definition.initialStateId else FSMStates.IDLING
+
+def _queueingFunction(destStateId:int):
+    """
+    Returns the function queueing the passed state ID as a destination of the instance passed to it.
+    """
+
+    def queue(instance, *args, **kwargs):
+        #Do not continue on the next state if the currentState is waiting for a callback
+        if instance.internalState is FSMStates.WAITING_FOR_CB:
+            return
+        if instance._destQueue is None:
+            instance._destQueue = deque()
+        instance._destQueue.append((destStateId, args, kwargs))
+        return instance
+    return queue
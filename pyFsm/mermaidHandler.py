@@ -1,9 +1,235 @@
 from .fsmGlobals import *
 from .fsmLib import *
 
+from . import routeStores as routing
+#The FSM class is only defined once fsmLib, which imports this module, finishes loading
+from . import fsmLib
+
 #Merparser import
 from .pyStateGram.pystategram import *
 
+from sys import intern
+from time import perf_counter
+import hashlib
+import os
+import pickle
+import re
+import struct
+
+DIAGRAM_CACHE_VERSION = 2
+"""The version of the diagram cache files, files of other versions are ignored"""
+
+_CACHE_MAGIC = b"PYFSMDGM"
+"""The magic bytes every diagram cache file starts with"""
+_CACHE_HEADER = struct.Struct("<8sHQ")
+"""The header of a diagram cache file: the magic bytes, the cache version and the payload size"""
+_CACHE_SUFFIX = ".fsmdiagram"
+"""The file name suffix of the diagram cache files"""
+
+_EDGE_PATTERN = re.compile(r'^\s*(\w+)\s*-->\s*(\w+)\s*(?::\s*(?:"?(\w+)"?)?\s*(?:\[cost\s*=\s*([^\]\s]+)\s*\])?)?\s*$')
+"""The `src --> dst` or `src --> dst: "trans"` lines read by the streaming loader, optionally ending with a `[cost=2.5]` annotation"""
+_COST_ANNOTATION = re.compile(r'\s*\[cost\s*=[^\]]*\]')
+"""The `[cost=2.5]` annotation of a transition label"""
+_COMPOSITE_START = re.compile(r'^\s*state\s+(\w+)\s*\{\s*$')
+"""The `state X {` line opening the block of a composite state"""
+_COMPOSITE_END = re.compile(r'^\s*\}\s*$')
+"""The `}` line closing the block of a composite state"""
+_BLOCK_EDGE_PATTERN = re.compile(r'^\s*(\[\*\]|\w+)\s*-->\s*(\[\*\]|\w+)\s*(?::\s*(?:"?(\w+)"?)?\s*(?:\[cost\s*=\s*([^\]\s]+)\s*\])?)?\s*$')
+"""The edge lines of a composite state block, where `[*] --> a` enters the sub-machine and `a --> [*]` leaves it"""
+
+class CachedDiagram:
+    """
+    A cached Mermaid diagram: its parsed `DiagramPackage` and the serialized FSM definitions compiled from it,
+    see `FSM.snapshot`, one per route store type and settings.
+    """
+
+    def __init__(self, package, definitions:dict = None):
+        """
+        Constructs a cached diagram.
+
+        Args:
+            package (:class:`DiagramPackage`): The parsed diagram.
+            definitions (:class:`dict`, default = None): The serialized definitions accessed by their route store keys, see `_definitionKey`.
+
+        Attributes:
+            ~ pyfsm.mermaidHandler.CachedDiagram.package: The parsed diagram.
+            ~ pyfsm.mermaidHandler.CachedDiagram.definitions: The serialized definitions accessed by their route store keys.
+            ~ pyfsm.mermaidHandler.CachedDiagram._resolved: The definitions resolved to the registered states and transitions, accessed by their route store keys.
+        """
+
+        self.package = package
+        """The parsed diagram."""
+        self.definitions = definitions if definitions is not None else {}
+        """The serialized definitions accessed by their route store keys."""
+        self._resolved = {}
+        """The definitions resolved to the registered states and transitions, accessed by their route store keys."""
+        pass
+
+    def resolve(self, routeStoreKey:str, restoreDefinition):
+        """
+        Returns the definition compiled for the passed route store key resolved to the registered states and transitions,
+        None if it is not cached. Resolved definitions are shared by every FSM created from the diagram.
+
+        Args:
+            routeStoreKey (:class:`str`): The route store key, see `_definitionKey`.
+            restoreDefinition (:class:`func`): The `FSM._restoreDefinition` resolving a serialized definition.
+
+        Raises:
+            (:class:`KeyError`): if a state or transition of the diagram is not registered.
+        """
+
+        definition = self.definitions.get(routeStoreKey)
+        if definition is None:
+            return None
+
+        resolved = self._resolved.get(routeStoreKey)
+        if resolved is None:
+            resolved = self._resolved[routeStoreKey] = restoreDefinition(definition)
+        return resolved
+
+class DiagramCache:
+    """
+    Caches the parsed Mermaid diagrams and the definitions compiled from them by the SHA-256 digest of their text,
+    so a FSM created from an already seen diagram skips both its parsing and its route computation.\n
+    The cache is kept in memory and, when a directory is set, in one versioned binary file per diagram,
+    which lets the next process start from the compiled routes. The files are unpickled when read,
+    only point the cache to a directory written by trusted processes.
+    """
+
+    def __init__(self, directory:str = None):
+        """
+        Constructs an empty cache.
+
+        Args:
+            directory (:class:`str`, default = None): The directory of the cache files, None to only cache in memory.
+
+        Attributes:
+            ~ pyfsm.mermaidHandler.DiagramCache.directory: The directory of the cache files, None to only cache in memory.
+            ~ pyfsm.mermaidHandler.DiagramCache.hits: The number of diagrams found in memory.
+            ~ pyfsm.mermaidHandler.DiagramCache.diskHits: The number of diagrams loaded from the cache files.
+            ~ pyfsm.mermaidHandler.DiagramCache.misses: The number of diagrams which had to be parsed.
+            ~ pyfsm.mermaidHandler.DiagramCache._entries: The `CachedDiagram` instances accessed by the diagram digests.
+        """
+
+        self.directory = directory
+        """The directory of the cache files, None to only cache in memory."""
+        self.hits = 0
+        """The number of diagrams found in memory."""
+        self.diskHits = 0
+        """The number of diagrams loaded from the cache files."""
+        self.misses = 0
+        """The number of diagrams which had to be parsed."""
+        self._entries = {}
+        """The `CachedDiagram` instances accessed by the diagram digests."""
+        pass
+
+    def get(self, mermaidDiagram:str):
+        """
+        Returns the `CachedDiagram` of the passed diagram text, from memory or from its cache file, None if it is not cached.
+        """
+
+        digest = _digest(mermaidDiagram)
+        entry = self._entries.get(digest)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        entry = self._readFile(digest)
+        if entry is not None:
+            self.diskHits += 1
+            self._entries[digest] = entry
+            return entry
+
+        self.misses += 1
+        return None
+
+    def put(self, mermaidDiagram:str, package, routeStoreKey:str = None, definition:dict = None) -> CachedDiagram:
+        """
+        Caches the parsed diagram and the definition compiled from it for the passed route store key, writing its cache file if a directory is set.
+
+        Args:
+            mermaidDiagram (:class:`str`): The diagram text.
+            package (:class:`DiagramPackage`): The parsed diagram.
+            routeStoreKey (:class:`str`, default = None): The route store key of the definition, see `_definitionKey`.
+            definition (:class:`dict`, default = None): The serialized definition, see `FSM.snapshot`, None to only cache the parsed diagram.
+
+        Returns:
+            The updated `CachedDiagram`.
+        """
+
+        digest = _digest(mermaidDiagram)
+        entry = self._entries.get(digest)
+        if entry is None:
+            entry = self._entries[digest] = CachedDiagram(package)
+
+        if definition is not None:
+            entry.definitions[routeStoreKey] = definition
+            entry._resolved.pop(routeStoreKey, None)
+
+        self._writeFile(digest, entry)
+        return entry
+
+    def clear(self):
+        """
+        Drops the diagrams cached in memory, the cache files are kept.
+        """
+        self._entries.clear()
+        pass
+
+    def _path(self, digest:str) -> str:
+        """
+        Returns the path of the cache file of the passed diagram digest.
+        """
+        return os.path.join(self.directory, digest + _CACHE_SUFFIX)
+
+    def _readFile(self, digest:str):
+        """
+        Returns the `CachedDiagram` stored in the cache file of the passed digest,
+        None if there is no directory, no file, or the file is truncated or of another version.
+        """
+
+        if self.directory is None:
+            return None
+
+        try:
+            with open(self._path(digest), "rb") as cacheFile:
+                data = cacheFile.read()
+        except OSError:
+            return None
+
+        if len(data) < _CACHE_HEADER.size:
+            return None
+
+        magic, version, payloadSize = _CACHE_HEADER.unpack_from(data)
+        if magic != _CACHE_MAGIC or version != DIAGRAM_CACHE_VERSION or payloadSize != len(data) - _CACHE_HEADER.size:
+            return None
+
+        package, definitions = pickle.loads(data[_CACHE_HEADER.size:])
+        return CachedDiagram(package, definitions)
+
+    def _writeFile(self, digest:str, entry:CachedDiagram):
+        """
+        Writes the passed cached diagram to its cache file, if a directory is set.\n
+        The file is replaced atomically, so concurrent processes never read a partial file.
+        """
+
+        if self.directory is None:
+            return
+
+        payload = pickle.dumps((entry.package, entry.definitions), pickle.HIGHEST_PROTOCOL)
+        os.makedirs(self.directory, exist_ok = True)
+
+        path = self._path(digest)
+        tempPath = "{}.{}.tmp".format(path, os.getpid())
+        with open(tempPath, "wb") as cacheFile:
+            cacheFile.write(_CACHE_HEADER.pack(_CACHE_MAGIC, DIAGRAM_CACHE_VERSION, len(payload)))
+            cacheFile.write(payload)
+        os.replace(tempPath, path)
+        pass
+
+diagramCache = DiagramCache()
+"""The diagram cache used by every `MermaidHandler`, set its `directory` to keep the parsed diagrams across processes"""
+
 class MermaidHandler:
     """
     This class is responsible for the Mermaid JS parsing feature of the python FSM.\n
@@ -35,20 +261,178 @@ class MermaidHandler:
                 idle --> load: "loading" - state transition with a transition method named "loading" \n
                 idle --> release - state transitions with no transition method \n
                 load --> aim: "aiming" - state transition with a transition method named "aiming" \n
+                aim --> fire: "firing" [cost=2.5] - state transition whose route cost is 2.5 \n
+                aim --> idle: [cost=0.5] - state transition with no transition method whose route cost is 0.5 \n
         ```
 
+        The cost annotations are removed from the labels before the diagram is parsed, see `FSM.createTransition`.
+
+        `state X { ... }` blocks, which may be nested, make X a composite state owning the sub-machine of the block,
+        see `FSM.addCompositeState`. `[*] --> a` in a block enters the sub-machine at a, by default at the first state of the block,
+        and `a --> [*]` returns from a to X. Only the edge lines of the blocks are read.
+
+        Diagrams already seen are taken from the `diagramCache`: a FSM with no transitions, costs or levels yet
+        then shares the graph and routes compiled for the diagram and the same route store settings instead of parsing it and computing them.
+        FSMs whose route store has a heuristic always parse the diagram.
+
         Args:
             mermaidDiagram (:class:`str`): The mermaid diagram to parse.
         """
-    
-        self.package = parseStateDiagram(mermaidDiagram)
-
-        for transName, transObj in self.accessMermaidDiagramTransitions().items():
-            if transName != str(transObj.source + '_' + transObj.target): # Has transition method
-                self.ownFsm.createTransition(stateCache[transObj.source], stateCache[transObj.target], transCache[transName])
-            else: # Does not have transition method
-                self.ownFsm.createTransition(stateCache[transObj.source], stateCache[transObj.target])
-            pass
+
+        fsm = self.ownFsm
+        routeStoreKey = _definitionKey(fsm._routeStore)
+        #Only a FSM without transitions, costs or levels of its own shares the definition compiled from the diagram alone
+        isEmpty = routeStoreKey is not None and not fsm._statePairs and not any(fsm._costs.export()) and not fsm._levels
+
+        cached = diagramCache.get(mermaidDiagram)
+        if cached is not None:
+            self.package = cached.package
+            definition = cached.resolve(routeStoreKey, fsm._restoreDefinition) if isEmpty else None
+            if definition is not None:
+                fsm._applyDefinition(definition)
+                return
+
+        parentDiagram, composites = _extractComposites(mermaidDiagram)
+        strippedDiagram, costs = _extractCosts(parentDiagram)
+        if cached is None:
+            self.package = parseStateDiagram(strippedDiagram)
+
+        #The routes are computed once after every diagram transition is registered
+        with fsm.deferredRouteBuild():
+            for transName, transObj in self.accessMermaidDiagramTransitions().items():
+                if transName != str(transObj.source + '_' + transObj.target): # Has transition method
+                    fsm.createTransition(stateCache[transObj.source], stateCache[transObj.target], transCache[transName],
+                                         costs.get((transObj.source, transObj.target, transName)))
+                else: # Does not have transition method
+                    fsm.createTransition(stateCache[transObj.source], stateCache[transObj.target],
+                                         cost = costs.get((transObj.source, transObj.target, None)))
+                pass
+
+            for block in composites:
+                self._addComposite(fsm, block)
+
+        #Only a FSM built from the diagram alone compiles a definition reusable by the next FSMs, its costs are the ones of the diagram
+        if isEmpty:
+            diagramCache.put(mermaidDiagram, self.package, routeStoreKey, fsm._snapshotDefinition())
+        elif cached is None:
+            diagramCache.put(mermaidDiagram, self.package)
+        pass
+
+    def createTransitionsFromStream(self, source, batchSize:int = 10000, progress = None) -> dict:
+        """
+        Creates the states and transitions of a Mermaid state diagram read line by line,
+        so diagrams too large to be held in memory as one string or one `DiagramPackage` can be loaded.\n
+        Only the `src --> dst` and `src --> dst: "trans"` lines are read, with an optional `[cost=2.5]` annotation, every other line is skipped,
+        and a transition with the `src_dst` name is treated as instant like in `createTransitionsFromDiagram`.
+        Repeated edges are not merged, they do not change the routes.
+        The edges are registered in batches inside one `deferredRouteBuild` block, so the routes are computed once at the end.
+        No `DiagramPackage` is kept and the diagram cache is not used.
+
+        Args:
+            source (:class:`str`, `os.PathLike` or `iterable`): The path of the diagram file or an iterable of its lines.
+            batchSize (:class:`int`, default = 10000): The number of edges registered per batch.
+            progress (:class:`func`, default = None): Called after every batch with the number of registered edges and the edges per second so far.
+
+        Returns:
+            A dictionary with the read `lines`, the registered `edges`, the elapsed `seconds` and the `edgesPerSecond`.
+        """
+
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "r", encoding = "utf-8") as lines:
+                return self._createTransitionsFromLines(lines, batchSize, progress)
+        return self._createTransitionsFromLines(source, batchSize, progress)
+
+    def _createTransitionsFromLines(self, lines, batchSize:int, progress) -> dict:
+        """
+        Registers the edges of the passed diagram lines in batches, see `createTransitionsFromStream`.
+        """
+
+        fsm = self.ownFsm
+        self.package = None
+        start = perf_counter()
+        lineCount = 0
+        edgeCount = 0
+        batch = []
+
+        with fsm.deferredRouteBuild():
+            for line in lines:
+                lineCount += 1
+                match = _EDGE_PATTERN.match(line)
+                if match is None:
+                    continue
+
+                #Interned names are stored once however many edges refer to them
+                source, target, transName, cost = match.groups()
+                batch.append((intern(source), intern(target), intern(transName) if transName is not None else None,
+                              float(cost) if cost is not None else None))
+
+                if len(batch) >= batchSize:
+                    edgeCount += self._createBatch(batch)
+                    batch = []
+                    if progress is not None:
+                        progress(edgeCount, edgeCount / (perf_counter() - start))
+
+            if batch:
+                edgeCount += self._createBatch(batch)
+                if progress is not None:
+                    progress(edgeCount, edgeCount / (perf_counter() - start))
+
+        seconds = perf_counter() - start
+        return {"lines": lineCount, "edges": edgeCount, "seconds": seconds, "edgesPerSecond": edgeCount / seconds if seconds else 0.0}
+
+    def _createBatch(self, batch:list) -> int:
+        """
+        Creates the transitions of the passed `(source, target, transName, cost)` edges and returns their number.
+        """
+
+        #Transitions named `src_dst` do not have a transition method
+        self.ownFsm._createNamedTransitions((source, target, transName if transName != source + '_' + target else None, cost)
+                                            for source, target, transName, cost in batch)
+        return len(batch)
+
+    def _addComposite(self, fsm, block:tuple):
+        """
+        Adds the composite state of the passed `(compositeName, lines, childBlocks)` block to the passed FSM,
+        building the child FSM of its sub-machine and of its nested blocks.
+
+        Raises:
+            (:class:`ValueError`): if the block has no states.
+        """
+
+        compositeName, lines, childBlocks = block
+        edges = []
+        initialState = None
+        finalStates = []
+
+        for line in lines:
+            match = _BLOCK_EDGE_PATTERN.match(line)
+            if match is None:
+                continue
+
+            source, target, transName, cost = match.groups()
+            if source == "[*]":
+                initialState = initialState or target
+            elif target == "[*]":
+                finalStates.append(stateCache[source])
+            else:
+                #Transitions named `src_dst` do not have a transition method
+                trans = transCache[transName] if transName is not None and transName != source + '_' + target else None
+                edges.append((stateCache[source], stateCache[target], trans, float(cost) if cost is not None else None))
+
+        if initialState is None:
+            initialState = edges[0][0][0].__name__ if edges else (childBlocks[0][0] if childBlocks else None)
+        if initialState is None:
+            raise ValueError("Composite state " + compositeName + " has no states.")
+
+        #The child FSM only holds the sub-machine until it is copied, so its routes are never computed
+        childFsm = fsmLib.FSM(initialState, routing.LazyRouteStore())
+        try:
+            childFsm.createTransitions(edges)
+            for childBlock in childBlocks:
+                self._addComposite(childFsm, childBlock)
+            fsm.addCompositeState(stateCache[compositeName], childFsm, finalStates)
+        finally:
+            childFsm.close()
         pass
 
     def accessMermaidDiagram(self) -> DiagramPackage:
@@ -73,4 +457,85 @@ class MermaidHandler:
     
     def accessMermaidDiagramTransitions(self) -> dict:
         """Returns the parsed mermaid diagram transitions dictionary."""
-        return self.package.transitions
\ No newline at end of file
+        return self.package.transitions
+
+def _definitionKey(routeStore):
+    """
+    Returns the key of the definitions compiled for the passed route store in a `CachedDiagram`,
+    None if the definitions must not be shared as the store routes with a heuristic.\n
+    The key is the store type name followed by the default and instant costs of its `CostTable`, if it has one,
+    as they are not part of the exported costs. The levels of a `HierarchicalRouteStore` are the levels of its FSM,
+    which never shares a definition once it has levels, and the other settings of the stores do not change the cached routes.
+    """
+
+    if getattr(routeStore, "heuristic", None) is not None:
+        return None
+
+    costs = getattr(routeStore, "costs", None)
+    if costs is None:
+        return type(routeStore).__name__
+    return "{}({!r}, {!r})".format(type(routeStore).__name__, costs.defaultCost, costs.instantCost)
+
+def _digest(mermaidDiagram:str) -> str:
+    """
+    Returns the SHA-256 hex digest of the passed diagram text.
+    """
+    return hashlib.sha256(mermaidDiagram.encode("utf-8")).hexdigest()
+
+def _extractCosts(mermaidDiagram:str) -> tuple:
+    """
+    Returns the passed diagram text without its `[cost=2.5]` annotations and the annotated costs
+    accessed by `(source, target, transName)`, where `transName` is None for unlabelled transitions.
+
+    Raises:
+        (:class:`ValueError`): if an annotated cost is not a number.
+    """
+
+    if "[cost" not in mermaidDiagram:
+        return mermaidDiagram, {}
+
+    costs = {}
+    lines = mermaidDiagram.splitlines()
+    for index, line in enumerate(lines):
+        match = _EDGE_PATTERN.match(line)
+        if match is None or match.group(4) is None:
+            continue
+
+        source, target, transName, cost = match.groups()
+        costs[(source, target, transName)] = float(cost)
+        #A label left empty would name the transition with an empty string
+        lines[index] = _COST_ANNOTATION.sub("", line).rstrip().rstrip(":")
+
+    return "\n".join(lines), costs
+
+def _extractComposites(mermaidDiagram:str) -> tuple:
+    """
+    Returns the passed diagram text without its `state X { ... }` blocks and the removed blocks
+    as `(compositeName, lines, childBlocks)` tuples, in the order of the diagram.
+
+    Raises:
+        (:class:`ValueError`): if a block is not closed.
+    """
+
+    if "{" not in mermaidDiagram:
+        return mermaidDiagram, []
+
+    parentLines = []
+    blocks = []
+    openBlocks = []
+
+    for line in mermaidDiagram.splitlines():
+        match = _COMPOSITE_START.match(line)
+        if match is not None:
+            block = (match.group(1), [], [])
+            (openBlocks[-1][2] if openBlocks else blocks).append(block)
+            openBlocks.append(block)
+        elif openBlocks and _COMPOSITE_END.match(line):
+            openBlocks.pop()
+        else:
+            (openBlocks[-1][1] if openBlocks else parentLines).append(line)
+
+    if openBlocks:
+        raise ValueError("The block of composite state " + openBlocks[-1][0] + " is not closed.")
+
+    return "\n".join(parentLines), blocks
@@ -0,0 +1,310 @@
+from .fsmLib import FSMStates
+
+from collections import deque
+from time import perf_counter
+import json
+
+_DEFAULT_WINDOW = 1024
+"""The number of latest samples kept per metric for the percentiles"""
+
+class MetricStat:
+    """
+    The count, sum, maximum and latest samples of a profiled metric.
+    """
+
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self, window:int = _DEFAULT_WINDOW):
+        """
+        Constructs an empty metric.
+
+        Args:
+            window (:class:`int`, default = 1024): The number of latest samples kept for the percentiles.
+
+        Attributes:
+            ~ pyFsm.profiling.MetricStat.count: The number of recorded samples.
+            ~ pyFsm.profiling.MetricStat.total: The sum of the recorded samples.
+            ~ pyFsm.profiling.MetricStat.max: The largest recorded sample.
+            ~ pyFsm.profiling.MetricStat.samples: The latest recorded samples.
+        """
+
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.samples = deque(maxlen = window)
+        pass
+
+    def clear(self):
+        """
+        Drops every recorded sample.
+        """
+
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.samples.clear()
+        pass
+
+    def record(self, value):
+        """
+        Records the passed sample.
+        """
+
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.samples.append(value)
+        pass
+
+    def percentile(self, percent:float):
+        """
+        Returns the passed percentile of the latest samples with the nearest rank method, 0 if there are none.
+
+        Args:
+            percent (:class:`float`): The percentile, between 0 and 100.
+        """
+
+        if not self.samples:
+            return 0
+
+        ordered = sorted(self.samples)
+        rank = max(0, min(len(ordered) - 1, int(round(percent / 100.0 * len(ordered) + 0.5)) - 1))
+        return ordered[rank]
+
+    def snapshot(self) -> dict:
+        """
+        Returns the metric as a dictionary with its `count`, `total`, `mean`, `max`, `p50` and `p99` values.
+        """
+
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+        }
+
+class Profiler:
+    """
+    Opt-in instrumentation of one or more FSMs.\n
+    A profiled FSM runs a copy of its `DispatchPlan` whose state and transition functions are wrapped with timers,
+    and its `_traverseToState` and `nextState` methods are shadowed by timed instance attributes.
+    Unprofiled FSMs run the plain plan and methods, so disabled profiling costs nothing per step.\n
+
+    Times are wall clock seconds. The time a state spends waiting for its callback is not part of its call time,
+    it is recorded separately as the `waiting` metric.
+    """
+
+    def __init__(self, window:int = _DEFAULT_WINDOW):
+        """
+        Constructs a profiler with no metrics.
+
+        Args:
+            window (:class:`int`, default = 1024): The number of latest samples kept per metric for the percentiles.
+
+        Attributes:
+            ~ pyFsm.profiling.Profiler.states: The call time metrics accessed by the state names.
+            ~ pyFsm.profiling.Profiler.transitions: The call time metrics accessed by the transition names.
+            ~ pyFsm.profiling.Profiler.routes: The number of states walked per traversed destination.
+            ~ pyFsm.profiling.Profiler.queueDepth: The destination queue depth sampled on every traversed destination.
+            ~ pyFsm.profiling.Profiler.waiting: The time spent in `FSMStates.WAITING_FOR_CB` per callback.
+        """
+
+        self.states = {}
+        """The call time metrics accessed by the state names."""
+        self.transitions = {}
+        """The call time metrics accessed by the transition names."""
+        self.routes = MetricStat(window)
+        """The number of states walked per traversed destination."""
+        self.queueDepth = MetricStat(window)
+        """The destination queue depth sampled on every traversed destination."""
+        self.waiting = MetricStat(window)
+        """The time spent in `FSMStates.WAITING_FOR_CB` per callback."""
+
+        self._window = window
+        """The number of latest samples kept per metric for the percentiles."""
+        self._stateCalls = 0
+        """The number of profiled state calls, used to measure the route lengths."""
+        self._waitingSince = {}
+        """The time each profiled FSM started waiting for its callback, accessed by the FSM UIDs."""
+        pass
+
+    def attach(self, fsm):
+        """
+        Starts profiling the passed FSM. Use `FSM.enableProfiling` instead of calling it directly.
+        """
+
+        traverse = fsm._traverseToState
+        nextState = fsm.nextState
+        waitingSince = self._waitingSince
+        uid = fsm.uid
+
+        def profiledTraverseToState(destStateName, *args, **kwargs):
+            self.queueDepth.record(fsm._destQueue.qsize())
+            stateCalls = self._stateCalls
+            try:
+                traverse(destStateName, *args, **kwargs)
+            finally:
+                self.routes.record(self._stateCalls - stateCalls)
+                if fsm._fsmInternalState is FSMStates.WAITING_FOR_CB:
+                    waitingSince[uid] = perf_counter()
+            pass
+
+        def profiledNextState():
+            since = waitingSince.pop(uid, None)
+            if since is not None:
+                self.waiting.record(perf_counter() - since)
+            nextState()
+            pass
+
+        fsm._traverseToState = profiledTraverseToState
+        fsm.nextState = profiledNextState
+        pass
+
+    def detach(self, fsm):
+        """
+        Stops profiling the passed FSM, restoring its methods. Use `FSM.disableProfiling` instead of calling it directly.
+        """
+
+        fsm.__dict__.pop("_traverseToState", None)
+        fsm.__dict__.pop("nextState", None)
+        self._waitingSince.pop(fsm.uid, None)
+        pass
+
+    def instrumentPlan(self, plan):
+        """
+        Returns a copy of the passed `DispatchPlan` whose state and transition functions record their call times.
+        """
+
+        profiled = object.__new__(type(plan))
+        profiled.__dict__.update(plan.__dict__)
+
+        profiled.states = [(name, self._timedState(name, func), wfc, argsKind, stateId)
+                           for name, func, wfc, argsKind, stateId in plan.states]
+        profiled.transitions = [(name, self._timed(self.transitions, name, func), wfc, argsKind, offThread)
+                                for name, func, wfc, argsKind, offThread in plan.transitions]
+        return profiled
+
+    def reset(self):
+        """
+        Clears every metric.
+        """
+
+        #The metrics are cleared in place as the instrumented plans keep references to them
+        for stat in list(self.states.values()) + list(self.transitions.values()):
+            stat.clear()
+        self.routes.clear()
+        self.queueDepth.clear()
+        self.waiting.clear()
+        pass
+
+    def snapshot(self) -> dict:
+        """
+        Returns every metric as a JSON serializable dictionary.
+
+        Returns:
+            A dictionary with the `states` and `transitions` metrics accessed by their names
+            and the `routes`, `queueDepth` and `waiting` metrics, each as returned by `MetricStat.snapshot`.
+        """
+
+        return {
+            "states": {name: stat.snapshot() for name, stat in self.states.items()},
+            "transitions": {name: stat.snapshot() for name, stat in self.transitions.items()},
+            "routes": self.routes.snapshot(),
+            "queueDepth": self.queueDepth.snapshot(),
+            "waiting": self.waiting.snapshot(),
+        }
+
+    def toJson(self, indent:int = None) -> str:
+        """
+        Returns the snapshot of the metrics as a JSON document.
+
+        Args:
+            indent (:class:`int`, default = None): The indentation of the document, None for a single line.
+        """
+
+        return json.dumps(self.snapshot(), indent = indent, sort_keys = True)
+
+    def toPrometheus(self, prefix:str = "pyfsm") -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format, as summaries with 0.5 and 0.99 quantiles.
+
+        Args:
+            prefix (:class:`str`, default = "pyfsm"): The prefix of the metric names.
+        """
+
+        lines = []
+        _appendSummary(lines, prefix + "_state_seconds", "Wall time of the state calls.", "state", self.states)
+        _appendSummary(lines, prefix + "_transition_seconds", "Wall time of the transition calls.", "transition", self.transitions)
+        _appendSummary(lines, prefix + "_route_states", "States walked per traversed destination.", None, {None: self.routes})
+        _appendSummary(lines, prefix + "_queue_depth", "Destination queue depth per traversed destination.", None, {None: self.queueDepth})
+        _appendSummary(lines, prefix + "_waiting_seconds", "Time spent waiting for a callback.", None, {None: self.waiting})
+        return "\n".join(lines) + "\n"
+
+    def _timedState(self, name:str, func):
+        """
+        Returns the passed state function wrapped with a timer, also counting the state calls.
+        """
+
+        stat = self._stat(self.states, name)
+
+        def timedState(*args, **kwargs):
+            self._stateCalls += 1
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stat.record(perf_counter() - start)
+        return timedState
+
+    def _timed(self, metrics:dict, name:str, func):
+        """
+        Returns the passed function wrapped with a timer recording in the named metric.
+        """
+
+        stat = self._stat(metrics, name)
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stat.record(perf_counter() - start)
+        return timed
+
+    def _stat(self, metrics:dict, name:str) -> MetricStat:
+        """
+        Returns the named metric, creating it if needed.
+        """
+
+        stat = metrics.get(name)
+        if stat is None:
+            stat = metrics[name] = MetricStat(self._window)
+        return stat
+
+def _appendSummary(lines:list, metricName:str, description:str, label:str, metrics:dict):
+    """
+    Appends the passed metrics as a Prometheus summary to the passed lines.
+    """
+
+    lines.append("# HELP {} {}".format(metricName, description))
+    lines.append("# TYPE {} summary".format(metricName))
+
+    for name, stat in sorted(metrics.items(), key = lambda item: str(item[0])):
+        labels = '{}="{}"'.format(label, _escapeLabel(name)) if label is not None else ""
+        for quantile, percent in (("0.5", 50), ("0.99", 99)):
+            quantileLabels = labels + "," if labels else ""
+            lines.append('{}{{{}quantile="{}"}} {}'.format(metricName, quantileLabels, quantile, repr(float(stat.percentile(percent)))))
+
+        suffix = "{" + labels + "}" if labels else ""
+        lines.append("{}_sum{} {}".format(metricName, suffix, repr(float(stat.total))))
+        lines.append("{}_count{} {}".format(metricName, suffix, stat.count))
+    pass
+
+def _escapeLabel(value:str) -> str:
+    """
+    Escapes the passed Prometheus label value.
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
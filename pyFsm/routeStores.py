@@ -0,0 +1,920 @@
+from . import heuristics as sort
+from . import fsmGlobals as globals
+
+from array import array
+from collections import OrderedDict, deque
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class EagerRouteStore:
+    """
+    Route store which keeps the shortest route of every state pair in memory.\n
+    The routes are computed with an all-pairs BFS and updated incrementally when a transition is added,
+    the incremental updates keep the routes a rebuild computes, see `heuristics.findShortestRoutes` for the tie rule.
+    """
+
+    precomputed = True
+    """Whether every route of the graph is computed up front, so a dispatch plan can read its routes through integer tables."""
+
+    def __init__(self):
+        """
+        Constructs an empty eager route store.
+
+        Attributes:
+            ~ pyFsm.routeStores.EagerRouteStore.routes: The state to state shortest routes.
+        """
+
+        self.routes = {}
+        """The state to state shortest routes."""
+        pass
+
+    def rebuild(self, stateGraph:dict):
+        """
+        Recomputes every route of the passed state graph.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph created by `heuristics.buildStateGraph`.
+        """
+
+        self.routes = sort.findShortestRoutes(stateGraph)
+        pass
+
+    def addTransition(self, stateGraph:dict, stateName:str, nextStateName:str, transName:str):
+        """
+        Updates the routes affected by a transition which was just added to the passed state graph.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph containing the new transition.
+            stateName (:class:`str`): The source state name.
+            nextStateName (:class:`str`): The target state name.
+            transName (:class:`str`): The transition name, if any.
+        """
+
+        sort.updateShortestRoutes(self.routes, stateGraph, stateName, nextStateName, transName)
+        pass
+
+    def getRoute(self, stateName:str, destStateName:str) -> list:
+        """
+        Returns the `(stateName, transName)` route from the passed state to the destination state.
+
+        Raises:
+            (:class:`KeyError`): if the destination state is unreachable.
+        """
+
+        return self.routes[stateName][destStateName]
+
+    def getRoutes(self, stateName:str) -> dict:
+        """
+        Returns the `(stateName, transName)` routes from the passed state accessed by the destination state names.
+        """
+
+        return self.routes[stateName]
+
+class LazyRouteStore:
+    """
+    Route store which computes a route the first time its state pair is requested
+    and keeps the most recently used routes in a size-bounded LRU cache.\n
+    Memory stays bounded by `maxSize` routes no matter how many states the graph has.
+    """
+
+    precomputed = False
+    """Routes are only computed on request, so a dispatch plan resolves its hops through the store."""
+
+    def __init__(self, maxSize:int = 1024, bidirectional:bool = False):
+        """
+        Constructs an empty lazy route store.
+
+        Args:
+            maxSize (:class:`int`, default = 1024): The maximum number of cached routes.
+            bidirectional (:class:`bool`, default = False): Whether routes are searched with a bidirectional BFS.
+
+        Attributes:
+            ~ pyFsm.routeStores.LazyRouteStore.maxSize: The maximum number of cached routes.
+            ~ pyFsm.routeStores.LazyRouteStore.bidirectional: Whether routes are searched with a bidirectional BFS.
+            ~ pyFsm.routeStores.LazyRouteStore.hits: The number of route requests served from the cache.
+            ~ pyFsm.routeStores.LazyRouteStore.misses: The number of route requests which had to be computed.
+            ~ pyFsm.routeStores.LazyRouteStore.evictions: The number of routes dropped from the cache.
+        """
+
+        if maxSize < 1:
+            raise ValueError("The route cache size must be at least 1.")
+
+        self.maxSize = maxSize
+        """The maximum number of cached routes."""
+        self.bidirectional = bidirectional
+        """Whether routes are searched with a bidirectional BFS."""
+        self.hits = 0
+        """The number of route requests served from the cache."""
+        self.misses = 0
+        """The number of route requests which had to be computed."""
+        self.evictions = 0
+        """The number of routes dropped from the cache."""
+
+        self._stateGraph = {}
+        """The state graph the routes are computed from."""
+        self._reverseGraph = {}
+        """The reversed state graph used by the bidirectional search."""
+        self._cache = OrderedDict()
+        """The cached routes accessed by `(stateName, destStateName)` in least recently used order."""
+        pass
+
+    def rebuild(self, stateGraph:dict):
+        """
+        Drops every cached route and binds the store to the passed state graph.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph created by `heuristics.buildStateGraph`.
+        """
+
+        self._stateGraph = stateGraph
+        self._reverseGraph = sort.buildReverseStateGraph(stateGraph) if self.bidirectional else {}
+        self._cache.clear()
+        pass
+
+    def addTransition(self, stateGraph:dict, stateName:str, nextStateName:str, transName:str):
+        """
+        Binds the store to the passed state graph and drops the cached routes, since the new transition may shorten them.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph containing the new transition.
+            stateName (:class:`str`): The source state name.
+            nextStateName (:class:`str`): The target state name.
+            transName (:class:`str`): The transition name, if any.
+        """
+
+        self._stateGraph = stateGraph
+
+        if self.bidirectional:
+            self._reverseGraph.setdefault(stateName, [])
+            self._reverseGraph.setdefault(nextStateName, []).append((stateName, transName))
+
+        self._cache.clear()
+        pass
+
+    def getRoute(self, stateName:str, destStateName:str) -> list:
+        """
+        Returns the `(stateName, transName)` route from the passed state to the destination state,
+        computing and caching it on the first request.
+
+        Raises:
+            (:class:`KeyError`): if the destination state is unreachable.
+        """
+
+        key = (stateName, destStateName)
+        route = self._cache.get(key)
+
+        if route is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return route
+
+        self.misses += 1
+        route = self._findRoute(stateName, destStateName)
+        if route is None:
+            raise KeyError(destStateName)
+
+        self._cache[key] = route
+        if len(self._cache) > self.maxSize:
+            self._cache.popitem(last = False)
+            self.evictions += 1
+
+        return route
+
+    def cacheInfo(self) -> dict:
+        """
+        Returns the route cache statistics as a dictionary with the
+        `hits`, `misses`, `evictions`, `size` and `maxSize` keys.
+        """
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._cache),
+            "maxSize": self.maxSize,
+        }
+
+    def _findRoute(self, stateName:str, destStateName:str) -> list:
+        """
+        Searches the route of a state pair missing from the cache, None if the destination state is unreachable.
+        """
+
+        if self.bidirectional:
+            return sort.findShortestRouteBidirectional(self._stateGraph, self._reverseGraph, stateName, destStateName)
+        return sort.findShortestRoute(self._stateGraph, stateName, destStateName)
+
+class CompactRouteStore:
+    """
+    Route store which interns the state and transition names to integer IDs and keeps, for every source state,
+    a single `array` backed table with the transition edge each state was first discovered through.\n
+    Routes are rebuilt from the predecessor tables as generators when they are requested and are the same
+    routes an `EagerRouteStore` returns, while the tables take 4 bytes per state pair.
+    """
+
+    precomputed = True
+    """The predecessor tables cover every state pair once compiled."""
+
+    def __init__(self, useNumpy:bool = False):
+        """
+        Constructs an empty compact route store.
+
+        Args:
+            useNumpy (:class:`bool`, default = False): Whether the predecessor tables are kept in a single NumPy matrix.
+
+        Attributes:
+            ~ pyFsm.routeStores.CompactRouteStore.useNumpy: Whether the predecessor tables are kept in a single NumPy matrix.
+
+        Raises:
+            (:class:`ImportError`): if `useNumpy` is True and NumPy is not installed.
+        """
+
+        if useNumpy and numpy is None:
+            raise ImportError("NumPy is required for a NumPy backed CompactRouteStore.")
+
+        self.useNumpy = useNumpy
+        """Whether the predecessor tables are kept in a single NumPy matrix."""
+
+        self._stateGraph = {}
+        """The state graph the tables are computed from."""
+        self._dirty = False
+        """Whether the tables must be recomputed before the next route request."""
+        self._stateIds = {}
+        """The state IDs accessed by the state names."""
+        self._stateNames = []
+        """The state names accessed by the state IDs."""
+        self._transNames = [None]
+        """The transition names accessed by the transition IDs, ID 0 is the instant transition."""
+        self._edgeSources = array('i')
+        """The source state ID of every edge."""
+        self._edgeTargets = array('i')
+        """The target state ID of every edge."""
+        self._edgeTrans = array('i')
+        """The transition ID of every edge."""
+        self._predEdges = []
+        """The predecessor edge tables accessed by the source state ID, -1 marks an unreachable state."""
+        pass
+
+    def rebuild(self, stateGraph:dict):
+        """
+        Binds the store to the passed state graph, the tables are recomputed on the next route request.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph created by `heuristics.buildStateGraph`.
+        """
+
+        self._stateGraph = stateGraph
+        self._dirty = True
+        pass
+
+    def addTransition(self, stateGraph:dict, stateName:str, nextStateName:str, transName:str):
+        """
+        Binds the store to the passed state graph, the tables are recomputed on the next route request.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph containing the new transition.
+            stateName (:class:`str`): The source state name.
+            nextStateName (:class:`str`): The target state name.
+            transName (:class:`str`): The transition name, if any.
+        """
+
+        self._stateGraph = stateGraph
+        self._dirty = True
+        pass
+
+    def getRoute(self, stateName:str, destStateName:str):
+        """
+        Returns a generator over the `(stateName, transName)` route from the passed state to the destination state.
+
+        Raises:
+            (:class:`KeyError`): if the destination state is unreachable.
+        """
+
+        if self._dirty:
+            self._compile()
+
+        src = self._stateIds[stateName]
+        dest = self._stateIds[destStateName]
+
+        if src != dest and self._predEdges[src][dest] < 0:
+            raise KeyError(destStateName)
+
+        return self._iterRoute(src, dest)
+
+    def getStateId(self, stateName:str) -> int:
+        """
+        Returns the interned ID of the passed state name.
+        """
+
+        if self._dirty:
+            self._compile()
+
+        return self._stateIds[stateName]
+
+    def getPredecessorTables(self) -> tuple:
+        """
+        Returns the `(predEdges, edgeSources, edgeTargets, edgeTrans, stateNames, transNames)` tables the routes are rebuilt from,
+        read in place by a dispatch plan: `predEdges[src][dest]` is the edge the route from the source state ID enters
+        the destination state ID through, -1 if it is unreachable, the edge arrays hold the source and target state IDs
+        and the transition ID of every edge and the name lists are accessed by the state and transition IDs,
+        transition ID 0 being the instant transition. The tables are replaced, not modified, when the graph changes.
+        """
+
+        if self._dirty:
+            self._compile()
+
+        return self._predEdges, self._edgeSources, self._edgeTargets, self._edgeTrans, self._stateNames, self._transNames
+
+    def memoryUsage(self) -> int:
+        """
+        Returns the approximate number of bytes held by the interning and predecessor tables.
+        """
+
+        if self.useNumpy and not isinstance(self._predEdges, list):
+            tables = self._predEdges.nbytes
+        else:
+            tables = sum(row.buffer_info()[1] * row.itemsize for row in self._predEdges)
+
+        edges = 3 * len(self._edgeSources) * self._edgeSources.itemsize
+        return tables + edges
+
+    def _iterRoute(self, src:int, dest:int):
+        """
+        Yields the `(stateName, transName)` route between the passed state IDs
+        by walking the predecessor table of the source state backwards.
+        """
+
+        row = self._predEdges[src]
+        edges = []
+        stateId = dest
+        while stateId != src:
+            edge = row[stateId]
+            edges.append(edge)
+            stateId = self._edgeSources[edge]
+
+        for edge in reversed(edges):
+            yield self._stateNames[self._edgeTargets[edge]], self._transNames[self._edgeTrans[edge]]
+
+    def _compile(self):
+        """
+        Interns the state graph names and computes the predecessor table of every source state with a BFS.
+        """
+
+        self._stateIds = {}
+        self._stateNames = []
+        transIds = {None: 0}
+        self._transNames = [None]
+
+        for stateName in self._stateGraph:
+            self._stateIds[stateName] = len(self._stateNames)
+            self._stateNames.append(stateName)
+
+        self._edgeSources = array('i')
+        self._edgeTargets = array('i')
+        self._edgeTrans = array('i')
+        adjacency = []
+
+        for stateName, transitions in self._stateGraph.items():
+            stateEdges = []
+            for nextState, trans in transitions:
+                if trans not in transIds:
+                    transIds[trans] = len(self._transNames)
+                    self._transNames.append(trans)
+
+                stateEdges.append(len(self._edgeTargets))
+                self._edgeSources.append(self._stateIds[stateName])
+                self._edgeTargets.append(self._stateIds[nextState])
+                self._edgeTrans.append(transIds[trans])
+            adjacency.append(stateEdges)
+
+        stateCount = len(self._stateNames)
+        rows = [self._bfsTable(src, adjacency, stateCount) for src in range(stateCount)]
+
+        if self.useNumpy:
+            self._predEdges = numpy.full((stateCount, stateCount), -1, dtype = numpy.int32)
+            for src, row in enumerate(rows):
+                self._predEdges[src, :] = numpy.frombuffer(row, dtype = numpy.int32)
+        else:
+            self._predEdges = rows
+
+        self._dirty = False
+        pass
+
+    def _bfsTable(self, src:int, adjacency:list, stateCount:int) -> array:
+        """
+        Returns the predecessor edge table of the passed source state ID.
+        """
+
+        row = array('i', [-1]) * stateCount
+        discovered = bytearray(stateCount)
+        discovered[src] = 1
+        targets = self._edgeTargets
+        queue = deque([src])
+
+        while queue:
+            stateId = queue.popleft()
+            for edge in adjacency[stateId]:
+                nextState = targets[edge]
+                if not discovered[nextState]:
+                    discovered[nextState] = 1
+                    row[nextState] = edge
+                    queue.append(nextState)
+
+        return row
+
+class CostTable:
+    """
+    The route costs of the transitions of a FSM, read by the weighted route stores.\n
+    The cost of moving from a state to the next one is the cost of the transition followed by the cost of the state entered.
+    The transition cost is, in order, the cost passed to `FSM.createTransition` for that state pair,
+    the cost set for the transition with `setTransitionCost`, the cost passed to the `transition` decorator,
+    or `defaultCost`. Instant transitions cost `instantCost` unless their state pair has a cost.
+    State costs are 0 unless set with `setStateCost`.\n
+    Costs may be in any unit, as long as every cost of the table uses the same one. Measured costs are in seconds.
+    """
+
+    def __init__(self, defaultCost:float = 1.0, instantCost:float = 0.0):
+        """
+        Constructs a cost table without any set cost.
+
+        Args:
+            defaultCost (:class:`float`, default = 1.0): The cost of the transitions without a set cost.
+            instantCost (:class:`float`, default = 0.0): The cost of the instant transitions without a set cost.
+
+        Attributes:
+            ~ pyFsm.routeStores.CostTable.defaultCost: The cost of the transitions without a set cost.
+            ~ pyFsm.routeStores.CostTable.instantCost: The cost of the instant transitions without a set cost.
+            ~ pyFsm.routeStores.CostTable.pairCosts: The transition costs accessed by `(stateName, nextStateName, transName)`.
+            ~ pyFsm.routeStores.CostTable.transitionCosts: The transition costs accessed by the transition names.
+            ~ pyFsm.routeStores.CostTable.stateCosts: The costs of entering the states accessed by the state names.
+
+        Raises:
+            (:class:`ValueError`): if a cost is negative.
+        """
+
+        _checkCost(defaultCost)
+        _checkCost(instantCost)
+
+        self.defaultCost = float(defaultCost)
+        """The cost of the transitions without a set cost."""
+        self.instantCost = float(instantCost)
+        """The cost of the instant transitions without a set cost."""
+        self.pairCosts = {}
+        """The transition costs accessed by `(stateName, nextStateName, transName)`."""
+        self.transitionCosts = {}
+        """The transition costs accessed by the transition names."""
+        self.stateCosts = {}
+        """The costs of entering the states accessed by the state names."""
+        pass
+
+    def cost(self, stateName:str, nextStateName:str, transName:str) -> float:
+        """
+        Returns the cost of moving from the passed state to the next state through the passed transition, whose name is None for instant transitions.
+        """
+
+        cost = self.pairCosts.get((stateName, nextStateName, transName))
+        if cost is None:
+            if transName is None:
+                cost = self.instantCost
+            else:
+                cost = self.transitionCosts.get(transName)
+                if cost is None:
+                    cost = globals.transCosts.get(transName, self.defaultCost)
+
+        return cost + self.stateCosts.get(nextStateName, 0.0)
+
+    def setPairCost(self, stateName:str, nextStateName:str, transName:str, cost:float):
+        """
+        Sets the cost of the passed transition between the passed states only.
+
+        Raises:
+            (:class:`ValueError`): if the cost is negative.
+        """
+
+        _checkCost(cost)
+        self.pairCosts[(stateName, nextStateName, transName)] = float(cost)
+        pass
+
+    def setTransitionCost(self, transName:str, cost:float):
+        """
+        Sets the cost of the passed transition between any states, None drops the set cost.
+
+        Raises:
+            (:class:`ValueError`): if the cost is negative.
+        """
+
+        if cost is None:
+            self.transitionCosts.pop(transName, None)
+            return
+
+        _checkCost(cost)
+        self.transitionCosts[transName] = float(cost)
+        pass
+
+    def setStateCost(self, stateName:str, cost:float):
+        """
+        Sets the cost of entering the passed state, None drops the set cost.
+
+        Raises:
+            (:class:`ValueError`): if the cost is negative.
+        """
+
+        if cost is None:
+            self.stateCosts.pop(stateName, None)
+            return
+
+        _checkCost(cost)
+        self.stateCosts[stateName] = float(cost)
+        pass
+
+    def export(self) -> tuple:
+        """
+        Returns the set costs as a hashable `(pairCosts, transitionCosts, stateCosts)` tuple of sorted item tuples, see `load`.
+        """
+
+        return (tuple(sorted(self.pairCosts.items(), key = _costKey)),
+                tuple(sorted(self.transitionCosts.items())),
+                tuple(sorted(self.stateCosts.items())))
+
+    def load(self, exported:tuple):
+        """
+        Adds the costs of an `export` result to the table.
+        """
+
+        pairCosts, transitionCosts, stateCosts = exported
+        self.pairCosts.update(pairCosts)
+        self.transitionCosts.update(transitionCosts)
+        self.stateCosts.update(stateCosts)
+        pass
+
+class WeightedRouteStore:
+    """
+    Route store which keeps the cheapest route of every state pair in memory, as the `EagerRouteStore` keeps the shortest ones.\n
+    The routes are computed with a Dijkstra search from every state using the costs of its `CostTable`,
+    and are recomputed on the next route request after the graph or the costs change.
+    """
+
+    precomputed = True
+    """The routes cover every state pair once computed, a dispatch plan reads them through integer tables."""
+
+    def __init__(self, costs:CostTable = None):
+        """
+        Constructs an empty weighted route store.
+
+        Args:
+            costs (:class:`CostTable`, default = None): The costs of the transitions, a new `CostTable` by default.
+
+        Attributes:
+            ~ pyFsm.routeStores.WeightedRouteStore.costs: The costs of the transitions.
+            ~ pyFsm.routeStores.WeightedRouteStore.routes: The state to state cheapest routes.
+        """
+
+        self.costs = costs if costs is not None else CostTable()
+        """The costs of the transitions."""
+        self.routes = {}
+        """The state to state cheapest routes."""
+
+        self._stateGraph = {}
+        """The state graph the routes are computed from."""
+        self._dirty = False
+        """Whether the routes must be recomputed before the next route request."""
+        pass
+
+    def rebuild(self, stateGraph:dict):
+        """
+        Binds the store to the passed state graph, the routes are recomputed on the next route request.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph created by `heuristics.buildStateGraph`.
+        """
+
+        self._stateGraph = stateGraph
+        self._dirty = True
+        pass
+
+    def addTransition(self, stateGraph:dict, stateName:str, nextStateName:str, transName:str):
+        """
+        Binds the store to the passed state graph, the routes are recomputed on the next route request.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph containing the new transition.
+            stateName (:class:`str`): The source state name.
+            nextStateName (:class:`str`): The target state name.
+            transName (:class:`str`): The transition name, if any.
+        """
+
+        self._stateGraph = stateGraph
+        self._dirty = True
+        pass
+
+    def getRoute(self, stateName:str, destStateName:str) -> list:
+        """
+        Returns the `(stateName, transName)` route from the passed state to the destination state.
+
+        Raises:
+            (:class:`KeyError`): if the destination state is unreachable.
+        """
+
+        return self.getRoutes(stateName)[destStateName]
+
+    def getRoutes(self, stateName:str) -> dict:
+        """
+        Returns the `(stateName, transName)` routes from the passed state accessed by the names of the states it can reach.
+
+        Raises:
+            (:class:`KeyError`): if the state is not in the graph.
+        """
+
+        if self._dirty:
+            self.routes = sort.findCheapestRoutes(self._stateGraph, self.costs.cost)
+            self._dirty = False
+
+        return self.routes[stateName]
+
+class AStarRouteStore(LazyRouteStore):
+    """
+    Route store which searches the cheapest route of a state pair with an A* search the first time it is requested,
+    keeping the most recently used routes in a size-bounded LRU cache like the `LazyRouteStore`.\n
+    Without a heuristic the search is a Dijkstra search stopping at the destination.
+    """
+
+    def __init__(self, heuristic = None, maxSize:int = 1024, costs:CostTable = None):
+        """
+        Constructs an empty A* route store.
+
+        Args:
+            heuristic (:class:`func`, default = None): The `heuristic(stateName, destStateName)` lower bound of the cost left to the destination.
+            An estimate above the real cost makes the search faster but its routes may not be the cheapest.
+            maxSize (:class:`int`, default = 1024): The maximum number of cached routes.
+            costs (:class:`CostTable`, default = None): The costs of the transitions, a new `CostTable` by default.
+
+        Attributes:
+            ~ pyFsm.routeStores.AStarRouteStore.heuristic: The lower bound of the cost left to the destination, None for a Dijkstra search.
+            ~ pyFsm.routeStores.AStarRouteStore.costs: The costs of the transitions.
+        """
+
+        super().__init__(maxSize)
+
+        self.heuristic = heuristic
+        """The lower bound of the cost left to the destination, None for a Dijkstra search."""
+        self.costs = costs if costs is not None else CostTable()
+        """The costs of the transitions."""
+
+        self._weightedGraph = {}
+        """The weighted state graph the routes are searched in."""
+        pass
+
+    def rebuild(self, stateGraph:dict):
+        """
+        Drops every cached route and binds the store to the passed state graph and the current costs.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph created by `heuristics.buildStateGraph`.
+        """
+
+        super().rebuild(stateGraph)
+        self._weightedGraph = sort.buildWeightedStateGraph(stateGraph, self.costs.cost)
+        pass
+
+    def addTransition(self, stateGraph:dict, stateName:str, nextStateName:str, transName:str):
+        """
+        Adds the passed transition to the weighted graph and drops the cached routes, since the new transition may make them cheaper.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph containing the new transition.
+            stateName (:class:`str`): The source state name.
+            nextStateName (:class:`str`): The target state name.
+            transName (:class:`str`): The transition name, if any.
+        """
+
+        super().addTransition(stateGraph, stateName, nextStateName, transName)
+
+        cost = self.costs.cost(stateName, nextStateName, transName)
+        _checkCost(cost)
+        self._weightedGraph.setdefault(nextStateName, [])
+        self._weightedGraph.setdefault(stateName, []).append((nextStateName, transName, cost))
+        pass
+
+    def _findRoute(self, stateName:str, destStateName:str) -> list:
+        """
+        Searches the cheapest route of a state pair missing from the cache, None if the destination state is unreachable.
+        """
+        return sort.findCheapestRoute(self._weightedGraph, stateName, destStateName, self.heuristic)
+
+def _checkCost(cost:float):
+    """
+    Raises a `ValueError` if the passed cost is negative, the cheapest route searches require non-negative costs.
+    """
+
+    if cost < 0:
+        raise ValueError("Route costs must not be negative, got " + str(cost) + ".")
+    pass
+
+def _costKey(item:tuple) -> tuple:
+    """
+    Returns the sort key of a `pairCosts` item, whose instant transition names are None.
+    """
+
+    (stateName, nextStateName, transName), cost = item
+    return (stateName, nextStateName, transName or "")
+
+class HierarchicalRouteStore(LazyRouteStore):
+    """
+    Route store for FSMs made of composite states, which routes every level on its own and combines the levels per request.\n
+    Every sub-machine, the states owned by the same composite state, gets its own `CompactRouteStore` over its inner transitions.
+    The portals, the states with transitions to or from other sub-machines, form a small graph whose edges are those transitions
+    and the routes between the portals of each sub-machine, and the cheapest routes between every pair of portals are kept.
+    A route leaving its sub-machine is the cheapest combination of a route to an exit portal, a portal route and a route from an entry portal,
+    so the store holds the sum of the sub-machine tables and the portal routes instead of a table over every state pair.
+    The combined routes are as short as the ones a BFS of the whole graph finds and are kept in the LRU cache of the `LazyRouteStore`.
+    """
+
+    def __init__(self, maxSize:int = 1024, levels:dict = None):
+        """
+        Constructs an empty hierarchical route store.
+
+        Args:
+            maxSize (:class:`int`, default = 1024): The maximum number of cached routes.
+            levels (:class:`dict`, default = None): The name of the composite state owning every state, accessed by the state names, see `FSM.addCompositeState`.
+            States missing from it are at the top level.
+
+        Attributes:
+            ~ pyFsm.routeStores.HierarchicalRouteStore.levels: The name of the composite state owning every state, accessed by the state names.
+        """
+
+        super().__init__(maxSize)
+
+        self.levels = levels if levels is not None else {}
+        """The name of the composite state owning every state, accessed by the state names."""
+
+        self._dirty = False
+        """Whether the level tables must be recomputed before the next route request."""
+        self._subStores = {}
+        """The route stores of the sub-machines accessed by the composite state names, None for the top level."""
+        self._exits = {}
+        """The states with transitions to other sub-machines accessed by the composite state names."""
+        self._entries = {}
+        """The states with transitions from other sub-machines accessed by the composite state names."""
+        self._portalRoutes = {}
+        """The cheapest `(portalName, expansionIndex)` routes between the portals."""
+        self._portalLengths = {}
+        """The number of hops of the portal routes, accessed by `[portalName][destPortalName]`."""
+        self._expansions = []
+        """The `(stateName, transName)` hops of every portal graph edge accessed by its index."""
+        pass
+
+    def rebuild(self, stateGraph:dict):
+        """
+        Drops every cached route and binds the store to the passed state graph, the level tables are recomputed on the next route request.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph created by `heuristics.buildStateGraph`.
+        """
+
+        super().rebuild(stateGraph)
+        self._dirty = True
+        pass
+
+    def addTransition(self, stateGraph:dict, stateName:str, nextStateName:str, transName:str):
+        """
+        Drops every cached route and binds the store to the passed state graph, the level tables are recomputed on the next route request.
+
+        Args:
+            stateGraph (:class:`dict`): The state graph containing the new transition.
+            stateName (:class:`str`): The source state name.
+            nextStateName (:class:`str`): The target state name.
+            transName (:class:`str`): The transition name, if any.
+        """
+
+        super().addTransition(stateGraph, stateName, nextStateName, transName)
+        self._dirty = True
+        pass
+
+    def memoryUsage(self) -> int:
+        """
+        Returns the approximate number of bytes held by the sub-machine tables, not counting the portal routes.
+        """
+
+        if self._dirty:
+            self._compile()
+        return sum(subStore.memoryUsage() for subStore in self._subStores.values())
+
+    def _findRoute(self, stateName:str, destStateName:str) -> list:
+        """
+        Combines the shortest route of a state pair missing from the cache from the level tables, None if the destination state is unreachable.
+        """
+
+        if self._dirty:
+            self._compile()
+
+        if stateName not in self._stateGraph or destStateName not in self._stateGraph:
+            return None
+        if stateName == destStateName:
+            return []
+
+        level = self.levels.get(stateName)
+        destLevel = self.levels.get(destStateName)
+        route = self._subRoute(level, stateName, destStateName) if level == destLevel else None
+        bestLength = len(route) if route is not None else None
+        best = None
+
+        #The route leaves its sub-machine through an exit portal and enters the destination one through an entry portal
+        tails = {}
+        for entry in self._entries.get(destLevel, ()):
+            tail = self._subRoute(destLevel, entry, destStateName)
+            if tail is not None:
+                tails[entry] = tail
+
+        for exit in self._exits.get(level, ()):
+            head = self._subRoute(level, stateName, exit) if tails else None
+            if head is None:
+                continue
+
+            portalLengths = self._portalLengths[exit]
+            for entry, tail in tails.items():
+                middle = portalLengths.get(entry)
+                if middle is None:
+                    continue
+                length = len(head) + middle + len(tail)
+                if bestLength is None or length < bestLength:
+                    bestLength = length
+                    best = (head, exit, entry, tail)
+
+        if best is None:
+            return route
+
+        head, exit, entry, tail = best
+        route = list(head)
+        for portal, expansion in self._portalRoutes[exit][entry]:
+            route.extend(self._expansions[expansion])
+        route.extend(tail)
+        return route
+
+    def _subRoute(self, level:str, stateName:str, destStateName:str) -> list:
+        """
+        Returns the route between two states of the same sub-machine through its inner transitions, None if there is none.
+        """
+
+        try:
+            return list(self._subStores[level].getRoute(stateName, destStateName))
+        except KeyError:
+            return None
+
+    def _compile(self):
+        """
+        Splits the state graph into its sub-machines, computes their tables and the cheapest routes between their portals.
+        """
+
+        levels = self.levels
+        subGraphs = {}
+        portalGraph = {}
+        expansions = []
+        exits = {}
+        entries = {}
+
+        for stateName in self._stateGraph:
+            subGraphs.setdefault(levels.get(stateName), {})[stateName] = []
+
+        for stateName, transitions in self._stateGraph.items():
+            level = levels.get(stateName)
+            for nextState, trans in transitions:
+                nextLevel = levels.get(nextState)
+                if nextLevel == level:
+                    subGraphs[level][stateName].append((nextState, trans))
+                    continue
+
+                exits.setdefault(level, {})[stateName] = None
+                entries.setdefault(nextLevel, {})[nextState] = None
+                portalGraph.setdefault(nextState, [])
+                portalGraph.setdefault(stateName, []).append((nextState, len(expansions)))
+                expansions.append([(nextState, trans)])
+
+        self._subStores = {}
+        for level, subGraph in subGraphs.items():
+            subStore = self._subStores[level] = CompactRouteStore()
+            subStore.rebuild(subGraph)
+            subStore._compile()
+
+        self._exits = {level: list(portals) for level, portals in exits.items()}
+        self._entries = {level: list(portals) for level, portals in entries.items()}
+
+        #Every portal of a sub-machine is linked to the other ones it can reach inside it
+        for level in subGraphs:
+            portals = list(dict.fromkeys(self._entries.get(level, []) + self._exits.get(level, [])))
+            for portal in portals:
+                for destPortal in portals:
+                    if portal == destPortal:
+                        continue
+                    inner = self._subRoute(level, portal, destPortal)
+                    if inner is not None:
+                        portalGraph[portal].append((destPortal, len(expansions)))
+                        expansions.append(inner)
+
+        self._expansions = expansions
+        self._portalRoutes = sort.findCheapestRoutes(portalGraph, lambda stateName, nextStateName, expansion: len(expansions[expansion]))
+        self._portalLengths = {portal: {destPortal: sum(len(expansions[expansion]) for _, expansion in route) for destPortal, route in routes.items()}
+                               for portal, routes in self._portalRoutes.items()}
+        self._dirty = False
+        pass
@@ -0,0 +1,243 @@
+from . import fsmGlobals as globals
+from .fsmLib import FSMStates
+
+from collections import deque
+from time import perf_counter
+import heapq
+import itertools
+import threading
+
+ROUND_ROBIN = "roundRobin"
+"""The ready FSMs are stepped in the order they became ready"""
+PRIORITY = "priority"
+"""The ready FSMs with the lowest priority value are stepped first, round-robin among equal priorities"""
+
+class Scheduler:
+    """
+    Drives many FSMs from one loop by time-slicing them.\n
+    The scheduler keeps a ready queue of the FSMs with pending destinations and steps each one
+    for at most `sliceSteps` destinations per slice, so one busy FSM cannot starve the others.
+    FSMs waiting for a callback or for an off-thread transition are parked outside of the ready queue
+    and woken when `nextState` is called or the transition completes, and idle FSMs are woken
+    when a destination is piped into them.
+    """
+
+    def __init__(self, sliceSteps:int = 16, policy:str = ROUND_ROBIN):
+        """
+        Constructs an empty scheduler.
+
+        Args:
+            sliceSteps (:class:`int`, default = 16): The maximum number of destinations an FSM consumes per slice.
+            policy (:class:`str`, default = ROUND_ROBIN): The ready queue policy, `ROUND_ROBIN` or `PRIORITY`.
+
+        Attributes:
+            ~ pyFsm.scheduler.Scheduler.sliceSteps: The maximum number of destinations an FSM consumes per slice.
+            ~ pyFsm.scheduler.Scheduler.policy: The ready queue policy.
+            ~ pyFsm.scheduler.Scheduler.slices: The number of slices run.
+            ~ pyFsm.scheduler.Scheduler.steps: The number of destinations consumed by the scheduled FSMs.
+            ~ pyFsm.scheduler.Scheduler.wakeups: The number of times a parked or idle FSM was made ready.
+            ~ pyFsm.scheduler.Scheduler.maxLatency: The longest time in seconds an FSM waited in the ready queue.
+            ~ pyFsm.scheduler.Scheduler.busyTime: The time in seconds spent running slices.
+
+        Raises:
+            (:class:`ValueError`): if the policy is unknown.
+        """
+
+        if policy not in (ROUND_ROBIN, PRIORITY):
+            raise ValueError("Unknown scheduler policy: {}".format(policy))
+
+        self.sliceSteps = sliceSteps
+        """The maximum number of destinations an FSM consumes per slice."""
+        self.policy = policy
+        """The ready queue policy."""
+
+        self.slices = 0
+        """The number of slices run."""
+        self.steps = 0
+        """The number of destinations consumed by the scheduled FSMs."""
+        self.wakeups = 0
+        """The number of times a parked or idle FSM was made ready."""
+        self.maxLatency = 0.0
+        """The longest time in seconds an FSM waited in the ready queue."""
+        self.busyTime = 0.0
+        """The time in seconds spent running slices."""
+
+        self._totalLatency = 0.0
+        """The summed ready queue wait times of the run slices."""
+        self._priorities = {}
+        """The priorities of the scheduled FSMs, accessed by the FSMs."""
+        self._ready = deque() if policy == ROUND_ROBIN else []
+        """The ready queue of `(priority, sequence, readySince, fsm)` entries, a deque or a heap depending on the policy."""
+        self._readySet = set()
+        """The FSMs currently in the ready queue."""
+        self._sequence = itertools.count()
+        """The ready queue sequence, keeping equal priorities in FIFO order."""
+        self._lock = threading.Lock()
+        """The lock guarding the ready queue, as FSMs may be woken from other threads."""
+        pass
+
+    def add(self, fsm, priority:int = 0):
+        """
+        Schedules the passed FSM. It is made ready if it has pending destinations.
+
+        Args:
+            fsm (:class:`FSM`): The FSM to schedule.
+            priority (:class:`int`, default = 0): The priority of the FSM under the `PRIORITY` policy, lower runs first.
+
+        Raises:
+            (:class:`ValueError`): if the FSM is already driven by another scheduler.
+        """
+
+        if fsm._scheduler is not None and fsm._scheduler is not self:
+            raise ValueError("The FSM is already driven by another scheduler.")
+
+        fsm._scheduler = self
+        self._priorities[fsm] = priority
+
+        if self._hasWork(fsm):
+            self.wake(fsm)
+        pass
+
+    def addRegistered(self, priority:int = 0):
+        """
+        Schedules every open FSM of the global registry which is not driven by a scheduler yet.
+
+        Args:
+            priority (:class:`int`, default = 0): The priority of the added FSMs.
+        """
+
+        for fsm in list(globals.fsms.values()):
+            if fsm._scheduler is None and not fsm.isClosed():
+                self.add(fsm, priority)
+        pass
+
+    def remove(self, fsm):
+        """
+        Stops scheduling the passed FSM, it is driven by its own `run` and `nextState` calls again.
+        """
+
+        with self._lock:
+            self._priorities.pop(fsm, None)
+            self._readySet.discard(fsm)
+
+        if fsm._scheduler is self:
+            fsm._scheduler = None
+        pass
+
+    def wake(self, fsm):
+        """
+        Makes the passed scheduled FSM ready, if it is not already.\n
+        It is called by the FSM itself when a destination is piped into it, when `nextState` is called
+        and when an off-thread transition completes, and it may be called from any thread.
+        """
+
+        with self._lock:
+            if fsm in self._readySet or fsm not in self._priorities:
+                return
+
+            self._readySet.add(fsm)
+            self.wakeups += 1
+            entry = (self._priorities[fsm], next(self._sequence), perf_counter(), fsm)
+
+            if self.policy == ROUND_ROBIN:
+                self._ready.append(entry)
+            else:
+                heapq.heappush(self._ready, entry)
+        pass
+
+    def runSlice(self) -> bool:
+        """
+        Runs one slice of the next ready FSM.
+
+        Returns:
+            Whether a slice was run, False if no FSM is ready.
+        """
+
+        fsm, readySince = self._popReady()
+        if fsm is None:
+            return False
+
+        start = perf_counter()
+        latency = start - readySince
+        self._totalLatency += latency
+        if latency > self.maxLatency:
+            self.maxLatency = latency
+
+        self.steps += fsm.run(self.sliceSteps)
+        self.slices += 1
+
+        #FSMs waiting on a callback or a transition are parked, they are woken by `nextState` or the transition future
+        if fsm.isTransitionPending():
+            fsm._pendingTransition.add_done_callback(lambda future: self.wake(fsm))
+        elif fsm.getInternalFsmState() is not FSMStates.WAITING_FOR_CB and self._hasWork(fsm):
+            self.wake(fsm)
+
+        self.busyTime += perf_counter() - start
+        return True
+
+    def run(self, maxSlices:int = None) -> int:
+        """
+        Runs slices until no FSM is ready.
+
+        Args:
+            maxSlices (:class:`int`, default = None): The maximum number of slices to run, None to run until no FSM is ready.
+
+        Returns:
+            The number of slices run.
+        """
+
+        slices = 0
+        while (maxSlices is None or slices < maxSlices) and self.runSlice():
+            slices += 1
+        return slices
+
+    def readyCount(self) -> int:
+        """
+        Returns the number of FSMs in the ready queue.
+        """
+        return len(self._readySet)
+
+    def stats(self) -> dict:
+        """
+        Returns the scheduler counters.
+
+        Returns:
+            A dictionary with the `scheduled`, `ready`, `slices`, `steps` and `wakeups` counts,
+            the `meanLatency` and `maxLatency` ready queue wait times in seconds
+            and the `throughput` in consumed destinations per second of slice time.
+        """
+
+        return {
+            "scheduled": len(self._priorities),
+            "ready": len(self._readySet),
+            "slices": self.slices,
+            "steps": self.steps,
+            "wakeups": self.wakeups,
+            "meanLatency": self._totalLatency / self.slices if self.slices else 0.0,
+            "maxLatency": self.maxLatency,
+            "throughput": self.steps / self.busyTime if self.busyTime else 0.0,
+        }
+
+    def _popReady(self):
+        """
+        Pops the next ready FSM and the time it became ready, `(None, None)` if no FSM is ready.
+        """
+
+        with self._lock:
+            while self._ready:
+                if self.policy == ROUND_ROBIN:
+                    priority, sequence, readySince, fsm = self._ready.popleft()
+                else:
+                    priority, sequence, readySince, fsm = heapq.heappop(self._ready)
+
+                #Removed FSMs leave stale entries behind
+                if fsm in self._readySet:
+                    self._readySet.discard(fsm)
+                    return fsm, readySince
+        return None, None
+
+    def _hasWork(self, fsm) -> bool:
+        """
+        Returns whether the passed FSM has a destination to continue or consume.
+        """
+        return fsm._cachedDestState is not None or not fsm._destQueue.empty()
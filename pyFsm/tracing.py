@@ -0,0 +1,552 @@
+import mmap
+import struct
+import time
+import zlib
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TRACE_MAGIC = b"PYFSMTRC"
+"""The magic bytes starting every trace log"""
+TRACE_VERSION = 1
+"""The trace log format version"""
+
+_HEADER = struct.Struct("<8sHHIQQ")
+"""magic, version, record size, reserved, record count, string table offset"""
+_RECORD = struct.Struct("<diiiI")
+"""timestamp, from name ID, transition name ID, to name ID, arguments digest"""
+_RECORD_DTYPE = numpy.dtype([("timestamp", "<f8"), ("fromId", "<i4"), ("transId", "<i4"), ("toId", "<i4"), ("digest", "<u4")]) if numpy is not None else None
+"""The NumPy dtype of the packed records"""
+_NAME_LENGTH = struct.Struct("<H")
+"""The length prefix of every string table entry"""
+_NAME_COUNT = struct.Struct("<I")
+"""The entry count prefix of the string table"""
+_FOOTER = struct.Struct("<QQ8s")
+"""record count, string table offset, magic"""
+_FOOTER_MAGIC = b"PYFSMEND"
+"""The magic bytes ending every flushed trace log"""
+_FLUSH_SIZE = 1 << 16
+"""The buffered record bytes written to the file at once"""
+_TABLE_GAP = _FLUSH_SIZE + _RECORD.size
+"""The bytes left free after the records of a log file before its string table, room for the records of the next flush"""
+_UNKNOWN = -2
+"""The name ID of graph names missing from the string table of a log"""
+_VALUE_TYPES = frozenset((bool, int, float, complex, str, bytes))
+"""The argument types encoded by their `repr`"""
+
+class TraceRecorder:
+    """
+    Records every state a FSM enters as a fixed size binary record of
+    `(timestamp, fromState, transition, toState, argsDigest)`, where the names are IDs into the string table of the log.\n
+
+    The log starts with a fixed header followed by the struct-packed records, the string table and a footer,
+    so the records can be memory-mapped and unpacked in bulk by `TraceLog`. The recording FSM runs a copy of its
+    `DispatchPlan` whose state and transition functions append the records, unrecorded FSMs run the plain plan.\n
+
+    Every flush writes the new records, then the string table and the footer past both the records of the next flush
+    and the footer of the previous one, so a log cut short anywhere, such as the log of a crashed process,
+    is still readable up to its last complete flush.\n
+
+    The arguments digest is the CRC32 of a stable encoding of the arguments passed to a destination state, 0 if there are none.
+    Numbers, strings, bytes, None and the containers of them are encoded by value, every other object by its type name only,
+    so the digest does not depend on object addresses or on the process.
+    """
+
+    def __init__(self, path:str = None):
+        """
+        Constructs a recorder writing to the passed file, or keeping the log in memory.
+
+        Args:
+            path (:class:`str`, default = None): The path of the log file, None to keep the log in memory, see `getBytes`.
+
+        Attributes:
+            ~ pyFsm.tracing.TraceRecorder.path: The path of the log file, None for an in memory log.
+            ~ pyFsm.tracing.TraceRecorder.recordCount: The number of recorded states.
+        """
+
+        self.path = path
+        """The path of the log file, None for an in memory log."""
+        self.recordCount = 0
+        """The number of recorded states."""
+
+        self._names = []
+        """The string table, accessed by the name IDs."""
+        self._nameIds = {}
+        """The name IDs accessed by the state and transition names."""
+        self._buffer = bytearray()
+        """The records not written to the file yet, or every record of an in memory log."""
+        self._file = open(path, "wb") if path is not None else None
+        """The log file, None for an in memory log."""
+        self._recordsEnd = _HEADER.size
+        """The file offset the next flushed records are written at."""
+        self._tableOffset = 0
+        """The file offset of the string table of the last flush."""
+        self._fileEnd = _HEADER.size
+        """The size of the log file, where the footer of the last flush ends."""
+        self._fromId = -1
+        """The name ID of the state the recorded FSM is at."""
+        self._transId = -1
+        """The name ID of the transition the recorded FSM is walking, -1 for instant transitions."""
+        self._closed = False
+        """Whether the log was finalized."""
+
+        if self._file is not None:
+            self._file.write(_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, _RECORD.size, 0, 0, 0))
+            self.flush()
+        pass
+
+    def attach(self, fsm):
+        """
+        Starts tracking the current state of the passed FSM. Use `FSM.recordTrace` instead of calling it directly.
+        """
+
+        self._fromId = self._nameId(fsm.getCurrentFsmState())
+        pass
+
+    def instrumentPlan(self, plan):
+        """
+        Returns a copy of the passed `DispatchPlan` whose state and transition functions append the trace records.
+        """
+
+        traced = object.__new__(type(plan))
+        traced.__dict__.update(plan.__dict__)
+
+        traced.states = [(name, self._tracedState(self._nameId(name), func), wfc, argsKind, stateId)
+                         for name, func, wfc, argsKind, stateId in plan.states]
+        traced.transitions = [(name, self._tracedTransition(self._nameId(name), func), wfc, argsKind, offThread)
+                              for name, func, wfc, argsKind, offThread in plan.transitions]
+        return traced
+
+    def flush(self):
+        """
+        Writes the pending records, followed by the string table and the footer, to the log file.\n
+        The log file is readable up to the flushed records even if the recorder is never closed.
+        """
+
+        if self._file is None or self._closed:
+            return
+
+        if self._buffer:
+            self._file.seek(self._recordsEnd)
+            self._file.write(self._buffer)
+            self._recordsEnd += len(self._buffer)
+            self._buffer = bytearray()
+
+        #The previous string table and footer stay intact until the new ones are complete
+        self._tableOffset = max(self._fileEnd, self._recordsEnd + _TABLE_GAP)
+        self._file.seek(self._tableOffset)
+        self._file.write(_packNames(self._names) + _FOOTER.pack(self.recordCount, self._tableOffset, _FOOTER_MAGIC))
+        self._fileEnd = self._file.tell()
+        self._file.flush()
+        pass
+
+    def close(self):
+        """
+        Writes the pending records and the string table and finalizes the header of the log.\n
+        A closed recorder no longer appends records.
+        """
+
+        if self._closed:
+            return
+
+        if self._file is not None:
+            self.flush()
+            self._file.seek(0)
+            self._file.write(_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, _RECORD.size, 0, self.recordCount, self._tableOffset))
+            self._file.close()
+
+        self._closed = True
+        pass
+
+    def getBytes(self) -> bytes:
+        """
+        Returns the complete log of an in memory recorder, in the same format as a log file.
+
+        Raises:
+            (:class:`ValueError`): if the recorder writes to a file.
+        """
+
+        if self._file is not None or self.path is not None:
+            raise ValueError("The trace log is written to " + str(self.path))
+
+        stringTableOffset = _HEADER.size + len(self._buffer)
+        return (_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, _RECORD.size, 0, self.recordCount, stringTableOffset) + bytes(self._buffer)
+                + _packNames(self._names) + _FOOTER.pack(self.recordCount, stringTableOffset, _FOOTER_MAGIC))
+
+    def __enter__(self):
+        """
+        Returns the recorder, which is closed when the `with` block exits.
+        """
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        """
+        Closes the recorder.
+        """
+        self.close()
+        pass
+
+    def _tracedState(self, nameId:int, func):
+        """
+        Returns the passed state function wrapped to append its record before it runs.
+        """
+
+        def tracedState(*args, **kwargs):
+            if not self._closed:
+                digest = _digestArguments(args, kwargs) if args or kwargs else 0
+                self._buffer += _RECORD.pack(time.time(), self._fromId, self._transId, nameId, digest)
+                self.recordCount += 1
+                if self._file is not None and len(self._buffer) >= _FLUSH_SIZE:
+                    self.flush()
+
+            self._fromId = nameId
+            self._transId = -1
+            return func(*args, **kwargs)
+        return tracedState
+
+    def _tracedTransition(self, nameId:int, func):
+        """
+        Returns the passed transition function wrapped to remember it for the record of the next state.
+        """
+
+        def tracedTransition(*args, **kwargs):
+            self._transId = nameId
+            return func(*args, **kwargs)
+        return tracedTransition
+
+    def _nameId(self, name:str) -> int:
+        """
+        Returns the string table ID of the passed name, adding it if needed.
+        """
+
+        nameId = self._nameIds.get(name)
+        if nameId is None:
+            nameId = self._nameIds[name] = len(self._names)
+            self._names.append(name)
+        return nameId
+
+class TraceLog:
+    """
+    A read only view of a trace log written by `TraceRecorder`.\n
+    Log files are memory-mapped, so the records are unpacked straight from the page cache.\n
+
+    A log that was not closed by its recorder, or whose last flush was cut short, is read up to the last flush with an intact footer.
+    """
+
+    def __init__(self, data):
+        """
+        Constructs a view of the passed log bytes. Use `TraceLog.open` to read a log file.
+
+        Args:
+            data (:class:`bytes`, `mmap` or `memoryview`): The complete log.
+
+        Attributes:
+            ~ pyFsm.tracing.TraceLog.names: The string table of the log, accessed by the name IDs.
+            ~ pyFsm.tracing.TraceLog.recordCount: The number of records in the log.
+
+        Raises:
+            (:class:`ValueError`): if the data is not a trace log of a supported version, or holds no complete flush.
+        """
+
+        magic, version, recordSize, reserved, recordCount, stringTableOffset = _HEADER.unpack_from(data, 0)
+        if magic != TRACE_MAGIC:
+            raise ValueError("Not a pyFsm trace log.")
+        if version != TRACE_VERSION or recordSize != _RECORD.size:
+            raise ValueError("Unsupported trace log version: " + str(version))
+        if stringTableOffset == 0:
+            recordCount, stringTableOffset = _recoverFooter(data)
+
+        self.recordCount = recordCount
+        """The number of records in the log."""
+        self.names = _unpackNames(data, stringTableOffset)
+        """The string table of the log, accessed by the name IDs."""
+
+        self._data = data
+        """The complete log."""
+        self._records = memoryview(data)[_HEADER.size:_HEADER.size + recordCount * _RECORD.size]
+        """The packed records."""
+        self._file = None
+        """The memory-mapped log file, if any."""
+        pass
+
+    @classmethod
+    def open(cls, path:str):
+        """
+        Memory-maps the passed log file.
+
+        Args:
+            path (:class:`str`): The path of the log file.
+        """
+
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        log = cls(data)
+        log._file = data
+        return log
+
+    def close(self):
+        """
+        Releases the memory map of a log file.
+        """
+
+        self._records.release()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+        pass
+
+    def __len__(self) -> int:
+        return self.recordCount
+
+    def iterRecords(self):
+        """
+        Yields the raw `(timestamp, fromId, transId, toId, argsDigest)` records, the IDs index `names` and are -1 when unknown or instant.
+        """
+
+        return _RECORD.iter_unpack(self._records)
+
+    def __iter__(self):
+        """
+        Yields the `(timestamp, fromState, transition, toState, argsDigest)` records with the names resolved, None for instant transitions.
+        """
+
+        names = self.names + [None]
+        for timestamp, fromId, transId, toId, digest in _RECORD.iter_unpack(self._records):
+            yield timestamp, names[fromId], names[transId], names[toId], digest
+
+    def replay(self, fsm, raiseEvents:bool = False) -> int:
+        """
+        Re-drives the passed FSM through the recorded states without calling any state or transition function.\n
+        Every record is checked against the graph of the FSM, the FSM ends at the last recorded state.
+
+        Args:
+            fsm (:class:`FSM`): A FSM with the same states and transitions as the recorded one.
+            raiseEvents (:class:`bool`, default = False): Whether the event handlers of the FSM are called for every replayed state.
+
+        Returns:
+            The number of replayed records.
+
+        Raises:
+            (:class:`ValueError`): if a record does not match the current state or the graph of the FSM, before the FSM leaves that state.
+        """
+
+        names = self.names
+        stateGraph = fsm._stateGraph
+
+        #Every (fromId, transId, toId) triple the graph allows, in the name IDs of the log
+        nameIds = {name: nameId for nameId, name in enumerate(names)}
+        allowed = set()
+        for stateName, edges in stateGraph.items():
+            fromId = nameIds.get(stateName)
+            for nextState, transName in edges:
+                toId = nameIds.get(nextState)
+                if fromId is not None and toId is not None:
+                    allowed.add((fromId, nameIds.get(transName, _UNKNOWN) if transName is not None else -1, toId))
+
+        currentId = nameIds.get(fsm.getCurrentFsmState(), -1)
+
+        if raiseEvents or numpy is None:
+            mismatch, lastId = self._scanRecords(fsm if raiseEvents else None, currentId, allowed)
+        else:
+            mismatch, lastId = self._scanRecordsNumpy(currentId, allowed)
+
+        _moveTo(fsm, names, lastId)
+        if mismatch >= 0:
+            timestamp, fromId, transId, toId, digest = _RECORD.unpack_from(self._records, mismatch * _RECORD.size)
+            raise ValueError("Trace record {} ({} -> {}) does not match the FSM at {}.".format(
+                mismatch, names[fromId] if fromId >= 0 else None, names[toId], fsm.getCurrentFsmState()))
+        return self.recordCount
+
+    def _scanRecords(self, fsm, currentId:int, allowed:set):
+        """
+        Follows the records from the passed state name ID, raising the state reached events of the passed FSM if any.
+
+        Returns:
+            The index of the first mismatching record, -1 if every record matches, and the name ID of the last matching state.
+        """
+
+        names = self.names
+        index = 0
+
+        for timestamp, fromId, transId, toId, digest in _RECORD.iter_unpack(self._records):
+            if fromId != currentId or (fromId, transId, toId) not in allowed:
+                return index, currentId
+
+            currentId = toId
+            index += 1
+
+            if fsm is not None:
+                fsm.currentGraphState = names[toId]
+                _raiseReplayedEvent(fsm, names, fromId, transId, toId)
+
+        return -1, currentId
+
+    def _scanRecordsNumpy(self, currentId:int, allowed:set):
+        """
+        The NumPy implementation of `_scanRecords`, checking every record at once.
+        """
+
+        if self.recordCount == 0:
+            return -1, currentId
+
+        records = numpy.frombuffer(self._records, dtype = _RECORD_DTYPE)
+        fromIds = records["fromId"].astype(numpy.int64)
+        transIds = records["transId"].astype(numpy.int64)
+        toIds = records["toId"].astype(numpy.int64)
+
+        #Every record must start where the previous one ended, on an edge of the graph
+        previousIds = numpy.empty_like(toIds)
+        previousIds[0] = currentId
+        previousIds[1:] = toIds[:-1]
+
+        base = len(self.names) + 3
+        keys = ((fromIds + 2) * base + transIds + 2) * base + toIds + 2
+        allowedKeys = numpy.array([((fromId + 2) * base + transId + 2) * base + toId + 2 for fromId, transId, toId in allowed], dtype = numpy.int64)
+
+        valid = (fromIds == previousIds) & numpy.isin(keys, allowedKeys)
+        if valid.all():
+            return -1, int(toIds[-1])
+
+        mismatch = int(numpy.argmin(valid))
+        return mismatch, int(previousIds[mismatch]) if mismatch > 0 else currentId
+
+def _moveTo(fsm, names:list, nameId:int):
+    """
+    Sets the current state of the FSM to the passed name ID without calling the state, if it is known.
+    """
+
+    if nameId >= 0:
+        fsm.currentGraphState = names[nameId]
+        fsm._determineInternalFsmState()
+    pass
+
+def _raiseReplayedEvent(fsm, names:list, fromId:int, transId:int, toId:int):
+    """
+    Calls the state reached handlers of the FSM for a replayed record.
+    """
+
+    handlers = fsm._stateReachedHandlers
+    if not handlers:
+        return
+
+    event = fsm._event
+    event.fromState = names[fromId]
+    event.toState = names[toId]
+    event.transition = names[transId] if transId >= 0 else None
+    event.isDestination = False
+
+    for handler, takesEvent in handlers:
+        if takesEvent:
+            handler(event)
+        else:
+            handler()
+    pass
+
+def _recoverFooter(data):
+    """
+    Returns the record count and the string table offset of the last flush of a log that was not closed,
+    searching the footers from the end of the log and skipping any footer whose string table is incomplete.
+
+    Raises:
+        (:class:`ValueError`): if no flush of the log is intact.
+    """
+
+    finder = data if hasattr(data, "rfind") else bytes(data)
+    end = len(data)
+
+    while True:
+        position = finder.rfind(_FOOTER_MAGIC, _HEADER.size, end)
+        if position < 0:
+            raise ValueError("The trace log holds no complete flush of its recorder.")
+        end = position + len(_FOOTER_MAGIC) - 1
+
+        footerOffset = position + len(_FOOTER_MAGIC) - _FOOTER.size
+        if footerOffset < _HEADER.size:
+            continue
+
+        recordCount, stringTableOffset, magic = _FOOTER.unpack_from(data, footerOffset)
+        if stringTableOffset < _HEADER.size + recordCount * _RECORD.size or stringTableOffset > footerOffset:
+            continue
+        try:
+            if _namesEnd(data, stringTableOffset) == footerOffset:
+                return recordCount, stringTableOffset
+        except (struct.error, ValueError):
+            pass
+
+def _namesEnd(data, offset:int) -> int:
+    """
+    Returns the offset following the string table starting at the passed offset.
+    """
+
+    count, = _NAME_COUNT.unpack_from(data, offset)
+    offset += _NAME_COUNT.size
+
+    for _ in range(count):
+        length, = _NAME_LENGTH.unpack_from(data, offset)
+        offset += _NAME_LENGTH.size + length
+        if offset > len(data):
+            raise ValueError("The string table is truncated.")
+    return offset
+
+def _digestArguments(args:tuple, kwargs:dict) -> int:
+    """
+    Returns the CRC32 of the stable encoding of the passed arguments.
+    """
+
+    return zlib.crc32(_encodeArgument((args, kwargs)).encode("utf-8"))
+
+def _encodeArgument(value) -> str:
+    """
+    Returns a text encoding of the passed value that is the same in every process.\n
+    Numbers, strings, bytes and None are encoded by value, tuples, lists, sets and dictionaries by their items,
+    and every other object by its type name, since its `repr` may hold its address.
+    """
+
+    valueType = type(value)
+    if value is None or valueType in _VALUE_TYPES:
+        return repr(value)
+    if valueType is tuple or valueType is list:
+        return valueType.__name__ + "(" + ",".join(_encodeArgument(item) for item in value) + ")"
+    if valueType is set or valueType is frozenset:
+        return valueType.__name__ + "(" + ",".join(sorted(_encodeArgument(item) for item in value)) + ")"
+    if valueType is dict:
+        return "dict(" + ",".join(sorted(_encodeArgument(key) + ":" + _encodeArgument(item) for key, item in value.items())) + ")"
+    return "<" + valueType.__module__ + "." + valueType.__qualname__ + ">"
+
+def _packNames(names:list) -> bytes:
+    """
+    Packs the passed string table.
+    """
+
+    packed = bytearray(_NAME_COUNT.pack(len(names)))
+    for name in names:
+        encoded = name.encode("utf-8")
+        packed += _NAME_LENGTH.pack(len(encoded))
+        packed += encoded
+    return bytes(packed)
+
+def _unpackNames(data, offset:int) -> list:
+    """
+    Unpacks the string table starting at the passed offset.
+    """
+
+    names = []
+    count, = _NAME_COUNT.unpack_from(data, offset)
+    offset += _NAME_COUNT.size
+
+    for _ in range(count):
+        length, = _NAME_LENGTH.unpack_from(data, offset)
+        offset += _NAME_LENGTH.size
+        names.append(bytes(data[offset:offset + length]).decode("utf-8"))
+        offset += length
+    return names
@@ -0,0 +1,24 @@
+# This directory is a Python module
+from . import batchBench # noqa
+from . import benchGraphs # noqa
+from . import compactRouteBench # noqa
+from . import contentionBench # noqa
+from . import definitionBench # noqa
+from . import diagramCacheBench # noqa
+from . import dispatchBench # noqa
+from . import eventBench # noqa
+from . import eventBufferBench # noqa
+from . import executorBench # noqa
+from . import graphAnalysisBench # noqa
+from . import hierarchicalRouteBench # noqa
+from . import lazyRouteBench # noqa
+from . import profilingBench # noqa
+from . import queueBench # noqa
+from . import queuePolicyBench # noqa
+from . import routeBuildBench # noqa
+from . import schedulerBench # noqa
+from . import snapshotBench # noqa
+from . import streamBench # noqa
+from . import traceBench # noqa
+from . import trampolineBench # noqa
+from . import weightedRouteBench # noqa
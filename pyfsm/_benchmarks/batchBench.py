@@ -0,0 +1,49 @@
+from pyfsm.fsmLib import *
+from pyfsm.machineDefinition import *
+from pyfsm.fsmBatch import *
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import random
+
+#The number of states of the shared diagram
+_stateCount = 16
+#The number of instances ticked together
+_instanceCount = 20000
+#The number of destination waves
+_waves = 5
+
+def _start_():
+    states = makeStates("batchBench", _stateCount)
+    definition = MachineDefinition.fromTransitions(states[0], ringEdges(states, chords = 1))
+    plan = definition.plan
+
+    rnd = random.Random(0)
+    waves = [[rnd.randrange(_stateCount) for _ in range(_instanceCount)] for _ in range(_waves)]
+    names = [record[0] for record in plan.states]
+
+    instances = [definition.spawn() for _ in range(_instanceCount)]
+    start = perf_counter()
+    for wave in waves:
+        for instance, destId in zip(instances, wave):
+            instance.goTo(names[destId]).run()
+    loopTime = perf_counter() - start
+
+    batch = FSMBatch(definition, _instanceCount)
+    start = perf_counter()
+    hops = 0
+    for wave in waves:
+        batch.setDestinations(wave)
+        moved = batch.step()
+        while moved:
+            hops += moved
+            moved = batch.step()
+    batchTime = perf_counter() - start
+
+    print("{} instances, {} hops".format(_instanceCount, hops))
+    print("{:>24} {:>14.0f} hops/s".format("MachineInstance.run", hops / loopTime))
+    print("{:>24} {:>14.0f} hops/s".format("FSMBatch.step", hops / batchTime))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
@@ -0,0 +1,59 @@
+from pyfsm.fsmGlobals import *
+import random
+
+def makeStates(prefix:str, count:int, waitsForCallback = False) -> list:
+    """
+    Registers `count` generated state functions named `<prefix>_<index>` and returns them.
+
+    Args:
+        prefix (:class:`str`): The prefix of the generated state names, must be unique per benchmark.
+        count (:class:`int`): The number of states to generate.
+        waitsForCallback (:class:`bool`, default = False): Whether the generated states wait for a callback.
+    """
+
+    states = []
+    for i in range(count):
+        def stateFunc():
+            pass
+        stateFunc.__name__ = "{}_{}".format(prefix, i)
+        states.append(state(waitsForCallback)(stateFunc))
+
+    return states
+
+def makeTransitions(prefix:str, count:int) -> list:
+    """
+    Registers `count` generated transition functions named `<prefix>_<index>` and returns them.
+
+    Args:
+        prefix (:class:`str`): The prefix of the generated transition names, must be unique per benchmark.
+        count (:class:`int`): The number of transitions to generate.
+    """
+
+    transitions = []
+    for i in range(count):
+        def transFunc():
+            pass
+        transFunc.__name__ = "{}_{}".format(prefix, i)
+        transitions.append(transition(transFunc))
+
+    return transitions
+
+def ringEdges(states:list, chords:int = 2, seed:int = 0) -> list:
+    """
+    Returns the `(currentState, nextState)` pairs of a strongly connected ring of the passed states
+    with `chords` extra random edges per state.
+
+    Args:
+        states (:class:`list`): The state functions.
+        chords (:class:`int`, default = 2): The extra random edges per state.
+        seed (:class:`int`, default = 0): The random seed for reproducible graphs.
+    """
+
+    rnd = random.Random(seed)
+    edges = []
+    for i, s in enumerate(states):
+        edges.append((s, states[(i + 1) % len(states)]))
+        for _ in range(chords):
+            edges.append((s, states[rnd.randrange(len(states))]))
+
+    return edges
@@ -0,0 +1,44 @@
+from pyfsm.fsmLib import *
+from pyfsm.routeStores import *
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import tracemalloc
+
+#The graph sizes to benchmark
+_sizes = (100, 200, 400, 800)
+
+def _measure(edges, routeStore):
+    """Builds the FSM, materializes the routes from the first state and returns the elapsed time and the retained memory."""
+    tracemalloc.start()
+    start = perf_counter()
+
+    fsm = FSM(edges[0][0], routeStore = routeStore)
+    fsm.createTransitions(edges)
+    for cState, nState in edges:
+        for _ in routeStore.getRoute(edges[0][0].__name__, nState.__name__):
+            pass
+
+    elapsed = perf_counter() - start
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return elapsed, retained, fsm
+
+def _start_():
+    print("{:>8} {:>12} {:>16} {:>12} {:>16} {:>8}".format("states", "eager (s)", "eager (KB)", "compact (s)", "compact (KB)", "ratio"))
+
+    for size in _sizes:
+        states = makeStates("compactBench{}".format(size), size)
+        edges = ringEdges(states)
+
+        eagerTime, eagerMem, eagerFsm = _measure(edges, EagerRouteStore())
+        del eagerFsm
+        compactTime, compactMem, compactFsm = _measure(edges, CompactRouteStore())
+
+        print("{:>8} {:>12.4f} {:>16} {:>12.4f} {:>16} {:>7.1f}x".format(
+            size, eagerTime, eagerMem // 1024, compactTime, compactMem // 1024, eagerMem / compactMem))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
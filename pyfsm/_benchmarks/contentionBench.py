@@ -0,0 +1,119 @@
+from pyfsm.fsmLib import *
+from pyfsm.fsmGlobals import *
+from pyfsm.concurrentFsm import *
+from pyfsm.destQueues import *
+from time import perf_counter
+import sys
+import threading
+
+#The number of threads piping destinations and calling `nextState`
+_producerCount = 8
+#The number of destinations piped by every producer thread
+_perProducer = 5000
+#The interpreter thread switch interval, short enough for the threads to preempt each other inside the FSM
+_switchInterval = 1e-5
+#The size of the busy loop every state runs
+_stateWorkSize = 200
+
+_active = [0, 0]
+"""The number of states currently executing and the most seen at once"""
+_inline = [0]
+"""The number of states executed by a producer thread instead of the owner thread"""
+_owner = [None]
+"""The ident of the owner thread"""
+_activeLock = threading.Lock()
+
+def _stateWork():
+    """Does a little work while counting the states executing at once, more than one means two threads stepped the FSM together."""
+    with _activeLock:
+        _active[0] += 1
+        _active[1] = max(_active[1], _active[0])
+        if threading.get_ident() != _owner[0]:
+            _inline[0] += 1
+    sum(range(_stateWorkSize))
+    with _activeLock:
+        _active[0] -= 1
+    pass
+
+@state
+def contentionIdle():
+    _stateWork()
+    pass
+
+@state
+def contentionPing():
+    _stateWork()
+    pass
+
+def _produce(fsm, errors:list):
+    """Pipes destinations into the FSM and calls `nextState` after each one, as an I/O thread would."""
+    try:
+        for _ in range(_perProducer // 2):
+            fsm.contentionPing()
+            fsm.nextState()
+            fsm.contentionIdle()
+            fsm.nextState()
+    except Exception as error:
+        errors.append(error)
+    pass
+
+def _measure(label:str, fsm, owner):
+    """Runs the producer threads against the FSM driven by the owner function and prints the results."""
+    fsm.createTransitions([
+        (contentionIdle, contentionPing),
+        (contentionPing, contentionIdle),
+    ])
+
+    _active[0] = _active[1] = 0
+    _inline[0] = 0
+    errors = []
+    done = threading.Event()
+    producers = [threading.Thread(target = _produce, args = (fsm, errors)) for _ in range(_producerCount)]
+    ownerThread = threading.Thread(target = owner, args = (fsm, done))
+
+    start = perf_counter()
+    ownerThread.start()
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+
+    while fsm._destQueue.qsize():
+        done.wait(0.001)
+    done.set()
+    ownerThread.join()
+    elapsed = perf_counter() - start
+
+    total = _producerCount * _perProducer
+    print("{:>14} {:>10} {:>12.0f} {:>10} {:>10} {:>10}".format(label, total, total / elapsed, _inline[0], _active[1], len(errors)))
+    fsm.close()
+    pass
+
+def _pollPlain(fsm, done:threading.Event):
+    """The owner of a plain FSM runs it whenever it finds destinations queued."""
+    _owner[0] = threading.get_ident()
+    while not done.is_set():
+        if not fsm.run():
+            done.wait(0.0001)
+    pass
+
+def _serveConcurrent(fsm, done:threading.Event):
+    """The owner of a concurrent FSM serves it until the producers are done."""
+    _owner[0] = threading.get_ident()
+    threading.Thread(target = lambda: (done.wait(), fsm.stop())).start()
+    fsm.serveForever()
+    pass
+
+def _start_():
+    switchInterval = sys.getswitchinterval()
+    sys.setswitchinterval(_switchInterval)
+    print("{} producer threads, {} destinations each".format(_producerCount, _perProducer))
+    print("{:>14} {:>10} {:>12} {:>10} {:>10} {:>10}".format("fsm", "dests", "dests/s", "inline", "maxActive", "errors"))
+    _measure("FSM", FSM(contentionIdle, destQueue = ThreadSafeDestQueue()), _pollPlain)
+    _measure("ConcurrentFSM", ConcurrentFSM(contentionIdle), _serveConcurrent)
+    sys.setswitchinterval(switchInterval)
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
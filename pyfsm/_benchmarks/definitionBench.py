@@ -0,0 +1,48 @@
+from pyfsm.fsmLib import *
+from pyfsm.machineDefinition import *
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import tracemalloc
+
+#The number of states of the shared diagram
+_stateCount = 32
+#The number of full FSMs created
+_fsmCount = 200
+#The number of lightweight instances created
+_instanceCount = 100000
+
+def _perInstance(factory, count):
+    """Creates `count` objects with the factory and returns the elapsed time and the traced bytes per object."""
+    tracemalloc.start()
+    start = perf_counter()
+
+    objects = [factory() for _ in range(count)]
+
+    elapsed = perf_counter() - start
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return elapsed, retained / len(objects)
+
+def _start_():
+    states = makeStates("definitionBench", _stateCount)
+    edges = ringEdges(states)
+
+    def makeFsm():
+        fsm = FSM(states[0])
+        fsm.createTransitions(edges)
+        return fsm
+
+    definition = MachineDefinition.fromTransitions(states[0], edges)
+
+    fsmTime, fsmBytes = _perInstance(makeFsm, _fsmCount)
+    instanceTime, instanceBytes = _perInstance(definition.spawn, _instanceCount)
+
+    print("{:>18} {:>10} {:>14} {:>16}".format("kind", "count", "create (s)", "bytes/instance"))
+    print("{:>18} {:>10} {:>14.4f} {:>16.0f}".format("FSM", _fsmCount, fsmTime, fsmBytes))
+    print("{:>18} {:>10} {:>14.4f} {:>16.0f}".format("MachineInstance", _instanceCount, instanceTime, instanceBytes))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
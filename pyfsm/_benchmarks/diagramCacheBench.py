@@ -0,0 +1,80 @@
+from pyfsm.fsmLib import *
+from pyfsm import mermaidHandler
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import shutil
+import tempfile
+
+#The number of states of the generated diagram
+_stateCount = 400
+#The number of FSMs created from the cache
+_fsmCount = 20
+#The number of FSMs created without the cache
+_uncachedCount = 3
+
+def _diagram(edges:list) -> str:
+    """Returns the Mermaid state diagram of the passed `(currentState, nextState)` pairs."""
+    lines = ["stateDiagram-v2"]
+    for cState, nState in edges:
+        lines.append("    {} --> {}".format(cState[0].__name__ if isinstance(cState, tuple) else cState.__name__,
+                                            nState[0].__name__ if isinstance(nState, tuple) else nState.__name__))
+    return "\n".join(lines)
+
+def _perFsm(initialState, diagram:str) -> float:
+    """Creates `_fsmCount` FSMs from the diagram and returns the mean creation time."""
+    start = perf_counter()
+    for _ in range(_fsmCount):
+        fsm = FSM(initialState)
+        fsm.createTransitionsFromDiagram(diagram)
+        fsm.compile()
+        fsm.close()
+    return (perf_counter() - start) / _fsmCount
+
+def _start_():
+    states = makeStates("diagramCacheBench", _stateCount)
+    diagram = _diagram(ringEdges(states))
+    directory = tempfile.mkdtemp()
+
+    try:
+        #Uncached: every FSM parses the diagram and computes its routes
+        mermaidHandler.diagramCache = mermaidHandler.DiagramCache()
+        uncachedTime = sum(_uncached(states[0], diagram) for _ in range(_uncachedCount)) / _uncachedCount
+
+        #Memory cache: the first FSM fills the cache, the next ones share its definition
+        mermaidHandler.diagramCache = mermaidHandler.DiagramCache(directory)
+        _uncached(states[0], diagram, clear = False)
+        memoryTime = _perFsm(states[0], diagram)
+
+        #Disk cache: a fresh cache, as in a new process, loads the diagram file once
+        start = perf_counter()
+        mermaidHandler.diagramCache = mermaidHandler.DiagramCache(directory)
+        fsm = FSM(states[0])
+        fsm.createTransitionsFromDiagram(diagram)
+        fsm.compile()
+        fsm.close()
+        diskTime = perf_counter() - start
+    finally:
+        shutil.rmtree(directory)
+        mermaidHandler.diagramCache = mermaidHandler.DiagramCache()
+
+    print("{} states, {} edges".format(_stateCount, diagram.count("-->")))
+    print("{:>22} {:>14}".format("case", "ms/FSM"))
+    print("{:>22} {:>14.2f}".format("parse + routes", uncachedTime * 1e3))
+    print("{:>22} {:>14.2f}".format("disk cache (1st FSM)", diskTime * 1e3))
+    print("{:>22} {:>14.2f}".format("memory cache", memoryTime * 1e3))
+    pass
+
+def _uncached(initialState, diagram:str, clear:bool = True) -> float:
+    """Creates one FSM from the diagram with an empty memory cache and returns its creation time."""
+    if clear:
+        mermaidHandler.diagramCache.clear()
+    start = perf_counter()
+    fsm = FSM(initialState)
+    fsm.createTransitionsFromDiagram(diagram)
+    fsm.compile()
+    fsm.close()
+    return perf_counter() - start
+
+if __name__ == '__main__':
+    _start_()
+    pass
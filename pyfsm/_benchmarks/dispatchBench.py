@@ -0,0 +1,87 @@
+from pyfsm.fsmLib import *
+from pyfsm.fsmGlobals import *
+from pyfsm import fsmGlobals as fsmGlobals
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import inspect
+import random
+
+#The number of states of the benchmarked FSM
+_stateCount = 64
+#The number of queued destinations per run
+_destinations = 20000
+
+def _legacyTraverse(fsm, destStateName, *args, **kwargs):
+    """The string keyed traversal `FSM._traverseToState` performed before the dispatch plan."""
+    route = fsm.getRouteStore().getRoute(fsm.currentGraphState, destStateName)
+
+    for stateName, transName in route:
+        if transName is not None:
+            fsm._setInternalFsmState(FSMStates.IN_TRANSITION)
+            trans = fsmGlobals.gTransitions[fsm.uid][transName][0]
+            trans()
+            fsm._eventHandler.raiseEvent(fsm.EVENT_STATE_REACHED_NAME)
+
+        fsm._setInternalFsmState(FSMStates.IN_RUNNING_STATE)
+
+        state = fsmGlobals.gStates[fsm.uid][stateName][0]
+        fsm.currentGraphState = state.__name__
+
+        if state.__name__ == destStateName:
+            fsm._eventHandler.raiseEvent(fsm.EVENT_DESTINATION_REACHED_NAME)
+            if inspect.signature(state).parameters:
+                state(*args, **kwargs)
+            else:
+                state()
+        else:
+            fsm._eventHandler.raiseEvent(fsm.EVENT_STATE_REACHED_NAME)
+            state()
+
+        fsm._determineInternalFsmState()
+    pass
+
+def _countSteps(fsm, destinations):
+    """Returns the number of state hops walked by the destinations."""
+    steps = 0
+    current = fsm.currentGraphState
+    for dest in destinations:
+        steps += len(list(fsm.getRouteStore().getRoute(current, dest)))
+        current = dest
+    return steps
+
+def _start_():
+    states = makeStates("dispatchBench", _stateCount)
+    transitions = makeTransitions("dispatchBenchTrans", _stateCount)
+    edges = [(cState, nState, transitions[i]) for i, (cState, nState) in enumerate(ringEdges(states, chords = 0))]
+    edges += ringEdges(states, chords = 1)[1::2]
+
+    rnd = random.Random(0)
+    destinations = [rnd.choice(states).__name__ for _ in range(_destinations)]
+
+    fsm = FSM(states[0])
+    fsm.createTransitions(edges)
+    fsm.onStateReached(lambda: None)
+    steps = _countSteps(fsm, destinations)
+
+    start = perf_counter()
+    for dest in destinations:
+        _legacyTraverse(fsm, dest)
+    legacy = perf_counter() - start
+
+    fsm.forceChangeState(states[0].__name__)
+    fsm.compile()
+
+    start = perf_counter()
+    for dest in destinations:
+        fsm._addToDestQueue(dest)
+    fsm.run()
+    compiled = perf_counter() - start
+
+    print("{} destinations, {} transitions".format(_destinations, steps))
+    print("{:>12} {:>14.0f} transitions/s".format("before", steps / legacy))
+    print("{:>12} {:>14.0f} transitions/s".format("compiled", steps / compiled))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
@@ -0,0 +1,68 @@
+from pyfsm.fsmLib import *
+from pyfsm.fsmGlobals import *
+from time import perf_counter
+
+#The number of queued destinations, every destination is one hop away
+_queuedSteps = 1000000
+#Every case is run this many times and the fastest run is kept
+_repeats = 3
+
+@state
+def eventIdle():
+    pass
+
+@state
+def eventFire():
+    pass
+
+_received = 0
+
+def _plainHandler():
+    global _received
+    _received += 1
+    pass
+
+def _recordHandler(event):
+    global _received
+    if event.isDestination:
+        _received += 1
+    pass
+
+def _timeRun(stateHandlers:tuple, destHandlers:tuple) -> float:
+    """Returns the seconds spent running the queued steps with the passed handlers subscribed."""
+    fsm = FSM(eventIdle)
+    fsm.createTransitions([
+        (eventIdle, eventFire),
+        (eventFire, eventIdle),
+    ])
+    fsm.onStateReached(*stateHandlers)
+    fsm.onDestinationReached(*destHandlers)
+
+    for _ in range(_queuedSteps // 2):
+        fsm.eventFire().eventIdle()
+
+    start = perf_counter()
+    fsm.run()
+    elapsed = perf_counter() - start
+    fsm.close()
+    return elapsed
+
+def _measure(label:str, stateHandlers:tuple, destHandlers:tuple) -> float:
+    elapsed = min(_timeRun(stateHandlers, destHandlers) for _ in range(_repeats))
+    print("{:<28} {:.2f}s ({:.0f} ns/step)".format(label, elapsed, elapsed / _queuedSteps * 1e9))
+    return elapsed
+
+def _start_():
+    print("{} single hop steps".format(_queuedSteps))
+    baseline = _measure("no handlers", (), ())
+    plain = _measure("argumentless handler", (), (_plainHandler,))
+    record = _measure("event record handler", (), (_recordHandler,))
+    both = _measure("both events, record handler", (_recordHandler,), (_recordHandler,))
+
+    print("per event overhead: argumentless {:.0f} ns, event record {:.0f} ns".format(
+        (plain - baseline) / _queuedSteps * 1e9, (record - baseline) / _queuedSteps * 1e9))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
@@ -0,0 +1,71 @@
+from pyfsm.fsmLib import *
+from pyfsm.fsmGlobals import *
+from pyfsm.eventHandler import *
+from time import perf_counter, sleep
+import tempfile
+
+#The number of queued destinations, every destination is one hop away
+_queuedSteps = 20000
+#The simulated write latency of the logger in seconds
+_writeLatency = 0.00005
+#The capacity of the event buffer
+_capacity = 1 << 16
+
+@state
+def bufferIdle():
+    pass
+
+@state
+def bufferFire():
+    pass
+
+def _createFsm(logFile):
+    fsm = FSM(bufferIdle)
+    fsm.createTransitions([
+        (bufferIdle, bufferFire),
+        (bufferFire, bufferIdle),
+    ])
+
+    #A logging handler waiting on a slow disk for every event
+    def logHop(event):
+        logFile.write("{} {} -> {}\n".format(event.uid, event.fromState, event.toState))
+        logFile.flush()
+        sleep(_writeLatency)
+
+    fsm.onDestinationReached(logHop)
+    for _ in range(_queuedSteps // 2):
+        fsm.bufferFire().bufferIdle()
+    return fsm
+
+def _measure(label:str, overflow:str = None):
+    with tempfile.TemporaryFile("w") as logFile:
+        fsm = _createFsm(logFile)
+        buffer = None
+        if overflow is not None:
+            buffer = fsm.bufferEvents(_capacity, overflow)
+            buffer.start()
+
+        start = perf_counter()
+        fsm.run()
+        runTime = perf_counter() - start
+        if buffer is not None:
+            buffer.stop()
+        totalTime = perf_counter() - start
+
+        dropped = buffer.dropped if buffer is not None else 0
+        print("{:<22} run {:.2f}s ({:.0f} steps/s), delivered after {:.2f}s, {} dropped".format(
+            label, runTime, _queuedSteps / runTime, totalTime, dropped))
+        fsm.close()
+    pass
+
+def _start_():
+    print("{} single hop steps with a {:.0f}us file logger".format(_queuedSteps, _writeLatency * 1e6))
+    _measure("synchronous")
+    _measure("buffered, drop oldest", DROP_OLDEST)
+    _measure("buffered, block", BLOCK)
+    _measure("buffered, sample", SAMPLE)
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
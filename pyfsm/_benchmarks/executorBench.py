@@ -0,0 +1,75 @@
+from pyfsm.fsmLib import *
+from pyfsm.fsmGlobals import *
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+
+#The number of FSMs stepped round-robin by one thread
+_fsmCount = 64
+#The number of load-fire cycles queued on every FSM
+_cycles = 10
+#The simulated I/O time of the loading transition in seconds
+_ioTime = 0.002
+#The worker threads of the executor
+_workers = 32
+
+@state
+def executorIdle():
+    pass
+
+@state
+def executorFire():
+    pass
+
+@transition(offThread = True)
+def executorLoading():
+    sleep(_ioTime)
+    pass
+
+def _createFsms(executor) -> list:
+    """Creates the benchmark FSMs with the passed transition executor and queues their cycles."""
+    fsms = []
+    for _ in range(_fsmCount):
+        fsm = FSM(executorIdle)
+        fsm.createTransitions([
+            (executorIdle, executorFire, executorLoading),
+            (executorFire, executorIdle),
+        ])
+        fsm.setTransitionExecutor(executor)
+        for _ in range(_cycles):
+            fsm.executorFire().executorIdle()
+        fsms.append(fsm)
+    return fsms
+
+def _runRoundRobin(fsms:list) -> int:
+    """Steps the FSMs one destination at a time until every queue is drained."""
+    steps = 0
+    active = list(fsms)
+    while active:
+        stillActive = []
+        for fsm in active:
+            steps += fsm.run(1)
+            if fsm.isTransitionPending() or fsm._destQueue.qsize() or fsm._cachedDestState is not None:
+                stillActive.append(fsm)
+        active = stillActive
+    return steps
+
+def _measure(label:str, executor):
+    fsms = _createFsms(executor)
+    start = perf_counter()
+    steps = _runRoundRobin(fsms)
+    elapsed = perf_counter() - start
+    print("{:<24} {} steps in {:.2f}s ({:.0f} steps/s)".format(label, steps, elapsed, steps / elapsed))
+    for fsm in fsms:
+        fsm.close()
+    pass
+
+def _start_():
+    print("{} FSMs, {} cycles each, {:.0f}ms transitions".format(_fsmCount, _cycles, _ioTime * 1000))
+    _measure("inline", None)
+    with ThreadPoolExecutor(_workers) as executor:
+        _measure("thread pool ({} workers)".format(_workers), executor)
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
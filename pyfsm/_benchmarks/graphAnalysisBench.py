@@ -0,0 +1,77 @@
+from pyfsm.fsmLib import *
+from pyfsm.graphAnalysis import *
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import random
+
+#The transitions of the analysed graphs
+_edgeCounts = (250000, 500000, 1000000)
+#The transitions per state of the analysed graphs
+_degree = 10
+#The share of the states in dead-end chains outside of the main component
+_tailShare = 0.05
+#The reachability queries timed per graph
+_queries = 200000
+#The states of the FSM piping destinations with and without admission checks
+_stateCount = 32
+#The destinations piped per admission case
+_pipes = 100000
+
+def _graph(edgeCount:int, seed:int = 0) -> dict:
+    """Returns a random state graph of mostly one component with dead-end chains hanging off it."""
+    rnd = random.Random(seed)
+    stateCount = edgeCount // _degree
+    coreCount = int(stateCount * (1 - _tailShare))
+
+    graph = {}
+    for i in range(coreCount):
+        graph["s{}".format(i)] = [("s{}".format((i + 1) % coreCount), None)] + \
+                                 [("s{}".format(rnd.randrange(coreCount)), None) for _ in range(_degree - 1)]
+    for i in range(coreCount, stateCount):
+        graph["s{}".format(i)] = [("s{}".format(i + 1), None)] if (i - coreCount) % 10 != 9 and i + 1 < stateCount else []
+    for i in range(coreCount, stateCount, 10):
+        graph["s{}".format(rnd.randrange(coreCount))].append(("s{}".format(i), None))
+    return graph
+
+def _pipeTime(fsm, states:list) -> float:
+    """Pipes `_pipes` destinations around the ring and returns the time per destination."""
+    start = perf_counter()
+    for i in range(_pipes):
+        getattr(fsm, states[i % _stateCount].__name__)()
+        if fsm._destQueue.qsize() >= _stateCount:
+            fsm._destQueue.clear()
+    return (perf_counter() - start) / _pipes
+
+def _start_():
+    print("{:>10} {:>10} {:>12} {:>10} {:>10} {:>12}".format("edges", "states", "components", "traps", "build (s)", "query (ns)"))
+    for edgeCount in _edgeCounts:
+        graph = _graph(edgeCount)
+        names = list(graph)
+
+        start = perf_counter()
+        analysis = GraphAnalysis(graph)
+        buildTime = perf_counter() - start
+
+        rnd = random.Random(1)
+        pairs = [(names[rnd.randrange(len(names))], names[rnd.randrange(len(names))]) for _ in range(_queries)]
+        start = perf_counter()
+        for stateName, destStateName in pairs:
+            analysis.canReach(stateName, destStateName)
+        queryTime = (perf_counter() - start) / _queries
+
+        print("{:>10} {:>10} {:>12} {:>10} {:>10.2f} {:>12.0f}".format(sum(len(edges) for edges in graph.values()), len(graph),
+              len(analysis.components), len(analysis.trapStates()), buildTime, queryTime * 1e9))
+
+    states = makeStates("graphAnalysisBench", _stateCount)
+    fsm = FSM(states[0])
+    fsm.createTransitions(ringEdges(states))
+    uncheckedTime = _pipeTime(fsm, states)
+    fsm.setAdmissionChecks()
+    checkedTime = _pipeTime(fsm, states)
+    print("pipe without admission checks {:8.2f} us".format(uncheckedTime * 1e6))
+    print("pipe with admission checks    {:8.2f} us".format(checkedTime * 1e6))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
@@ -0,0 +1,71 @@
+from pyfsm.fsmLib import *
+from pyfsm.routeStores import *
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import random
+import tracemalloc
+
+#The (sub-machines, states per sub-machine) shapes measured with both stores
+_sharedShapes = ((20, 50), (40, 50))
+#The shapes too large for the flat tables, measured with the hierarchical store only
+_hierarchicalShapes = ((40, 250),)
+#The number of random route requests served per FSM
+_requests = 2000
+
+def _buildFsm(prefix:str, subMachines:int, size:int, routeStore):
+    """Builds a FSM with a ring of composite states, each owning a ring sub-machine entered at its first state and left from its last."""
+    composites = makeStates(prefix, subMachines)
+    fsm = FSM(composites[0], routeStore = routeStore)
+    names = []
+
+    with fsm.deferredRouteBuild():
+        fsm.createTransitions(ringEdges(composites, chords = 1, seed = subMachines))
+        for i, composite in enumerate(composites):
+            states = makeStates("{}_{}".format(prefix, i), size)
+            child = FSM(states[0], LazyRouteStore())
+            child.createTransitions(ringEdges(states, chords = 2, seed = i))
+            fsm.addCompositeState(composite, child, [states[-1]])
+            child.close()
+            names.extend(s.__name__ for s in states)
+
+    return fsm, names
+
+def _measure(label:str, prefix:str, subMachines:int, size:int, routeStore):
+    """Builds the FSM, serves the route requests and prints the elapsed times and the traced peak memory."""
+    tracemalloc.start()
+    start = perf_counter()
+    fsm, names = _buildFsm(prefix, subMachines, size, routeStore)
+    routeStore = fsm.getRouteStore()
+
+    rnd = random.Random(size)
+    pairs = [(rnd.choice(names), rnd.choice(names)) for _ in range(_requests)]
+    routeStore.getRoute(*pairs[0])
+    built = perf_counter() - start
+
+    start = perf_counter()
+    hops = 0
+    for stateName, destStateName in pairs:
+        hops += sum(1 for _ in routeStore.getRoute(stateName, destStateName))
+    served = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print("{:>14} {:>8} {:>10.3f} {:>12.1f} {:>10} {:>10.1f}".format(
+        label, subMachines * (size + 1), built, served / _requests * 1e6, peak // 1024, hops / _requests))
+    fsm.close()
+    pass
+
+def _start_():
+    print("{:>14} {:>8} {:>10} {:>12} {:>10} {:>10}".format("store", "states", "build (s)", "us/route", "peak (KB)", "avg hops"))
+    for subMachines, size in _sharedShapes:
+        prefix = "hierBench{}x{}".format(subMachines, size)
+        _measure("compact", prefix + "c", subMachines, size, CompactRouteStore())
+        _measure("hierarchical", prefix + "h", subMachines, size, HierarchicalRouteStore())
+
+    for subMachines, size in _hierarchicalShapes:
+        _measure("hierarchical", "hierBench{}x{}h".format(subMachines, size), subMachines, size, HierarchicalRouteStore())
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
@@ -0,0 +1,49 @@
+from pyfsm.fsmLib import *
+from pyfsm.routeStores import *
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import random
+import tracemalloc
+
+#The graph sizes to benchmark
+_sizes = (100, 200, 400, 800)
+#The number of random destination requests served per graph
+_requests = 2000
+
+def _measure(size, edges, routeStore):
+    """Builds the FSM, serves the route requests and returns the elapsed time and the traced peak memory."""
+    rnd = random.Random(size)
+    names = [s.__name__ for s, _ in edges[::3]]
+
+    tracemalloc.start()
+    start = perf_counter()
+
+    fsm = FSM(edges[0][0], routeStore = routeStore)
+    fsm.createTransitions(edges)
+    for _ in range(_requests):
+        routeStore.getRoute(rnd.choice(names), rnd.choice(names))
+
+    elapsed = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return elapsed, peak
+
+def _start_():
+    print("{:>8} {:>16} {:>16} {:>16} {:>16}".format("states", "eager (s)", "eager peak (KB)", "lazy (s)", "lazy peak (KB)"))
+
+    for size in _sizes:
+        states = makeStates("lazyBench{}".format(size), size)
+        edges = ringEdges(states)
+
+        eagerTime, eagerPeak = _measure(size, edges, EagerRouteStore())
+        lazyStore = LazyRouteStore(maxSize = 256, bidirectional = True)
+        lazyTime, lazyPeak = _measure(size, edges, lazyStore)
+
+        print("{:>8} {:>16.4f} {:>16} {:>16.4f} {:>16}".format(size, eagerTime, eagerPeak // 1024, lazyTime, lazyPeak // 1024))
+        print("{:>8} {}".format("", lazyStore.cacheInfo()))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
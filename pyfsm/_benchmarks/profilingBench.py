@@ -0,0 +1,68 @@
+from pyfsm.fsmLib import *
+from pyfsm.fsmGlobals import *
+from pyfsm.profiling import *
+from time import perf_counter
+
+#The number of queued destinations
+_queuedSteps = 200000
+#Every case is run this many times and the fastest run is kept
+_repeats = 3
+
+@state
+def profiledIdle():
+    pass
+
+@state
+def profiledLoad():
+    pass
+
+@state
+def profiledFire():
+    pass
+
+@transition
+def profiledLoading():
+    pass
+
+def _timeRun(profiler) -> float:
+    """Returns the seconds spent running the queued steps, profiled by the passed profiler if any."""
+    fsm = FSM(profiledIdle)
+    fsm.createTransitions([
+        (profiledIdle, profiledLoad, profiledLoading),
+        (profiledLoad, profiledFire),
+        (profiledFire, profiledIdle),
+    ])
+    if profiler is not None:
+        fsm.enableProfiling(profiler)
+
+    for _ in range(_queuedSteps // 2):
+        fsm.profiledFire().profiledIdle()
+
+    start = perf_counter()
+    fsm.run()
+    elapsed = perf_counter() - start
+    fsm.close()
+    return elapsed
+
+def _start_():
+    print("{} queued destinations".format(_queuedSteps))
+    plain = min(_timeRun(None) for _ in range(_repeats))
+    profiled = None
+    for _ in range(_repeats):
+        profiler = Profiler()
+        elapsed = _timeRun(profiler)
+        profiled = elapsed if profiled is None else min(profiled, elapsed)
+
+    print("profiling disabled {:.2f}s ({:.0f} steps/s)".format(plain, _queuedSteps / plain))
+    print("profiling enabled  {:.2f}s ({:.0f} steps/s), {:.0f} ns overhead per step".format(
+        profiled, _queuedSteps / profiled, (profiled - plain) / _queuedSteps * 1e9))
+
+    snapshot = profiler.snapshot()
+    for name, stat in sorted(snapshot["states"].items()):
+        print("  {:<14} {:>8} calls, p50 {:.0f} ns, p99 {:.0f} ns".format(name, stat["count"], stat["p50"] * 1e9, stat["p99"] * 1e9))
+    print("  route length mean {:.2f}, queue depth max {}".format(snapshot["routes"]["mean"], snapshot["queueDepth"]["max"]))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
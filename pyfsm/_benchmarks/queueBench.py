@@ -0,0 +1,49 @@
+from pyfsm.fsmLib import *
+from pyfsm.destQueues import *
+from pyfsm._benchmarks.benchGraphs import *
+from queue import Queue
+from time import perf_counter
+
+#The number of piped destinations per measurement
+_commands = 200000
+#The batch size of the drained `run` calls
+_batchSize = 64
+
+def _measure(fsm, states, batched):
+    """Enqueues and dispatches the destinations and returns the elapsed time."""
+    ping = getattr(fsm, states[0].__name__)
+    pong = getattr(fsm, states[1].__name__)
+
+    start = perf_counter()
+    for _ in range(_commands // (2 * _batchSize)):
+        for _ in range(_batchSize):
+            ping()
+            pong()
+
+        if batched:
+            while fsm.run(maxSteps = _batchSize):
+                pass
+        else:
+            fsm.run()
+
+    return perf_counter() - start
+
+def _start_():
+    states = makeStates("queueBench", 2)
+
+    print("{:>22} {:>14}".format("backend", "commands/s"))
+    for name, destQueue, batched in (("queue.Queue", Queue(), False),
+                                     ("ThreadSafeDestQueue", ThreadSafeDestQueue(), False),
+                                     ("DestQueue", DestQueue(), False),
+                                     ("DestQueue (batched)", DestQueue(), True)):
+        fsm = FSM(states[0], destQueue = destQueue)
+        fsm.createTransitions([(states[0], states[1]), (states[1], states[0])])
+        fsm.compile()
+
+        elapsed = _measure(fsm, states, batched)
+        print("{:>22} {:>14.0f}".format(name, _commands / elapsed))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
@@ -0,0 +1,80 @@
+from pyfsm.fsmLib import *
+from pyfsm.fsmGlobals import *
+from pyfsm.destQueues import *
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import random
+
+#The number of states of the ring graph
+_size = 100
+#The number of producer ticks, every tick pipes `_pipedPerTick` destinations and consumes `_consumedPerTick`
+_ticks = 2000
+#The number of destinations piped per tick
+_pipedPerTick = 8
+#The number of destinations the FSM walks to per tick, fewer than piped so the producer overloads it
+_consumedPerTick = 2
+#The probability the producer moves on to a new target instead of repeating the current one
+_retargetProbability = 0.3
+#The size of the busy loop every state runs
+_stateWorkSize = 200
+
+_stateCalls = [0]
+"""The number of states run"""
+
+def _makeStates(count:int) -> list:
+    """Registers the states, each one doing a little work."""
+    states = []
+    for i in range(count):
+        def stateFunc():
+            _stateCalls[0] += 1
+            sum(range(_stateWorkSize))
+        stateFunc.__name__ = "queuePolicy_{}".format(i)
+        states.append(state(stateFunc))
+    return states
+
+def _measure(label:str, edges:list, names:list, *policies):
+    """Overloads a FSM with the passed queue policies, drains it and prints the results."""
+    fsm = FSM(edges[0][0])
+    fsm.createTransitions(edges)
+    fsm.setQueuePolicies(*policies)
+    fsm.compile()
+
+    rnd = random.Random(0)
+    target = rnd.choice(names)
+    maxDepth = 0
+    _stateCalls[0] = 0
+
+    start = perf_counter()
+    for _ in range(_ticks):
+        for _ in range(_pipedPerTick):
+            if rnd.random() < _retargetProbability:
+                target = rnd.choice(names)
+            getattr(fsm, target)()
+        maxDepth = max(maxDepth, fsm._destQueue.qsize())
+        fsm.run(_consumedPerTick)
+    fsm.run()
+    elapsed = perf_counter() - start
+
+    info = fsm.queueInfo()
+    print("{:>18} {:>10.3f} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+        label, elapsed, _stateCalls[0], maxDepth, info["dropped"], info["deduped"], info["fused"]))
+    fsm.close()
+    pass
+
+def _start_():
+    states = _makeStates(_size)
+    names = [s.__name__ for s in states]
+    edges = ringEdges(states, chords = 1, seed = 3)
+
+    print("{} states, {} ticks piping {} and walking to {} destinations".format(_size, _ticks, _pipedPerTick, _consumedPerTick))
+    print("{:>18} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}".format("policies", "seconds", "states", "maxDepth", "dropped", "deduped", "fused"))
+    _measure("none", edges, names)
+    _measure("dedupe", edges, names, DEDUPE)
+    _measure("fuse", edges, names, FUSE)
+    _measure("dedupe+fuse", edges, names, DEDUPE, FUSE)
+    _measure("latestWins", edges, names, LATEST_WINS)
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
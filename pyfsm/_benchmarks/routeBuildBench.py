@@ -0,0 +1,51 @@
+from pyfsm.fsmLib import *
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+
+#The graph sizes to benchmark
+_sizes = (50, 100, 200, 400, 800)
+#The full rebuild grows as O(N * V * E) so it is skipped above this size
+_maxRebuildSize = 100
+
+def _fullRebuild(fsm, edges):
+    """Creates the transitions rebuilding every route after each edge, as `createTransition` used to do."""
+    for cState, nState in edges:
+        fsm.createTransition(cState, nState)
+        fsm._buildRoutesGraph()
+    pass
+
+def _incremental(fsm, edges):
+    """Creates the transitions one by one with the incremental route updates."""
+    for cState, nState in edges:
+        fsm.createTransition(cState, nState)
+    pass
+
+def _bulk(fsm, edges):
+    """Creates the transitions with a single deferred route build."""
+    fsm.createTransitions(edges)
+    pass
+
+def _start_():
+    print("{:>8} {:>8} {:>14} {:>14} {:>14}".format("states", "edges", "rebuild (s)", "incremental (s)", "bulk (s)"))
+
+    for size in _sizes:
+        states = makeStates("routeBench{}".format(size), size)
+        edges = ringEdges(states)
+
+        timings = []
+        for build in (_fullRebuild, _incremental, _bulk):
+            if build is _fullRebuild and size > _maxRebuildSize:
+                timings.append("-")
+                continue
+
+            fsm = FSM(states[0])
+            start = perf_counter()
+            build(fsm, edges)
+            timings.append("{:.4f}".format(perf_counter() - start))
+
+        print("{:>8} {:>8} {:>14} {:>14} {:>14}".format(size, len(edges), *timings))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
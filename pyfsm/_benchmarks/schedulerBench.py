@@ -0,0 +1,64 @@
+from pyfsm.fsmLib import *
+from pyfsm.fsmGlobals import *
+from pyfsm.scheduler import *
+from time import perf_counter
+
+#The number of scheduled FSMs
+_fsmCount = 5000
+#The number of destinations queued on every FSM
+_queuedSteps = 40
+#The slice budgets compared
+_sliceSizes = (1, 8, 64)
+
+@state
+def schedulerIdle():
+    pass
+
+@state
+def schedulerLoad():
+    pass
+
+@state
+def schedulerFire():
+    pass
+
+def _measure(sliceSteps:int):
+    scheduler = Scheduler(sliceSteps)
+    fsms = []
+    for _ in range(_fsmCount):
+        fsm = FSM(schedulerIdle)
+        fsm.createTransitions([
+            (schedulerIdle, schedulerLoad),
+            (schedulerLoad, schedulerFire),
+            (schedulerFire, schedulerIdle),
+        ])
+        for _ in range(_queuedSteps // 2):
+            fsm.schedulerFire().schedulerIdle()
+        fsms.append(fsm)
+
+    #The FSMs become ready when they are added, right before the scheduler starts
+    for fsm in fsms:
+        scheduler.add(fsm)
+
+    start = perf_counter()
+    scheduler.run()
+    elapsed = perf_counter() - start
+
+    stats = scheduler.stats()
+    print("slice {:>3}: {} steps in {:.2f}s ({:.0f} steps/s), {} slices, ready latency mean {:.1f}ms max {:.1f}ms".format(
+        sliceSteps, stats["steps"], elapsed, stats["steps"] / elapsed, stats["slices"],
+        stats["meanLatency"] * 1000, stats["maxLatency"] * 1000))
+
+    for fsm in fsms:
+        fsm.close()
+    pass
+
+def _start_():
+    print("{} FSMs with {} queued destinations each".format(_fsmCount, _queuedSteps))
+    for sliceSteps in _sliceSizes:
+        _measure(sliceSteps)
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
@@ -0,0 +1,61 @@
+from pyfsm.fsmLib import *
+from pyfsm import fsmGlobals
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import pickle
+
+#The number of states of the shared diagram
+_stateCount = 32
+#The number of FSMs rebuilt from their transitions
+_coldCount = 200
+#The number of FSMs snapshotted and restored
+_warmCount = 20000
+#The restart size the timings are extrapolated to
+_restartSize = 100000
+
+def _closeAll():
+    """Closes every registered FSM."""
+    for fsm in list(fsmGlobals.fsms.values()):
+        fsm.close()
+    pass
+
+def _start_():
+    states = makeStates("snapshotBench", _stateCount)
+    edges = ringEdges(states)
+
+    #Cold restart: every FSM recreates its transitions and routes
+    start = perf_counter()
+    for _ in range(_coldCount):
+        fsm = FSM(states[0])
+        fsm.createTransitions(edges)
+        fsm.compile()
+    coldTime = (perf_counter() - start) / _coldCount
+    _closeAll()
+
+    template = FSM(states[0])
+    template.createTransitions(edges)
+    snapshot = template.snapshot()
+    fsms = [FSM.restore(snapshot) for _ in range(_warmCount)]
+    for index, fsm in enumerate(fsms):
+        getattr(fsm, states[index % _stateCount].__name__)()
+    template.close()
+
+    start = perf_counter()
+    data = pickle.dumps(FSM.snapshotAll(), pickle.HIGHEST_PROTOCOL)
+    snapshotTime = perf_counter() - start
+    del fsms
+    _closeAll()
+
+    #Warm restart: the FSMs reuse the snapshotted definition and routes
+    start = perf_counter()
+    restored = FSM.restoreAll(pickle.loads(data))
+    warmTime = (perf_counter() - start) / len(restored)
+
+    print("{} states, {} machines snapshotted into {:.1f} KB in {:.2f}s".format(_stateCount, len(restored), len(data) / 1024, snapshotTime))
+    print("cold restart {:8.1f} us/machine, {:6.2f}s per {} machines".format(coldTime * 1e6, coldTime * _restartSize, _restartSize))
+    print("warm restart {:8.1f} us/machine, {:6.2f}s per {} machines".format(warmTime * 1e6, warmTime * _restartSize, _restartSize))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
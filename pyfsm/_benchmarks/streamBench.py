@@ -0,0 +1,74 @@
+from pyfsm.fsmLib import *
+from pyfsm.routeStores import *
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import os
+import tempfile
+import tracemalloc
+
+#The number of states of the generated diagram
+_stateCount = 20000
+#The extra random edges per state of the generated diagram
+_chords = 9
+#The number of edges registered per batch
+_batchSize = 50000
+
+def _writeDiagram(path:str, edges:list):
+    """Writes the Mermaid state diagram of the passed `(currentState, nextState)` pairs to the passed path."""
+    with open(path, "w", encoding = "utf-8") as diagramFile:
+        diagramFile.write("stateDiagram-v2\n")
+        for cState, nState in edges:
+            diagramFile.write("    {} --> {}\n".format(cState[0].__name__ if isinstance(cState, tuple) else cState.__name__,
+                                                      nState[0].__name__ if isinstance(nState, tuple) else nState.__name__))
+    pass
+
+def _measure(initialState, load, report = None) -> tuple:
+    """Runs the loader on a fresh FSM, once timed and once traced, and returns its elapsed time and traced peak memory."""
+    fsm = FSM(initialState, LazyRouteStore())
+    start = perf_counter()
+    load(fsm, report)
+    elapsed = perf_counter() - start
+    fsm.close()
+
+    fsm = FSM(initialState, LazyRouteStore())
+    tracemalloc.start()
+    load(fsm, None)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    fsm.close()
+    return elapsed, peak
+
+def _start_():
+    states = makeStates("streamBench", _stateCount)
+    edges = ringEdges(states, _chords)
+    path = os.path.join(tempfile.mkdtemp(), "streamBench.mmd")
+    _writeDiagram(path, edges)
+    edgeCount = len(edges)
+    del edges
+
+    try:
+        def report(edgeCount, edgesPerSecond):
+            print("  {:>10} edges {:>12.0f} edges/s".format(edgeCount, edgesPerSecond))
+
+        def loadStream(fsm, progress):
+            fsm.createTransitionsFromStream(path, _batchSize, progress)
+
+        def loadWhole(fsm, progress):
+            with open(path, "r", encoding = "utf-8") as diagramFile:
+                fsm.createTransitionsFromDiagram(diagramFile.read())
+
+        streamTime, streamPeak = _measure(states[0], loadStream, report)
+        wholeTime, wholePeak = _measure(states[0], loadWhole)
+    finally:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+    print("{} states, {} edges".format(_stateCount, edgeCount))
+    print("{:>12} {:>10} {:>14} {:>14}".format("loader", "time (s)", "edges/s", "peak (MB)"))
+    print("{:>12} {:>10.2f} {:>14.0f} {:>14.1f}".format("stream", streamTime, edgeCount / streamTime, streamPeak / 2 ** 20))
+    print("{:>12} {:>10.2f} {:>14.0f} {:>14.1f}".format("whole", wholeTime, edgeCount / wholeTime, wholePeak / 2 ** 20))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
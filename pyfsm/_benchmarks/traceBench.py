@@ -0,0 +1,70 @@
+from pyfsm.fsmLib import *
+from pyfsm.fsmGlobals import *
+from pyfsm.tracing import *
+from time import perf_counter
+import os
+import tempfile
+
+#The number of queued destinations, every destination is one hop away
+_queuedSteps = 1000000
+
+@state
+def tracedIdle():
+    pass
+
+@state
+def tracedFire(shots = 0):
+    pass
+
+@transition
+def tracedAiming():
+    pass
+
+def _createFsm():
+    fsm = FSM(tracedIdle)
+    fsm.createTransitions([
+        (tracedIdle, tracedFire, tracedAiming),
+        (tracedFire, tracedIdle),
+    ])
+    return fsm
+
+def _timeRun(recorder) -> float:
+    """Returns the seconds spent running the queued steps, recorded by the passed recorder if any."""
+    fsm = _createFsm()
+    if recorder is not None:
+        fsm.recordTrace(recorder)
+
+    for shots in range(_queuedSteps // 2):
+        fsm.tracedFire(shots).tracedIdle()
+
+    start = perf_counter()
+    fsm.run()
+    elapsed = perf_counter() - start
+    fsm.close()
+    return elapsed
+
+def _start_():
+    path = os.path.join(tempfile.mkdtemp(), "bench.trace")
+    print("{} single hop steps".format(_queuedSteps))
+
+    plain = _timeRun(None)
+    print("unrecorded run {:.2f}s ({:.0f} steps/s)".format(plain, _queuedSteps / plain))
+
+    with TraceRecorder(path) as recorder:
+        recorded = _timeRun(recorder)
+    print("recorded run   {:.2f}s ({:.0f} steps/s), {:.1f} MB log".format(recorded, _queuedSteps / recorded, os.path.getsize(path) / 1e6))
+
+    with TraceLog.open(path) as log:
+        fsm = _createFsm()
+        start = perf_counter()
+        replayed = log.replay(fsm)
+        elapsed = perf_counter() - start
+        print("replay         {:.2f}s ({:.0f} records/s), ended at {}".format(elapsed, replayed / elapsed, fsm.getCurrentFsmState()))
+        fsm.close()
+
+    os.remove(path)
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
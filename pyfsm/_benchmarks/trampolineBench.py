@@ -0,0 +1,70 @@
+from pyfsm.fsmLib import *
+from pyfsm.fsmGlobals import *
+from time import perf_counter
+import sys
+
+#The number of queued destinations
+_queuedSteps = 1000000
+#The stack depth is sampled once every this many fire states
+_depthSampleRate = 1000
+
+benchFsm = None
+_fired = 0
+_maxDepth = 0
+
+def _stackDepth() -> int:
+    """Returns the number of frames of the current stack."""
+    depth = 0
+    frame = sys._getframe()
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back
+    return depth
+
+@state
+def trampolineIdle():
+    pass
+
+@state(True)
+def trampolineLoad():
+    benchFsm.nextState()
+    pass
+
+@state
+def trampolineAim():
+    pass
+
+@state(True)
+def trampolineFire():
+    global _fired, _maxDepth
+    _fired += 1
+    if _fired % _depthSampleRate == 0:
+        _maxDepth = max(_maxDepth, _stackDepth())
+    benchFsm.nextState()
+    pass
+
+def _start_():
+    global benchFsm
+    benchFsm = FSM(trampolineIdle)
+    benchFsm.createTransitions([
+        (trampolineIdle, trampolineLoad),
+        (trampolineLoad, trampolineAim),
+        (trampolineAim, trampolineFire),
+        (trampolineFire, trampolineIdle),
+    ])
+
+    #fire().idle().fire().aim().idle() repeated until the queue holds the requested steps
+    for _ in range(_queuedSteps // 5):
+        benchFsm.trampolineFire().trampolineIdle().trampolineFire().trampolineAim().trampolineIdle()
+
+    start = perf_counter()
+    consumed = benchFsm.run()
+    elapsed = perf_counter() - start
+
+    print("{} queued steps consumed in {:.2f}s ({:.0f} steps/s)".format(consumed, elapsed, consumed / elapsed))
+    print("{} fire states, max sampled stack depth {} frames (recursion limit {})".format(_fired, _maxDepth, sys.getrecursionlimit()))
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
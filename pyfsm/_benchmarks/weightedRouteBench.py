@@ -0,0 +1,135 @@
+from pyfsm.fsmLib import *
+from pyfsm.fsmGlobals import *
+from pyfsm.routeStores import *
+from pyfsm.profiling import Profiler
+from pyfsm._benchmarks.benchGraphs import *
+from time import perf_counter
+import random
+
+#The number of states of the ring graph
+_ringSize = 200
+#The number of random destinations traversed per FSM
+_destinations = 300
+#The number of destinations traversed while profiling, before the measured costs are applied
+_warmupDestinations = 50
+#The size of the busy loop the slow transition runs
+_slowWork = 50000
+#The side of the square grid graph the A* searches run on
+_gridSide = 60
+#The number of random route requests served per grid store
+_gridRequests = 300
+
+_slowCalls = [0]
+"""The number of slow transition calls"""
+
+@transition
+def weightedFast():
+    pass
+
+@transition
+def weightedSlow():
+    _slowCalls[0] += 1
+    sum(range(_slowWork))
+    pass
+
+def _ringEdges(states:list) -> list:
+    """Returns a ring of fast transitions with random chords through the slow transition, the shortcuts a BFS picks."""
+    rnd = random.Random(1)
+    edges = []
+    for i, s in enumerate(states):
+        edges.append((s, states[(i + 1) % len(states)], weightedFast))
+        for _ in range(2):
+            edges.append((s, states[rnd.randrange(len(states))], weightedSlow))
+    return edges
+
+def _traverse(fsm, names:list, count:int, seed:int) -> float:
+    """Pipes and runs `count` random destinations and returns the elapsed time."""
+    rnd = random.Random(seed)
+    start = perf_counter()
+    for _ in range(count):
+        getattr(fsm, rnd.choice(names))()
+        fsm.run()
+    return perf_counter() - start
+
+def _measureRing(label:str, fsm, names:list):
+    """Traverses the random destinations and prints the elapsed time and the slow transitions taken."""
+    _slowCalls[0] = 0
+    elapsed = _traverse(fsm, names, _destinations, 0)
+    print("{:>26} {:>10.3f} {:>10} {:>14.1f}".format(label, elapsed, _slowCalls[0], elapsed / _destinations * 1e6))
+    pass
+
+def _gridStates() -> tuple:
+    """Registers the grid states and returns them with their coordinates accessed by the state names."""
+    states = makeStates("weightedGrid", _gridSide * _gridSide)
+    coordinates = {s.__name__: divmod(i, _gridSide) for i, s in enumerate(states)}
+    return states, coordinates
+
+def _gridEdges(states:list) -> list:
+    """Returns the edges between the horizontal and vertical neighbours of the grid, both ways."""
+    edges = []
+    for i, s in enumerate(states):
+        row, column = divmod(i, _gridSide)
+        if column + 1 < _gridSide:
+            edges.append((s, states[i + 1], weightedFast))
+            edges.append((states[i + 1], s, weightedFast))
+        if row + 1 < _gridSide:
+            edges.append((s, states[i + _gridSide], weightedFast))
+            edges.append((states[i + _gridSide], s, weightedFast))
+    return edges
+
+def _measureGrid(label:str, edges:list, routeStore, names:list):
+    """Serves the random route requests of the grid and prints the elapsed time."""
+    fsm = FSM(edges[0][0], routeStore = routeStore)
+    fsm.createTransitions(edges)
+    rnd = random.Random(_gridSide)
+
+    start = perf_counter()
+    for _ in range(_gridRequests):
+        routeStore.getRoute(rnd.choice(names), rnd.choice(names))
+    elapsed = perf_counter() - start
+
+    print("{:>26} {:>10.3f} {:>14.1f}".format(label, elapsed, elapsed / _gridRequests * 1e6))
+    fsm.close()
+    pass
+
+def _start_():
+    states = makeStates("weightedRing", _ringSize)
+    names = [s.__name__ for s in states]
+    edges = _ringEdges(states)
+
+    print("{} states ring, {} destinations".format(_ringSize, _destinations))
+    print("{:>26} {:>10} {:>10} {:>14}".format("store", "seconds", "slowCalls", "us/destination"))
+
+    eager = FSM(states[0], EagerRouteStore())
+    eager.createTransitions(edges)
+    _measureRing("EagerRouteStore", eager, names)
+
+    #The weighted FSM learns the transition times while it runs, then follows the cheapest routes
+    weighted = FSM(states[0], WeightedRouteStore())
+    weighted.createTransitions(edges)
+    profiler = Profiler()
+    weighted.enableProfiling(profiler)
+    _traverse(weighted, names, _warmupDestinations, 1)
+    weighted.applyMeasuredCosts(profiler)
+    weighted.disableProfiling()
+    _measureRing("WeightedRouteStore measured", weighted, names)
+
+    gridStates, coordinates = _gridStates()
+    gridNames = [s.__name__ for s in gridStates]
+    gridEdges = _gridEdges(gridStates)
+
+    def manhattan(stateName:str, destStateName:str) -> float:
+        row, column = coordinates[stateName]
+        destRow, destColumn = coordinates[destStateName]
+        return abs(row - destRow) + abs(column - destColumn)
+
+    print("{}x{} grid, {} route requests".format(_gridSide, _gridSide, _gridRequests))
+    print("{:>26} {:>10} {:>14}".format("store", "seconds", "us/route"))
+    _measureGrid("AStarRouteStore dijkstra", gridEdges, AStarRouteStore(), gridNames)
+    _measureGrid("AStarRouteStore manhattan", gridEdges, AStarRouteStore(manhattan), gridNames)
+    _measureGrid("LazyRouteStore bfs", gridEdges, LazyRouteStore(), gridNames)
+    pass
+
+if __name__ == '__main__':
+    _start_()
+    pass
@@ -29,7 +29,7 @@ def idle():
     pass
 
 @state(True)
-def fire(shots):
+def fire(shots = 0):
     print("{} Shots fired!".format(shots))
     myFsm.nextState()
     pass
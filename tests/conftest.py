@@ -0,0 +1,63 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyFsm.fsmGlobals import state, transition # noqa: E402
+
+_prefixes = itertools.count()
+"""Numbers the generated state and transition name prefixes, as registered names are global to the process"""
+
+def _uniquePrefix(prefix:str) -> str:
+    """
+    Returns the passed prefix made unique among every name generated by the tests.
+    """
+    return "{}{}".format(prefix, next(_prefixes))
+
+def _namedFunc(name:str, body):
+    """
+    Returns a function without arguments named after the passed name, calling `body(name)` if a body is passed.
+    """
+
+    def func():
+        if body is not None:
+            body(name)
+    func.__name__ = name
+    return func
+
+@pytest.fixture
+def makeStates():
+    """
+    Returns a function registering `count` state functions with unique names and returning them.\n
+    The function takes the `(prefix, count, waitsForCallback = False, body = None)` arguments,
+    where `body(stateName)` is called every time a generated state runs.
+    """
+
+    def factory(prefix:str, count:int, waitsForCallback:bool = False, body = None) -> list:
+        prefix = _uniquePrefix(prefix)
+        states = []
+        for i in range(count):
+            states.append(state(waitsForCallback)(_namedFunc("{}_{}".format(prefix, i), body)))
+        return states
+
+    return factory
+
+@pytest.fixture
+def makeTransitions():
+    """
+    Returns a function registering `count` transition functions with unique names and returning them.\n
+    The function takes the `(prefix, count, body = None, offThread = False)` arguments,
+    where `body(transName)` is called every time a generated transition runs.
+    """
+
+    def factory(prefix:str, count:int, body = None, offThread:bool = False) -> list:
+        prefix = _uniquePrefix(prefix)
+        transitions = []
+        for i in range(count):
+            transitions.append(transition(offThread = offThread)(_namedFunc("{}_{}".format(prefix, i), body)))
+        return transitions
+
+    return factory
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+from pyFsm.asyncFsm import AsyncFSM
+
+def _ring(fsm, states:list, transitions:list):
+    """
+    Creates a ring of transitions through the passed states.
+    """
+
+    fsm.createTransitions([(s, states[(i + 1) % len(states)], transitions[i % len(transitions)]) for i, s in enumerate(states)])
+
+def testStateResumedFromItsOwnBodyDoesNotWait(makeStates, makeTransitions):
+    fsm = None
+
+    def body(stateName):
+        fsm.nextState()
+
+    states = makeStates("asyncInline", 4, waitsForCallback = True, body = body)
+    fsm = AsyncFSM(states[0])
+    _ring(fsm, states, makeTransitions("asyncInlineTrans", 1))
+
+    getattr(fsm, states[3].__name__)()
+    assert asyncio.run(asyncio.wait_for(fsm.arun(), 5)) == 1
+    assert fsm.getCurrentFsmState() == states[3].__name__
+    fsm.close()
+
+def testResumesFromOtherThreadsAreNeverLost(makeStates, makeTransitions):
+    fsm = None
+
+    def body(stateName):
+        #The callback races the state suspending on its future
+        threading.Thread(target = fsm.nextState).start()
+
+    states = makeStates("asyncThreads", 5, waitsForCallback = True, body = body)
+    fsm = AsyncFSM(states[0])
+    _ring(fsm, states, makeTransitions("asyncThreadsTrans", 2))
+
+    async def main():
+        for _ in range(40):
+            getattr(fsm, states[4].__name__)()
+            getattr(fsm, states[0].__name__)()
+            await asyncio.wait_for(fsm.arun(), 5)
+
+    asyncio.run(main())
+    assert fsm.getCurrentFsmState() == states[0].__name__
+    fsm.close()
+
+def testCoroutineStatesAreAwaited(makeStates, makeTransitions):
+    visited = []
+    states = makeStates("asyncCoroutine", 3)
+    fsm = AsyncFSM(states[0])
+    _ring(fsm, states, makeTransitions("asyncCoroutineTrans", 1))
+
+    async def handler(event):
+        await asyncio.sleep(0)
+        visited.append(event.toState)
+
+    fsm.onStateReached(handler)
+    getattr(fsm, states[2].__name__)()
+    asyncio.run(fsm.arun())
+    #The event is raised after every transition and before every state other than the destination
+    assert visited == [states[1].__name__, states[1].__name__, states[2].__name__]
+    fsm.close()
@@ -0,0 +1,123 @@
+import pytest
+
+from pyFsm import mermaidHandler
+from pyFsm.fsmLib import FSM
+from pyFsm.mermaidHandler import DiagramCache
+from pyFsm.routeStores import EagerRouteStore, HierarchicalRouteStore
+
+_NAMES = ["idle", "work", "done", "a", "inner", "c", "x", "y"]
+"""The roles of the generated states: `work` owns the `a`, `inner` and `c` sub-machine and `inner` owns the `x` and `y` one"""
+
+def _compositeStates(makeStates, prefix:str, body = None) -> dict:
+    """
+    Returns the generated states of the composite machine accessed by their roles.
+    """
+    return dict(zip(_NAMES, makeStates(prefix, len(_NAMES), body = body)))
+
+def _buildCompositeFsm(s:dict, transition, routeStore) -> FSM:
+    """
+    Returns the composite machine built from code: `idle` enters `work`, whose sub-machine walks from `a` through `inner` to `c`
+    and returns from `c`, `inner` walks from `x` to `y` and returns from `y`, and `work` leaves to `done`.
+    """
+
+    innerFsm = FSM(s["x"])
+    innerFsm.createTransition(s["x"], s["y"])
+
+    workFsm = FSM(s["a"])
+    workFsm.createTransitions([(s["a"], s["inner"]), (s["inner"], s["c"])])
+    workFsm.addCompositeState(s["inner"], innerFsm, [s["y"]])
+
+    fsm = FSM(s["idle"], routeStore)
+    fsm.createTransitions([(s["idle"], s["work"], transition), (s["work"], s["done"])])
+    fsm.addCompositeState(s["work"], workFsm, [s["c"]])
+
+    innerFsm.close()
+    workFsm.close()
+    return fsm
+
+def _checkRoutes(fsm, s:dict, visited:list):
+    """
+    Checks the levels of the composite machine and walks into both sub-machines and out of them.
+    """
+
+    names = {role: state.__name__ for role, state in s.items()}
+    assert fsm.getCompositeStates() == {names["work"]: None, names["inner"]: names["work"]}
+    assert [fsm.getCompositeOf(s[role]) for role in ("idle", "a", "c", "x", "y")] == [None, names["work"], names["work"], names["inner"], names["inner"]]
+
+    #Entering a composite state enters its sub-machine at its initial state
+    del visited[:]
+    getattr(fsm, names["y"])()
+    fsm.run()
+    assert visited == [names[role] for role in ("work", "a", "inner", "x", "y")]
+
+    #Leaving a sub-machine returns from a final state to the composite state, which leaves through its own transitions
+    del visited[:]
+    getattr(fsm, names["done"])()
+    fsm.run()
+    assert visited == [names[role] for role in ("inner", "c", "work", "done")]
+    pass
+
+@pytest.mark.parametrize("storeType", [EagerRouteStore, HierarchicalRouteStore])
+def testCompositeStatesFromCode(storeType, makeStates, makeTransitions):
+    visited = []
+    s = _compositeStates(makeStates, "composite", visited.append)
+    fsm = _buildCompositeFsm(s, makeTransitions("compositeTrans", 1)[0], storeType())
+
+    _checkRoutes(fsm, s, visited)
+    fsm.close()
+
+def testCompositeStatesRejectInvalidSubMachines(makeStates):
+    s = _compositeStates(makeStates, "compositeInvalid")
+    fsm = FSM(s["idle"])
+    fsm.createTransition(s["idle"], s["work"])
+
+    ownFsm = FSM(s["a"])
+    ownFsm.createTransition(s["a"], s["work"])
+    with pytest.raises(ValueError):
+        fsm.addCompositeState(s["work"], ownFsm)
+
+    childFsm = FSM(s["a"])
+    childFsm.createTransition(s["a"], s["c"])
+    fsm.addCompositeState(s["work"], childFsm, [s["c"]])
+    otherFsm = FSM(s["x"])
+    with pytest.raises(ValueError):
+        fsm.addCompositeState(s["work"], otherFsm)
+    #The states of a sub-machine cannot be owned by another composite state as well
+    with pytest.raises(ValueError):
+        fsm.addCompositeState(s["inner"], childFsm)
+
+    for machine in (ownFsm, childFsm, otherFsm, fsm):
+        machine.close()
+
+@pytest.mark.parametrize("storeType", [EagerRouteStore, HierarchicalRouteStore])
+def testCompositeStatesFromDiagramBlocks(storeType, makeStates, makeTransitions, monkeypatch):
+    monkeypatch.setattr(mermaidHandler, "diagramCache", DiagramCache())
+    visited = []
+    s = _compositeStates(makeStates, "compositeDiagram", visited.append)
+    transition = makeTransitions("compositeDiagramTrans", 1)[0]
+    names = {role: state.__name__ for role, state in s.items()}
+
+    #`[*] --> a` enters the block at a although it is not its first state, the nested block enters at its first state
+    diagram = "\n".join(["stateDiagram-v2",
+                         '    {idle} --> {work}: "{trans}"',
+                         "    {work} --> {done}",
+                         "    state {work} {{",
+                         "        {inner} --> {c}",
+                         "        [*] --> {a}",
+                         "        {a} --> {inner}",
+                         "        {c} --> [*]",
+                         "        state {inner} {{",
+                         "            {x} --> {y}",
+                         "            {y} --> [*]",
+                         "        }}",
+                         "    }}"]).format(trans = transition.__name__, **names) + "\n"
+
+    fsm = FSM(s["idle"], storeType())
+    fsm.createTransitionsFromDiagram(diagram)
+    built = _buildCompositeFsm(s, transition, EagerRouteStore())
+    assert {stateName: set(edges) for stateName, edges in fsm._stateGraph.items()} == \
+        {stateName: set(edges) for stateName, edges in built._stateGraph.items()}
+
+    _checkRoutes(fsm, s, visited)
+    fsm.close()
+    built.close()
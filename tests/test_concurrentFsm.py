@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pyFsm.concurrentFsm import ConcurrentFSM
+from pyFsm.fsmLib import FSMStates
+
+class _LockCheckedFSM(ConcurrentFSM):
+    """
+    A `ConcurrentFSM` failing whenever its resume flag is accessed without holding the mailbox lock.
+    """
+
+    def __init__(self, initialState):
+        self.unlockedAccesses = 0
+        self._mailboxLock = None
+        super().__init__(initialState)
+        self._mailboxLock = threading.Lock()
+        self._mailbox = threading.Condition(self._mailboxLock)
+
+    def _checkLock(self):
+        if self._mailboxLock is not None and not self._mailboxLock.locked():
+            self.unlockedAccesses += 1
+
+    @property
+    def _resumeRequested(self):
+        self._checkLock()
+        return self.__dict__["_resumeRequestedValue"]
+
+    @_resumeRequested.setter
+    def _resumeRequested(self, value):
+        self._checkLock()
+        self.__dict__["_resumeRequestedValue"] = value
+
+def _ring(fsm, states:list, transitions:list):
+    """
+    Creates a ring of transitions through the passed states.
+    """
+
+    fsm.createTransitions([(s, states[(i + 1) % len(states)], transitions[i % len(transitions)]) for i, s in enumerate(states)])
+
+def testResumeFlagIsOnlyAccessedUnderTheMailboxLock(makeStates, makeTransitions):
+    fsm = None
+
+    def body(stateName):
+        fsm.nextState()
+
+    states = makeStates("concurrentLocked", 4, waitsForCallback = True, body = body)
+    fsm = _LockCheckedFSM(states[0])
+    _ring(fsm, states, makeTransitions("concurrentLockedTrans", 2))
+
+    getattr(fsm, states[3].__name__)()
+    assert fsm.run() == 1
+    assert fsm.getCurrentFsmState() == states[3].__name__
+    assert fsm.unlockedAccesses == 0
+
+def testCallbacksFromOtherThreadsAreHandedToTheOwner(makeStates, makeTransitions):
+    ran = []
+    fsm = None
+
+    def body(stateName):
+        ran.append(threading.get_ident())
+        threading.Thread(target = fsm.nextState).start()
+
+    states = makeStates("concurrentHandoff", 3, waitsForCallback = True, body = body)
+    fsm = _LockCheckedFSM(states[0])
+    _ring(fsm, states, makeTransitions("concurrentHandoffTrans", 1))
+
+    for _ in range(20):
+        getattr(fsm, states[2].__name__)()
+        getattr(fsm, states[0].__name__)()
+
+    #Every callback wakes the owner, which resumes the FSM on its own thread
+    for _ in range(1000):
+        if fsm._cachedDestState is None and fsm._destQueue.empty() and fsm.getInternalFsmState() is not FSMStates.WAITING_FOR_CB:
+            break
+        fsm.serve(timeout = 5)
+
+    assert fsm.getCurrentFsmState() == states[0].__name__
+    assert set(ran) == {threading.get_ident()}
+    assert len(ran) == 60
+    assert fsm.handoffs >= 60
+    assert fsm.unlockedAccesses == 0
+
+def testPendingTransitionWakesTheOwnerOnce(makeStates, makeTransitions):
+    release = threading.Event()
+    notified = []
+    states = makeStates("concurrentPending", 2)
+    transitions = makeTransitions("concurrentPendingTrans", 1, body = lambda transName: release.wait(5), offThread = True)
+    fsm = ConcurrentFSM(states[0])
+    fsm.createTransition(states[0], states[1], transitions[0])
+
+    with ThreadPoolExecutor(1) as executor:
+        fsm.setTransitionExecutor(executor)
+        getattr(fsm, states[1].__name__)()
+        fsm._notify = lambda: notified.append(True)
+
+        #Every run while the transition is pending must not add another callback to its future
+        for _ in range(5):
+            fsm.run()
+        future = fsm._pendingTransition
+        release.set()
+        future.result(5)
+
+    assert notified == [True]
+    fsm.run()
+    assert fsm.getCurrentFsmState() == states[1].__name__
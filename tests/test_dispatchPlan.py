@@ -0,0 +1,120 @@
+import random
+
+import pytest
+
+from pyFsm import fsmGlobals as globals
+from pyFsm.fsmBatch import FSMBatch
+from pyFsm.fsmLib import FSM
+from pyFsm.machineDefinition import MachineDefinition
+from pyFsm.routeStores import CompactRouteStore, EagerRouteStore, WeightedRouteStore
+
+def _buildFsm(states:list, transitions:list, routeStore, seed:int = 0):
+    """
+    Returns a FSM over the passed states with random transitions created one by one, so the routes are updated incrementally.
+    """
+
+    rnd = random.Random(seed)
+    fsm = FSM(states[0], routeStore)
+    for i, s in enumerate(states):
+        fsm.createTransition(s, states[(i + 1) % len(states)], rnd.choice(transitions))
+    for _ in range(len(states) + len(states) // 2):
+        fsm.createTransition(rnd.choice(states), rnd.choice(states), rnd.choice(transitions))
+    return fsm
+
+def _walk(plan, stateName:str, destStateName:str) -> list:
+    """
+    Returns the `(stateName, transName)` route the plan walks between the passed states.
+    """
+
+    return [(stateRecord[0], transRecord[0] if transRecord is not None else None)
+            for stateRecord, transRecord in plan.iterHops(plan.stateIds[stateName], plan.stateIds[destStateName])]
+
+@pytest.mark.parametrize("storeType", [EagerRouteStore, CompactRouteStore, WeightedRouteStore])
+def testPlanWalksTheRoutesOfItsStore(storeType, makeStates, makeTransitions):
+    states = makeStates("planWalk", 60)
+    transitions = makeTransitions("planWalkTrans", 4) + [None]
+    fsm = _buildFsm(states, transitions, storeType())
+    plan = fsm.compile()
+    routeStore = fsm.getRouteStore()
+
+    for s in states:
+        for dest in states:
+            try:
+                route = list(routeStore.getRoute(s.__name__, dest.__name__))
+            except KeyError:
+                with pytest.raises(KeyError):
+                    _walk(plan, s.__name__, dest.__name__)
+                continue
+            assert _walk(plan, s.__name__, dest.__name__) == route
+    fsm.close()
+
+def testCompactPlanReadsTheStoreTablesInPlace(makeStates, makeTransitions):
+    states = makeStates("planCompact", 30)
+    fsm = _buildFsm(states, makeTransitions("planCompactTrans", 2), CompactRouteStore())
+    plan = fsm.compile()
+
+    assert plan.predStates is None
+    assert plan._storeTables[0] is fsm.getRouteStore().getPredecessorTables()[0]
+    fsm.close()
+
+def testEagerPlanFillsOnlyTheRowsItRoutesFrom(makeStates, makeTransitions):
+    states = makeStates("planRows", 20)
+    fsm = _buildFsm(states, makeTransitions("planRowsTrans", 2), EagerRouteStore())
+    plan = fsm.compile()
+    _walk(plan, states[3].__name__, states[7].__name__)
+
+    assert [row is not None for row in plan.predStates].count(True) == 1
+    fsm.close()
+
+@pytest.mark.parametrize("storeType", [EagerRouteStore, CompactRouteStore])
+def testRouteTablesSurviveExportAndImport(storeType, makeStates, makeTransitions):
+    states = makeStates("planExport", 25)
+    fsm = _buildFsm(states, makeTransitions("planExportTrans", 3), storeType())
+    plan = fsm.compile()
+
+    tables = type(plan).importRouteTables(plan.exportRouteTables(), len(plan.states))
+    imported = type(plan)(fsm._stateGraph, globals.gStates[fsm.uid], globals.gTransitions[fsm.uid], storeType(), tables)
+    for s in states:
+        for dest in states:
+            try:
+                route = _walk(plan, s.__name__, dest.__name__)
+            except KeyError:
+                continue
+            assert _walk(imported, s.__name__, dest.__name__) == route
+    fsm.close()
+
+def testNextHopTablesReachEveryDestination(makeStates, makeTransitions):
+    states = makeStates("planNextHops", 30)
+    fsm = _buildFsm(states, makeTransitions("planNextHopsTrans", 3), EagerRouteStore())
+    plan = fsm.compile()
+    nextStates, nextTransitions = plan.nextHopTables()
+    routeStore = fsm.getRouteStore()
+
+    for src in range(len(plan.states)):
+        for dest in range(len(plan.states)):
+            if src == dest:
+                continue
+            route = routeStore.getRoutes(plan.states[src][0]).get(plan.states[dest][0])
+            if route is None:
+                assert nextStates[src][dest] == -1
+                continue
+
+            assert plan.states[nextStates[src][dest]][0] == route[0][0]
+            stateId, hops = src, 0
+            while stateId != dest:
+                stateId = nextStates[stateId][dest]
+                hops += 1
+            assert hops == len(route)
+    fsm.close()
+
+def testBatchStepsAlongTheNextHops(makeStates, makeTransitions):
+    states = makeStates("planBatch", 12)
+    fsm = _buildFsm(states, makeTransitions("planBatchTrans", 2), EagerRouteStore())
+    definition = MachineDefinition.fromFsm(fsm)
+    batch = FSMBatch(definition, 4, useNumpy = False)
+    batch.setDestination(range(4), states[6].__name__)
+
+    for _ in range(len(states)):
+        batch.step()
+    assert all(batch.getCurrentFsmState(index) == states[6].__name__ for index in range(4))
+    fsm.close()
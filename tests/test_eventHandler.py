@@ -0,0 +1,132 @@
+import pytest
+
+from pyFsm import eventHandler as events
+from pyFsm.fsmLib import FSM
+
+def _required(event):
+    pass
+
+def _optional(event = None):
+    pass
+
+def _varArgs(*args):
+    pass
+
+def _keywordOnly(*, event):
+    pass
+
+def _none():
+    pass
+
+@pytest.mark.parametrize("handler, takesEvent", [
+    (_required, True),
+    (_optional, False),
+    (_varArgs, False),
+    (_keywordOnly, False),
+    (_none, False),
+    (print, False),
+])
+def testOnlyRequiredPositionalParametersReceiveTheEvent(handler, takesEvent):
+    assert events._takesEvent(handler) is takesEvent
+
+def testHandlersReceiveTheHops(makeStates, makeTransitions):
+    hops = []
+    calls = []
+    states = makeStates("eventHops", 3)
+    transitions = makeTransitions("eventHopsTrans", 2)
+    fsm = FSM(states[0])
+    fsm.createTransitions([(states[0], states[1], transitions[0]), (states[1], states[2], transitions[1])])
+
+    fsm.onDestinationReached(lambda event: hops.append((event.fromState, event.toState, event.transition, event.isDestination)))
+    fsm.onDestinationReached(lambda *args: calls.append(args))
+    getattr(fsm, states[2].__name__)()
+    fsm.run()
+
+    assert hops == [(states[1].__name__, states[2].__name__, transitions[1].__name__, True)]
+    assert calls == [()]
+    fsm.close()
+
+def testBufferedEventsAreCopiedAndDelivered(makeStates):
+    received = []
+    states = makeStates("eventBuffer", 4)
+    fsm = FSM(states[0])
+    fsm.createTransitions([(s, states[(i + 1) % 4]) for i, s in enumerate(states)])
+    fsm.onStateReached(lambda event: received.append(event.toState))
+
+    buffer = fsm.bufferEvents(capacity = 16)
+    getattr(fsm, states[3].__name__)()
+    fsm.run()
+    assert received == []
+
+    buffer.drain(16)
+    assert received == [states[1].__name__, states[2].__name__]
+    fsm.close()
+
+def _bufferedDispatcher(received:list, overflow:str, **kwargs):
+    """
+    Returns a dispatcher of the `reached` event buffered with the passed overflow policy and a capacity of 4 events,
+    whose handler records the reached state names in the passed list.
+    """
+
+    dispatcher = events.EventDispatcher("reached")
+    dispatcher.subscribeToEvent("reached", lambda event: received.append(event.toState))
+    dispatcher.enableBuffering(capacity = 4, overflow = overflow, **kwargs)
+    return dispatcher
+
+def _raise(dispatcher, count:int):
+    """
+    Raises `count` events reaching the states numbered from 0.
+    """
+
+    event = events.FsmEvent(0)
+    for i in range(count):
+        event.toState = i
+        dispatcher.raiseEvent("reached", event)
+    pass
+
+def testDropOldestKeepsTheNewestEvents():
+    received = []
+    dispatcher = _bufferedDispatcher(received, events.DROP_OLDEST)
+    _raise(dispatcher, 10)
+
+    buffer = dispatcher.buffer
+    assert buffer.drain() == 4
+    assert received == [6, 7, 8, 9]
+    assert (buffer.delivered, buffer.dropped) == (4, 6)
+
+def testSampleKeepsEverySampleRateEventOfAFullBuffer():
+    received = []
+    dispatcher = _bufferedDispatcher(received, events.SAMPLE, sampleRate = 3)
+    _raise(dispatcher, 10)
+
+    #Of the 6 events raised into the full buffer, the 3rd and the 6th evict the oldest ones and the rest are dropped
+    buffer = dispatcher.buffer
+    assert buffer.drain() == 4
+    assert received == [2, 3, 6, 9]
+    assert (buffer.delivered, buffer.dropped) == (4, 6)
+
+def testBlockDeliversOnTheRaisingThreadWithoutABackgroundThread():
+    received = []
+    dispatcher = _bufferedDispatcher(received, events.BLOCK, batchSize = 2)
+    _raise(dispatcher, 10)
+
+    #Every event raised into the full buffer first delivers a batch of 2 events
+    buffer = dispatcher.buffer
+    assert received == [0, 1, 2, 3, 4, 5]
+    assert len(buffer) == 4
+
+    buffer.drain()
+    assert received == list(range(10))
+    assert (buffer.delivered, buffer.dropped) == (10, 0)
+
+def testBlockWaitsForTheBackgroundThread():
+    received = []
+    dispatcher = _bufferedDispatcher(received, events.BLOCK, batchSize = 2)
+    buffer = dispatcher.buffer
+    buffer.start(interval = 0.001)
+    _raise(dispatcher, 100)
+
+    assert buffer.flush(timeout = 5)
+    buffer.stop()
+    assert received == list(range(100))
+    assert (buffer.delivered, buffer.dropped) == (100, 0)
@@ -0,0 +1,39 @@
+import pytest
+
+from pyFsm import fsmGlobals as globals
+
+def _positionalOnly(value, /):
+    return (value,)
+
+def _keywordOnly(*, value):
+    return {"value": value}
+
+def _both(value, other = None):
+    return (value, other)
+
+def _none():
+    return ()
+
+@pytest.mark.parametrize("func, args, kwargs, expected", [
+    (_positionalOnly, (1,), {}, (1,)),
+    (_keywordOnly, (), {"value": 2}, {"value": 2}),
+    (_both, (3,), {"other": 4}, (3, 4)),
+    (_none, (), {}, ()),
+])
+def testCallWithArgumentsPassesEveryArgument(func, args, kwargs, expected):
+    argsKind = globals._inspectArguments(func)
+    assert globals._callWithArguments(func, argsKind, args, kwargs) == expected
+
+@pytest.mark.parametrize("func, args, kwargs", [
+    (_positionalOnly, (1,), {"extra": 2}),
+    (_keywordOnly, (1,), {"value": 2}),
+])
+def testCallWithArgumentsNeverDropsArguments(func, args, kwargs):
+    with pytest.raises(TypeError):
+        globals._callWithArguments(func, globals._inspectArguments(func), args, kwargs)
+
+def testInspectArgumentsFlags():
+    assert globals._inspectArguments(_none) == globals.ARGS_NONE
+    assert globals._inspectArguments(_positionalOnly) == globals.ARGS_POSITIONAL
+    assert globals._inspectArguments(_keywordOnly) == globals.ARGS_KEYWORD
+    assert globals._inspectArguments(_both) == globals.ARGS_ANY
@@ -0,0 +1,103 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pyFsm.fsmLib import FSM, FSMStates
+
+def _chainFsm(states:list, transitions:list) -> FSM:
+    """
+    Returns a FSM walking a chain through the passed states, with one transition per hop.
+    """
+
+    fsm = FSM(states[0])
+    fsm.createTransitions([(s, states[i + 1], transitions[i]) for i, s in enumerate(states[:-1])])
+    return fsm
+
+def testInlineCallbacksDoNotRecurse(makeStates):
+    fsm = None
+    visits = []
+
+    def body(stateName):
+        visits.append(stateName)
+        fsm.nextState()
+
+    states = makeStates("trampoline", 2, waitsForCallback = True, body = body)
+    fsm = FSM(states[0])
+    fsm.createTransitions([(states[0], states[1]), (states[1], states[0])])
+
+    #Every destination resumes a waiting state from inside its own body
+    resumes = sys.getrecursionlimit() + 100
+    for i in range(resumes):
+        getattr(fsm, states[(i + 1) % 2].__name__)()
+    fsm.run()
+
+    assert len(visits) == resumes
+    assert fsm.getCurrentFsmState() == states[resumes % 2].__name__
+    assert fsm.getInternalFsmState() is not FSMStates.WAITING_FOR_CB
+    fsm.close()
+
+def testOffThreadTransitionSuspendsTheRun(makeStates, makeTransitions):
+    visited = []
+    release = threading.Event()
+    transThreads = []
+
+    def transBody(transName):
+        transThreads.append(threading.get_ident())
+        release.wait(5)
+
+    states = makeStates("offThread", 3, body = visited.append)
+    transitions = makeTransitions("offThreadTrans", 1, body = transBody, offThread = True)
+    transitions += makeTransitions("offThreadInline", 1)
+    fsm = _chainFsm(states, transitions)
+
+    with ThreadPoolExecutor(1) as executor:
+        fsm.setTransitionExecutor(executor)
+        getattr(fsm, states[2].__name__)()
+
+        #The run returns while the transition is pending, before reaching the next state
+        fsm.run()
+        assert fsm.isTransitionPending()
+        assert fsm.getInternalFsmState() is FSMStates.IN_TRANSITION
+        assert fsm.getCurrentFsmState() == states[0].__name__
+        assert visited == []
+        assert fsm.run() == 0
+
+        release.set()
+        fsm._pendingTransition.result(5)
+        assert not fsm.isTransitionPending()
+
+        fsm.run()
+        assert visited == [states[1].__name__, states[2].__name__]
+        assert fsm.getCurrentFsmState() == states[2].__name__
+        assert transThreads and transThreads[0] != threading.get_ident()
+    fsm.close()
+
+def testOffThreadTransitionErrorsAreRaisedByRun(makeStates, makeTransitions):
+    release = threading.Event()
+
+    def transBody(transName):
+        release.wait(5)
+        raise RuntimeError(transName)
+
+    states = makeStates("offThreadError", 2)
+    transitions = makeTransitions("offThreadErrorTrans", 1, body = transBody, offThread = True)
+    fsm = _chainFsm(states, transitions)
+
+    with ThreadPoolExecutor(1) as executor:
+        fsm.setTransitionExecutor(executor)
+        getattr(fsm, states[1].__name__)()
+        fsm.run()
+        assert fsm.isTransitionPending()
+
+        #Waits for the transition without consuming its future
+        release.set()
+        while fsm.isTransitionPending():
+            time.sleep(0.001)
+
+        with pytest.raises(RuntimeError, match = transitions[0].__name__):
+            fsm.run()
+        assert not fsm.isTransitionPending()
+    fsm.close()
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from pyFsm import graphAnalysis as analysis
+from pyFsm.fsmLib import FSM
+
+def _randomGraph(stateCount:int, edgeCount:int, seed:int) -> dict:
+    """
+    Returns a random state graph of mostly small components.
+    """
+
+    rnd = random.Random(seed)
+    graph = {"s{}".format(i): [] for i in range(stateCount)}
+    for _ in range(edgeCount):
+        graph["s{}".format(rnd.randrange(stateCount))].append(("s{}".format(rnd.randrange(stateCount)), None))
+    return graph
+
+def _reachable(graph:dict, stateName:str) -> set:
+    """
+    Returns the states reachable from the passed state with a plain search of the graph.
+    """
+
+    seen = {stateName}
+    stack = [stateName]
+    while stack:
+        for nextState, transName in graph[stack.pop()]:
+            if nextState not in seen:
+                seen.add(nextState)
+                stack.append(nextState)
+    return seen
+
+@pytest.mark.parametrize("eagerComponents", [analysis._EAGER_COMPONENTS, 4])
+def testReachabilityMatchesASearch(monkeypatch, eagerComponents):
+    monkeypatch.setattr(analysis, "_EAGER_COMPONENTS", eagerComponents)
+    graph = _randomGraph(60, 70, seed = 3)
+    graphAnalysis = analysis.GraphAnalysis(graph)
+
+    for stateName in graph:
+        reachable = _reachable(graph, stateName)
+        assert graphAnalysis.reachableStates(stateName) == reachable
+        assert sorted(graphAnalysis.unreachableStates(stateName)) == sorted(set(graph) - reachable)
+        for destStateName in graph:
+            assert graphAnalysis.canReach(stateName, destStateName) == (destStateName in reachable)
+
+        component = graphAnalysis.componentOf[stateName]
+        reach = graphAnalysis.reach(component)
+        assert {stateName for stateName in graph if (reach >> graphAnalysis.componentOf[stateName]) & 1} == reachable
+
+def testSearchedBitsetsAreBoundedLeastRecentlyUsed(monkeypatch):
+    monkeypatch.setattr(analysis, "_EAGER_COMPONENTS", 4)
+    monkeypatch.setattr(analysis, "_REACH_CACHE_BYTES", 16)
+    #A chain of 64 components, whose bitsets take 9 bytes each
+    graph = {"s{}".format(i): [("s{}".format(i + 1), None)] if i < 63 else [] for i in range(64)}
+    graphAnalysis = analysis.GraphAnalysis(graph)
+    assert graphAnalysis._reachLimit == 1
+
+    assert graphAnalysis.canReach("s0", "s63")
+    assert not graphAnalysis.canReach("s63", "s0")
+    assert list(graphAnalysis._reach) == [graphAnalysis.componentOf["s63"]]
+    assert graphAnalysis.canReach("s0", "s10")
+    assert len(graphAnalysis._reach) == 1
+
+def testAdmissionChecksRejectUnreachableDestinations(makeStates):
+    states = makeStates("admission", 4)
+    fsm = FSM(states[0])
+    #The last state only leads into the others, which never lead back to it
+    fsm.createTransitions([(states[0], states[1]), (states[1], states[2]), (states[2], states[1]), (states[3], states[0])])
+    fsm.setAdmissionChecks()
+
+    getattr(fsm, states[2].__name__)()
+    queued = fsm._destQueue.items()
+    with pytest.raises(ValueError):
+        getattr(fsm, states[3].__name__)()
+    assert fsm._destQueue.items() == queued
+
+    #The destination is checked from the last queued one, not from the current state
+    with pytest.raises(ValueError):
+        getattr(fsm, states[0].__name__)()
+    getattr(fsm, states[1].__name__)()
+    assert [command[0] for command in fsm._destQueue.items()] == [states[2].__name__, states[1].__name__]
+
+    fsm.run()
+    assert fsm.getCurrentFsmState() == states[1].__name__
+
+    fsm.setAdmissionChecks(False)
+    getattr(fsm, states[3].__name__)()
+    assert fsm._destQueue.qsize() == 1
+    fsm.close()
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from pyFsm import heuristics as sort
+from pyFsm.fsmLib import FSM
+from pyFsm.routeStores import EagerRouteStore
+
+def _randomPairs(stateCount:int, edgeCount:int, seed:int) -> list:
+    """
+    Returns random `(stateName, nextStateName, transName)` name triples with repeated pairs, self loops and instant transitions.
+    """
+
+    rnd = random.Random(seed)
+    names = ["s{}".format(i) for i in range(stateCount)]
+    pairs = []
+    for i in range(edgeCount):
+        transName = "t{}".format(rnd.randrange(4)) if rnd.random() > 0.3 else None
+        pairs.append((rnd.choice(names), rnd.choice(names), transName))
+    return pairs
+
+@pytest.mark.parametrize("seed", range(8))
+def testIncrementalRoutesMatchFullRebuild(seed):
+    stateGraph = {}
+    routes = {}
+
+    for stateName, nextStateName, transName in _randomPairs(25, 90, seed):
+        sort.addTransitionToGraph(stateGraph, stateName, nextStateName, transName)
+        sort.updateShortestRoutes(routes, stateGraph, stateName, nextStateName, transName)
+        assert routes == sort.findShortestRoutes(stateGraph)
+
+def testTiesPreferTheEarlierCreatedTransition():
+    stateGraph = {}
+    routes = {}
+    #a reaches d through b and c in two hops, the a -> c transition is created after a -> b
+    for pair in (("a", "c", "t1"), ("c", "d", "t2"), ("a", "b", "t3"), ("b", "d", "t4")):
+        sort.addTransitionToGraph(stateGraph, *pair)
+        sort.updateShortestRoutes(routes, stateGraph, *pair)
+
+    assert routes["a"]["d"] == [("c", "t1"), ("d", "t2")]
+    assert routes == sort.findShortestRoutes(stateGraph)
+
+def testFindShortestRouteMatchesStoredRoutes():
+    stateGraph = sort.buildStateGraph([])
+    for pair in _randomPairs(30, 80, 11):
+        sort.addTransitionToGraph(stateGraph, *pair)
+
+    routes = sort.findShortestRoutes(stateGraph)
+    reverseGraph = sort.buildReverseStateGraph(stateGraph)
+    for startState in stateGraph:
+        for destState in stateGraph:
+            route = sort.findShortestRoute(stateGraph, startState, destState)
+            assert route == routes[startState].get(destState)
+            bidirectional = sort.findShortestRouteBidirectional(stateGraph, reverseGraph, startState, destState)
+            assert (bidirectional is None) == (route is None)
+            if route is not None:
+                assert len(bidirectional) == len(route)
+
+def testEagerStoreUpdatedEdgeByEdgeMatchesRebuild(makeStates, makeTransitions):
+    states = makeStates("heuristicsEager", 20)
+    transitions = makeTransitions("heuristicsEagerTrans", 3) + [None]
+    rnd = random.Random(5)
+
+    fsm = FSM(states[0], EagerRouteStore())
+    for _ in range(70):
+        fsm.createTransition(rnd.choice(states), rnd.choice(states), rnd.choice(transitions))
+        assert fsm.getRouteStore().routes == sort.findShortestRoutes(fsm._stateGraph)
+    fsm.close()
@@ -0,0 +1,55 @@
+import pytest
+
+from pyFsm.fsmLib import FSMStates
+from pyFsm.machineDefinition import MachineDefinition, MachineInstance
+
+def _ringDefinition(states:list, transitions:list) -> MachineDefinition:
+    """
+    Returns a definition of a ring through the passed states.
+    """
+
+    return MachineDefinition.fromTransitions(states[0], [(s, states[(i + 1) % len(states)], transitions[i % len(transitions)])
+                                                         for i, s in enumerate(states)])
+
+def testInstancesPipeAndRunTheirOwnDestinations(makeStates, makeTransitions):
+    visited = []
+    states = makeStates("definitionPipe", 5, body = visited.append)
+    definition = _ringDefinition(states, makeTransitions("definitionPipeTrans", 2))
+    first, second = definition.spawn(), definition.spawn()
+
+    getattr(getattr(first, states[2].__name__)(), states[4].__name__)().run()
+    assert first.getCurrentFsmState() == states[4].__name__
+    assert second.getCurrentFsmState() == states[0].__name__
+    assert visited == [s.__name__ for s in states[1:5]]
+
+def testQueueingFunctionsAreSharedByTheInstances(makeStates, makeTransitions):
+    states = makeStates("definitionShared", 3)
+    definition = _ringDefinition(states, makeTransitions("definitionSharedTrans", 1))
+    first, second = definition.spawn(), definition.spawn()
+
+    stateName = states[1].__name__
+    assert getattr(first, stateName).__func__ is getattr(second, stateName).__func__
+    assert getattr(first, stateName).__func__ is definition.getQueueingFunction(stateName)
+    with pytest.raises(AttributeError):
+        first.missingState
+
+def testDirectInstancesQueueThroughTheDefinition(makeStates, makeTransitions):
+    states = makeStates("definitionDirect", 3)
+    definition = _ringDefinition(states, makeTransitions("definitionDirectTrans", 1))
+    instance = MachineInstance(definition)
+
+    getattr(instance, states[2].__name__)().run()
+    assert instance.getCurrentFsmState() == states[2].__name__
+    assert getattr(instance, states[1].__name__).__func__ is definition.getQueueingFunction(states[1].__name__)
+
+def testWaitingInstanceIgnoresPipedDestinations(makeStates, makeTransitions):
+    states = makeStates("definitionWait", 2, waitsForCallback = True)
+    definition = _ringDefinition(states, makeTransitions("definitionWaitTrans", 1))
+    instance = definition.spawn()
+
+    getattr(instance, states[1].__name__)().run()
+    assert instance.getInternalFsmState() is FSMStates.WAITING_FOR_CB
+    assert getattr(instance, states[0].__name__)() is None
+
+    instance.nextState()
+    assert instance.getInternalFsmState() is not FSMStates.WAITING_FOR_CB
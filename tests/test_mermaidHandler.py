@@ -0,0 +1,210 @@
+import os
+
+import pytest
+
+from pyFsm import mermaidHandler
+from pyFsm.fsmLib import FSM
+from pyFsm.mermaidHandler import DiagramCache
+from pyFsm.routeStores import AStarRouteStore, CostTable, WeightedRouteStore
+
+@pytest.fixture
+def diagramCache(monkeypatch):
+    """
+    Replaces the diagram cache shared by every `MermaidHandler` with an empty one for the test.
+    """
+
+    cache = DiagramCache()
+    monkeypatch.setattr(mermaidHandler, "diagramCache", cache)
+    return cache
+
+def _diagram(states:list, transitions:list) -> str:
+    """
+    Returns a Mermaid diagram of a ring through the passed states, labelled with the passed transitions,
+    with an instant shortcut from the first state to the middle one.
+    """
+
+    lines = ["stateDiagram-v2"]
+    for i, s in enumerate(states):
+        lines.append('    {} --> {}: "{}"'.format(s.__name__, states[(i + 1) % len(states)].__name__, transitions[i].__name__))
+    lines.append("    {} --> {}".format(states[0].__name__, states[len(states) // 2].__name__))
+    return "\n".join(lines) + "\n"
+
+def _edges(fsm) -> dict:
+    """
+    Returns the transitions of the FSM as sets, which do not depend on the order the diagram was read in.
+    """
+    return {stateName: set(edges) for stateName, edges in fsm._stateGraph.items()}
+
+def testSeenDiagramsShareTheirCompiledDefinition(diagramCache, makeStates, makeTransitions):
+    states = makeStates("diagramShared", 4)
+    diagram = _diagram(states, makeTransitions("diagramSharedTrans", 4))
+
+    first = FSM(states[0])
+    first.createTransitionsFromDiagram(diagram)
+    assert (diagramCache.hits, diagramCache.misses) == (0, 1)
+
+    second, third = FSM(states[0]), FSM(states[0])
+    second.createTransitionsFromDiagram(diagram)
+    third.createTransitionsFromDiagram(diagram)
+    assert (diagramCache.hits, diagramCache.misses) == (2, 1)
+    assert _edges(second) == _edges(first)
+    assert second._stateGraph is third._stateGraph
+
+    getattr(second, states[3].__name__)()
+    second.run()
+    assert second.getCurrentFsmState() == states[3].__name__
+    #Changing the graph of a FSM sharing the definition leaves the others untouched
+    second.createTransition(states[3], states[1])
+    assert _edges(third) == _edges(first)
+
+    for fsm in (first, second, third):
+        fsm.close()
+
+def testEditedDiagramsAreParsedAgain(diagramCache, makeStates, makeTransitions):
+    states = makeStates("diagramEdited", 4)
+    diagram = _diagram(states, makeTransitions("diagramEditedTrans", 4))
+
+    first, second = FSM(states[0]), FSM(states[0])
+    first.createTransitionsFromDiagram(diagram)
+    second.createTransitionsFromDiagram(diagram + "    {} --> {}\n".format(states[2].__name__, states[0].__name__))
+    assert (diagramCache.hits, diagramCache.misses) == (0, 2)
+    assert (states[0].__name__, None) in second._stateGraph[states[2].__name__]
+    assert (states[0].__name__, None) not in first._stateGraph[states[2].__name__]
+
+    first.close()
+    second.close()
+
+def testCacheFilesAreReadByTheNextCacheAndCheckedOnRead(diagramCache, makeStates, makeTransitions, tmp_path):
+    states = makeStates("diagramFiles", 4)
+    diagram = _diagram(states, makeTransitions("diagramFilesTrans", 4))
+    diagramCache.directory = str(tmp_path)
+
+    first = FSM(states[0])
+    first.createTransitionsFromDiagram(diagram)
+    cacheFiles = os.listdir(str(tmp_path))
+    assert len(cacheFiles) == 1
+
+    nextCache = DiagramCache(str(tmp_path))
+    assert nextCache.get(diagram) is not None
+    assert (nextCache.diskHits, nextCache.misses) == (1, 0)
+    nextCache.clear()
+    assert nextCache.get(diagram) is not None
+    assert nextCache.diskHits == 2
+
+    #Files of another version or cut short are ignored
+    path = os.path.join(str(tmp_path), cacheFiles[0])
+    with open(path, "rb") as cacheFile:
+        data = cacheFile.read()
+    for corrupted in (data[:-1], data[:8] + b"\xff\xff" + data[10:]):
+        with open(path, "wb") as cacheFile:
+            cacheFile.write(corrupted)
+        assert DiagramCache(str(tmp_path)).get(diagram) is None
+    first.close()
+
+def testCostsSetBeforeTheDiagramAreNotShared(diagramCache, makeStates, makeTransitions):
+    visited = []
+    states = makeStates("diagramCosts", 4, body = visited.append)
+    transitions = makeTransitions("diagramCostsTrans", 2)
+    #Two routes lead from the first state to the last one, the one through the third state costs more
+    diagram = "\n".join(["stateDiagram-v2",
+                         '    {} --> {}: "{}"'.format(states[0].__name__, states[1].__name__, transitions[0].__name__),
+                         '    {} --> {}: "{}" [cost=2]'.format(states[0].__name__, states[2].__name__, transitions[1].__name__),
+                         "    {} --> {}".format(states[1].__name__, states[3].__name__),
+                         "    {} --> {}".format(states[2].__name__, states[3].__name__),
+                         "    {} --> {}".format(states[3].__name__, states[0].__name__)]) + "\n"
+
+    def route(fsm) -> list:
+        del visited[:]
+        getattr(fsm, states[3].__name__)()
+        fsm.run()
+        return list(visited)
+
+    pricey = FSM(states[0], WeightedRouteStore())
+    pricey.setStateCost(states[1], 5)
+    pricey.createTransitionsFromDiagram(diagram)
+    assert route(pricey) == [states[2].__name__, states[3].__name__]
+
+    #The FSMs created from the diagram alone neither see nor share the costs of the first one
+    plain, shared = FSM(states[0], WeightedRouteStore()), FSM(states[0], WeightedRouteStore())
+    plain.createTransitionsFromDiagram(diagram)
+    shared.createTransitionsFromDiagram(diagram)
+    assert shared._sharesDefinition
+    for fsm in (plain, shared):
+        assert fsm.getCostTable().export() == ((((states[0].__name__, states[2].__name__, transitions[1].__name__), 2.0),), (), ())
+        assert route(fsm) == [states[1].__name__, states[3].__name__]
+
+    #A FSM with costs of its own does not take the cached definition either
+    priceyAgain = FSM(states[0], WeightedRouteStore())
+    priceyAgain.setStateCost(states[1], 5)
+    priceyAgain.createTransitionsFromDiagram(diagram)
+    assert not priceyAgain._sharesDefinition
+    assert route(priceyAgain) == [states[2].__name__, states[3].__name__]
+
+    for fsm in (pricey, plain, shared, priceyAgain):
+        fsm.close()
+
+def testDefinitionsAreKeyedByTheRouteStoreSettings(diagramCache, makeStates, makeTransitions):
+    visited = []
+    states = makeStates("diagramSettings", 4, body = visited.append)
+    transitions = makeTransitions("diagramSettingsTrans", 2)
+    #The route through the third state only takes instant transitions
+    diagram = "\n".join(["stateDiagram-v2",
+                         '    {} --> {}: "{}"'.format(states[0].__name__, states[1].__name__, transitions[0].__name__),
+                         '    {} --> {}: "{}"'.format(states[1].__name__, states[3].__name__, transitions[1].__name__),
+                         "    {} --> {}".format(states[0].__name__, states[2].__name__),
+                         "    {} --> {}".format(states[2].__name__, states[3].__name__)]) + "\n"
+
+    def route(fsm) -> list:
+        del visited[:]
+        getattr(fsm, states[3].__name__)()
+        fsm.run()
+        return list(visited)
+
+    free = FSM(states[0], WeightedRouteStore())
+    free.createTransitionsFromDiagram(diagram)
+    costly = FSM(states[0], WeightedRouteStore(CostTable(instantCost = 5)))
+    costly.createTransitionsFromDiagram(diagram)
+    assert route(free) == [states[2].__name__, states[3].__name__]
+    assert route(costly) == [states[1].__name__, states[3].__name__]
+    assert len(diagramCache.get(diagram).definitions) == 2
+
+    costlyAgain = FSM(states[0], WeightedRouteStore(CostTable(instantCost = 5)))
+    costlyAgain.createTransitionsFromDiagram(diagram)
+    assert costlyAgain._sharesDefinition
+    assert route(costlyAgain) == [states[1].__name__, states[3].__name__]
+
+    #The routes of a store with a heuristic are never shared
+    guided = [FSM(states[0], AStarRouteStore(heuristic = lambda stateName, destStateName: 0)) for _ in range(2)]
+    for fsm in guided:
+        fsm.createTransitionsFromDiagram(diagram)
+        assert not fsm._sharesDefinition
+    assert len(diagramCache.get(diagram).definitions) == 2
+
+    for fsm in [free, costly, costlyAgain] + guided:
+        fsm.close()
+
+def testStreamingLoadMatchesTheDiagram(diagramCache, makeStates, makeTransitions, tmp_path):
+    states = makeStates("diagramStream", 6)
+    diagram = _diagram(states, makeTransitions("diagramStreamTrans", 6))
+    path = tmp_path / "diagram.mmd"
+    path.write_text(diagram, encoding = "utf-8")
+
+    parsed = FSM(states[0])
+    parsed.createTransitionsFromDiagram(diagram)
+    progress = []
+    streamed = FSM(states[0])
+    info = streamed.createTransitionsFromStream(str(path), batchSize = 2, progress = lambda edges, rate: progress.append(edges))
+
+    assert info["edges"] == len(states) + 1
+    assert info["lines"] == len(diagram.splitlines())
+    assert progress == [2, 4, 6, 7]
+    assert _edges(streamed) == _edges(parsed)
+
+    for destState in states[1:] + states[:1]:
+        for fsm in (parsed, streamed):
+            getattr(fsm, destState.__name__)()
+            fsm.run()
+        assert streamed.getCurrentFsmState() == parsed.getCurrentFsmState() == destState.__name__
+
+    parsed.close()
+    streamed.close()
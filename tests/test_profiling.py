@@ -0,0 +1,118 @@
+import json
+import time
+
+from pyFsm.fsmLib import FSM
+from pyFsm.profiling import Profiler
+from pyFsm.routeStores import WeightedRouteStore
+
+def _ringFsm(states:list, transitions:list) -> FSM:
+    """
+    Returns a FSM walking a ring through the passed states, with one transition per hop.
+    """
+
+    fsm = FSM(states[0])
+    fsm.createTransitions([(s, states[(i + 1) % len(states)], transitions[i]) for i, s in enumerate(states)])
+    return fsm
+
+def testDetachRemovesTheInstanceHooks(makeStates, makeTransitions):
+    states = makeStates("profilerHooks", 3)
+    fsm = _ringFsm(states, makeTransitions("profilerHooksTrans", 3))
+    profiler = Profiler()
+
+    fsm.enableProfiling(profiler)
+    assert "_traverseToState" in fsm.__dict__ and "nextState" in fsm.__dict__
+    getattr(fsm, states[1].__name__)()
+    fsm.run()
+    assert profiler.states[states[1].__name__].count == 1
+
+    fsm.disableProfiling()
+    assert "_traverseToState" not in fsm.__dict__ and "nextState" not in fsm.__dict__
+
+    #The plain code path records nothing
+    getattr(fsm, states[2].__name__)()
+    fsm.run()
+    assert profiler.states[states[2].__name__].count == 0
+    assert profiler.routes.count == 1
+    fsm.close()
+
+def testStateLatencyRouteLengthAndQueueDepth(makeStates, makeTransitions):
+    def body(stateName):
+        if stateName == states[2].__name__:
+            time.sleep(0.01)
+
+    states = makeStates("profilerMetrics", 4, body = body)
+    transitions = makeTransitions("profilerMetricsTrans", 4)
+    fsm = _ringFsm(states, transitions)
+    profiler = Profiler()
+    fsm.enableProfiling(profiler)
+
+    getattr(fsm, states[3].__name__)()
+    getattr(fsm, states[1].__name__)()
+    getattr(fsm, states[2].__name__)()
+    fsm.run()
+
+    slowState = profiler.states[states[2].__name__]
+    assert slowState.count == 2
+    assert slowState.max >= 0.01 and slowState.total >= 0.02
+    assert profiler.states[states[1].__name__].max < 0.01
+    assert profiler.transitions[transitions[0].__name__].count == 2
+
+    #The routes walk 3, 2 and 1 states and the queue is sampled after taking each destination
+    assert list(profiler.routes.samples) == [3, 2, 1]
+    assert list(profiler.queueDepth.samples) == [2, 1, 0]
+    assert profiler.routes.snapshot()["mean"] == 2
+    fsm.close()
+
+def testJsonAndPrometheusExports(makeStates, makeTransitions):
+    states = makeStates("profilerExport", 3)
+    fsm = _ringFsm(states, makeTransitions("profilerExportTrans", 3))
+    profiler = Profiler()
+    fsm.enableProfiling(profiler)
+    getattr(fsm, states[2].__name__)()
+    fsm.run()
+
+    assert json.loads(profiler.toJson()) == json.loads(json.dumps(profiler.snapshot()))
+    assert json.loads(profiler.toJson())["states"][states[1].__name__]["count"] == 1
+
+    lines = profiler.toPrometheus(prefix = "test").splitlines()
+    assert "# TYPE test_state_seconds summary" in lines
+    assert 'test_state_seconds_count{{state="{}"}} 1'.format(states[1].__name__) in lines
+    assert 'test_state_seconds_count{{state="{}"}} 0'.format(states[0].__name__) in lines
+    assert "test_route_states_sum 2.0" in lines
+    assert "test_route_states_count 1" in lines
+    assert 'test_queue_depth{quantile="0.99"} 0.0' in lines
+    fsm.close()
+
+def testMeasuredCostsSteerTheWeightedRoutes(makeStates):
+    visited = []
+
+    def body(stateName):
+        visited.append(stateName)
+        if stateName == states[1].__name__:
+            time.sleep(0.01)
+
+    #Two routes of the same length lead from the first state to the last one, the one through the second state is slow
+    states = makeStates("profilerCosts", 4, body = body)
+    fsm = FSM(states[0], WeightedRouteStore())
+    fsm.createTransitions([(states[0], states[1]), (states[0], states[2]), (states[1], states[3]), (states[2], states[3]), (states[3], states[0])])
+    profiler = Profiler()
+    fsm.enableProfiling(profiler)
+
+    for destState in (states[1], states[3], states[0], states[2], states[3], states[0]):
+        getattr(fsm, destState.__name__)()
+    fsm.run()
+
+    assert fsm.applyMeasuredCosts(profiler) == 4
+    stateCosts = fsm.getCostTable().stateCosts
+    slowState = profiler.states[states[1].__name__]
+    assert stateCosts[states[1].__name__] == slowState.total / slowState.count
+    assert stateCosts[states[1].__name__] > stateCosts[states[2].__name__]
+
+    del visited[:]
+    getattr(fsm, states[3].__name__)()
+    fsm.run()
+    assert visited == [states[2].__name__, states[3].__name__]
+
+    assert fsm.applyMeasuredCosts(profiler, percentile = 50) == 4
+    assert stateCosts[states[1].__name__] == slowState.percentile(50)
+    fsm.close()
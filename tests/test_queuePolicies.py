@@ -0,0 +1,104 @@
+import pytest
+
+from pyFsm import destQueues as queues
+from pyFsm.concurrentFsm import ConcurrentFSM
+from pyFsm.fsmLib import FSM
+
+def _ringFsm(states:list) -> FSM:
+    """
+    Returns a FSM walking a ring through the passed states.
+    """
+
+    fsm = FSM(states[0])
+    fsm.createTransitions([(s, states[(i + 1) % len(states)]) for i, s in enumerate(states)])
+    return fsm
+
+def _pipe(fsm, *states):
+    """
+    Pipes the passed destination states into the FSM.
+    """
+
+    for destState in states:
+        getattr(fsm, destState.__name__)()
+    pass
+
+def testFuseMergesTheOnlyQueuedDestination(makeStates):
+    visited = []
+    states = makeStates("fuseSingle", 4, body = visited.append)
+    fsm = _ringFsm(states)
+    fsm.setQueuePolicies(queues.FUSE)
+
+    _pipe(fsm, states[1], states[2])
+    assert fsm.queueInfo()["depth"] == 1
+    assert fsm.queueInfo()["fused"] == 1
+
+    fsm.run()
+    assert visited == [states[1].__name__, states[2].__name__]
+
+def testFuseKeepsADestinationOffTheRoute(makeStates):
+    visited = []
+    states = makeStates("fuseOffRoute", 4, body = visited.append)
+    fsm = _ringFsm(states)
+    fsm.setQueuePolicies(queues.FUSE)
+
+    #The route from the first state to the second one does not pass through the third one
+    _pipe(fsm, states[2], states[1])
+    assert fsm.queueInfo()["fused"] == 0
+
+    fsm.run()
+    assert fsm.getCurrentFsmState() == states[1].__name__
+
+def testFuseFollowsTheDestinationTheFsmIsWalkingTo(makeStates):
+    fsm = None
+    piped = []
+
+    def body(stateName):
+        #Pipes from inside the route to the third state, which is the destination the FSM is walking to
+        if stateName == states[1].__name__ and not piped:
+            piped.append(stateName)
+            _pipe(fsm, states[3], states[0])
+
+    states = makeStates("fuseWalking", 5, body = body)
+    fsm = _ringFsm(states)
+    fsm.setQueuePolicies(queues.FUSE)
+
+    _pipe(fsm, states[2])
+    fsm.run()
+    assert fsm.queueInfo()["fused"] == 1
+    assert fsm.getCurrentFsmState() == states[0].__name__
+
+def testFuseCompilesOutsideTheQueueLock(makeStates):
+    lockedCompiles = []
+    states = makeStates("fuseLock", 4)
+    fsm = ConcurrentFSM(states[0])
+    fsm.createTransitions([(s, states[(i + 1) % 4]) for i, s in enumerate(states)])
+    fsm.setQueuePolicies(queues.FUSE)
+
+    compile = fsm.compile
+    def checkedCompile():
+        lockedCompiles.append(fsm._destQueue._lock.locked())
+        return compile()
+    fsm.compile = checkedCompile
+
+    _pipe(fsm, states[1], states[2])
+    assert fsm.queueInfo()["fused"] == 1
+    assert lockedCompiles == [False]
+
+    #A plan dropped while the queue is locked makes the destinations queue without being fused
+    fsm._plan = None
+    fsm._destQueue.putWith((states[3].__name__, (), {}), fsm._combineCommand)
+    assert fsm.queueInfo()["depth"] == 2
+    assert lockedCompiles == [False]
+
+@pytest.mark.parametrize("policy, expected", [
+    (queues.LATEST_WINS, {"depth": 1, "dropped": 2}),
+    (queues.DEDUPE, {"depth": 2, "deduped": 1}),
+])
+def testPoliciesDropSupersededDestinations(makeStates, policy, expected):
+    states = makeStates("queuePolicy", 3)
+    fsm = _ringFsm(states)
+    fsm.setQueuePolicies(policy)
+
+    _pipe(fsm, states[2], states[2], states[1])
+    info = fsm.queueInfo()
+    assert {key: info[key] for key in expected} == expected
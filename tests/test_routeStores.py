@@ -0,0 +1,150 @@
+import heapq
+import random
+
+import pytest
+
+from pyFsm import heuristics as sort
+from pyFsm.routeStores import (AStarRouteStore, CompactRouteStore, CostTable, EagerRouteStore, HierarchicalRouteStore,
+                               LazyRouteStore, WeightedRouteStore)
+
+def _randomGraph(stateCount:int, edgeCount:int, seed:int) -> dict:
+    """
+    Returns a random state graph with repeated pairs, self loops, instant transitions and unreachable states.
+    """
+
+    rnd = random.Random(seed)
+    names = ["s{}".format(i) for i in range(stateCount)]
+    stateGraph = sort.buildStateGraph([])
+    for _ in range(edgeCount):
+        transName = "t{}".format(rnd.randrange(4)) if rnd.random() > 0.3 else None
+        sort.addTransitionToGraph(stateGraph, rnd.choice(names), rnd.choice(names), transName)
+    return stateGraph
+
+def _bfsRoutes(stateGraph:dict, startState:str) -> dict:
+    """
+    The oracle of the shortest routes: a plain BFS visiting the transitions in creation order,
+    keeping the transition every state is first discovered through.
+    """
+
+    parents = {startState: None}
+    frontier = [startState]
+    for stateName in frontier:
+        for nextState, transName in stateGraph[stateName]:
+            if nextState not in parents:
+                parents[nextState] = (stateName, transName)
+                frontier.append(nextState)
+
+    routes = {}
+    for destState in parents:
+        route = []
+        stateName = destState
+        while parents[stateName] is not None:
+            previousState, transName = parents[stateName]
+            route.append((stateName, transName))
+            stateName = previousState
+        routes[destState] = route[::-1]
+    return routes
+
+def _dijkstraCosts(stateGraph:dict, startState:str, costOf) -> dict:
+    """
+    The oracle of the cheapest route costs: a plain Dijkstra search.
+    """
+
+    costs = {startState: 0.0}
+    heap = [(0.0, startState)]
+    while heap:
+        cost, stateName = heapq.heappop(heap)
+        if cost > costs[stateName]:
+            continue
+        for nextState, transName in stateGraph[stateName]:
+            nextCost = cost + costOf(stateName, nextState, transName)
+            if nextCost < costs.get(nextState, float("inf")):
+                costs[nextState] = nextCost
+                heapq.heappush(heap, (nextCost, nextState))
+    return costs
+
+def _checkWalk(stateGraph:dict, startState:str, route:list):
+    """
+    Checks that every hop of the route is a transition of the graph.
+    """
+
+    stateName = startState
+    for nextState, transName in route:
+        assert (nextState, transName) in stateGraph[stateName]
+        stateName = nextState
+    pass
+
+@pytest.mark.parametrize("storeFactory, exact", [
+    (EagerRouteStore, True),
+    (CompactRouteStore, True),
+    (LazyRouteStore, True),
+    (lambda: LazyRouteStore(maxSize = 8), True),
+    (lambda: LazyRouteStore(bidirectional = True), False),
+    (HierarchicalRouteStore, False),
+])
+@pytest.mark.parametrize("seed", range(3))
+def testShortestRoutesMatchABfs(storeFactory, exact, seed):
+    stateGraph = _randomGraph(30, 70, seed)
+    store = storeFactory()
+    store.rebuild(stateGraph)
+
+    for startState in stateGraph:
+        oracle = _bfsRoutes(stateGraph, startState)
+        for destState in stateGraph:
+            if destState not in oracle:
+                with pytest.raises(KeyError):
+                    list(store.getRoute(startState, destState))
+                continue
+
+            route = list(store.getRoute(startState, destState))
+            _checkWalk(stateGraph, startState, route)
+            assert len(route) == len(oracle[destState])
+            if exact:
+                assert route == oracle[destState]
+
+@pytest.mark.parametrize("storeType", [WeightedRouteStore, AStarRouteStore])
+def testCheapestRoutesMatchADijkstra(storeType):
+    stateGraph = _randomGraph(25, 60, 4)
+    costs = CostTable(defaultCost = 1.0, instantCost = 0.5)
+    for i in range(4):
+        costs.setTransitionCost("t{}".format(i), i + 0.25)
+    costs.setStateCost("s3", 2.0)
+
+    store = storeType(costs = costs)
+    store.rebuild(stateGraph)
+
+    for startState in stateGraph:
+        oracle = _dijkstraCosts(stateGraph, startState, costs.cost)
+        for destState in stateGraph:
+            if destState not in oracle:
+                with pytest.raises(KeyError):
+                    store.getRoute(startState, destState)
+                continue
+
+            route = list(store.getRoute(startState, destState))
+            _checkWalk(stateGraph, startState, route)
+            routeCost = 0.0
+            stateName = startState
+            for nextState, transName in route:
+                routeCost += costs.cost(stateName, nextState, transName)
+                stateName = nextState
+            assert routeCost == pytest.approx(oracle[destState])
+
+def testStoresFollowAddedTransitions():
+    stateGraph = _randomGraph(20, 30, 9)
+    stores = [EagerRouteStore(), CompactRouteStore(), LazyRouteStore()]
+    for store in stores:
+        store.rebuild(stateGraph)
+        list(store.getRoute("s0", "s0"))
+
+    rnd = random.Random(2)
+    for _ in range(20):
+        stateName, nextStateName = "s{}".format(rnd.randrange(20)), "s{}".format(rnd.randrange(20))
+        sort.addTransitionToGraph(stateGraph, stateName, nextStateName, None)
+        for store in stores:
+            store.addTransition(stateGraph, stateName, nextStateName, None)
+
+        oracle = _bfsRoutes(stateGraph, stateName)
+        for store in stores:
+            for destState, route in oracle.items():
+                assert list(store.getRoute(stateName, destState)) == route
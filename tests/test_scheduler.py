@@ -0,0 +1,76 @@
+import threading
+
+from pyFsm.concurrentFsm import ConcurrentFSM
+from pyFsm.fsmLib import FSM, FSMStates
+from pyFsm.scheduler import PRIORITY, Scheduler
+
+def _ring(fsm, states:list):
+    """
+    Creates a ring of instant transitions through the passed states.
+    """
+
+    fsm.createTransitions([(s, states[(i + 1) % len(states)]) for i, s in enumerate(states)])
+    return fsm
+
+def testSlicesInterleaveTheReadyFsms(makeStates):
+    order = []
+    states = makeStates("schedulerSlices", 3)
+    scheduler = Scheduler(sliceSteps = 2)
+    fsms = [_ring(FSM(states[0]), states) for _ in range(2)]
+
+    for index, fsm in enumerate(fsms):
+        fsm.onDestinationReached(lambda index = index: order.append(index))
+        scheduler.add(fsm)
+        for _ in range(3):
+            getattr(fsm, states[1].__name__)()
+            getattr(fsm, states[0].__name__)()
+
+    assert scheduler.readyCount() == 2
+    assert scheduler.run() == 6
+    assert order == [0, 0, 1, 1] * 3
+    assert scheduler.stats()["steps"] == 12
+    for fsm in fsms:
+        fsm.close()
+
+def testPriorityPolicyRunsTheLowestValueFirst(makeStates):
+    order = []
+    states = makeStates("schedulerPriority", 2)
+    scheduler = Scheduler(policy = PRIORITY)
+
+    for priority in (2, 0, 1):
+        fsm = _ring(FSM(states[0]), states)
+        fsm.onDestinationReached(lambda priority = priority: order.append(priority))
+        getattr(fsm, states[1].__name__)()
+        scheduler.add(fsm, priority)
+
+    scheduler.run()
+    assert order == [0, 1, 2]
+
+def testWaitingFsmIsParkedUntilItsCallbackFromAnotherThread(makeStates):
+    ran = []
+    states = makeStates("schedulerHandoff", 2, body = lambda stateName: ran.append(threading.get_ident()))
+    waitingStates = makeStates("schedulerHandoffWait", 1, waitsForCallback = True,
+                               body = lambda stateName: ran.append(threading.get_ident()))
+    fsm = _ring(ConcurrentFSM(states[0]), states + waitingStates)
+    scheduler = Scheduler()
+    scheduler.add(fsm)
+
+    getattr(fsm, waitingStates[0].__name__)()
+    getattr(fsm, states[0].__name__)()
+    scheduler.run()
+    assert fsm.getInternalFsmState() is FSMStates.WAITING_FOR_CB
+    assert scheduler.readyCount() == 0
+
+    #The callback only posts to the mailbox and wakes the scheduler, the states run on the scheduling thread
+    callback = threading.Thread(target = fsm.nextState)
+    callback.start()
+    callback.join()
+    assert fsm.getCurrentFsmState() == waitingStates[0].__name__
+    assert scheduler.readyCount() == 1
+
+    scheduler.run()
+    assert fsm.getCurrentFsmState() == states[0].__name__
+    assert set(ran) == {threading.get_ident()}
+    assert fsm.handoffs == 1
+    scheduler.remove(fsm)
+    fsm.close()
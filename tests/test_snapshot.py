@@ -0,0 +1,96 @@
+import pickle
+
+import pytest
+
+from pyFsm.fsmLib import FSM, FSMStates
+from pyFsm.routeStores import CompactRouteStore, EagerRouteStore, LazyRouteStore, WeightedRouteStore
+
+def _buildFsm(states:list, transitions:list, routeStore) -> FSM:
+    """
+    Returns a FSM walking a ring through the passed states, with a shortcut from the first state to the middle one.
+    """
+
+    fsm = FSM(states[0], routeStore)
+    fsm.createTransitions([(s, states[(i + 1) % len(states)], transitions[i % len(transitions)]) for i, s in enumerate(states)])
+    fsm.createTransition(states[0], states[len(states) // 2])
+    return fsm
+
+@pytest.mark.parametrize("storeType", [EagerRouteStore, CompactRouteStore, LazyRouteStore, WeightedRouteStore])
+def testRestoredFsmContinuesLikeTheOriginal(storeType, makeStates, makeTransitions):
+    visited = []
+
+    def body(stateName):
+        visited.append(stateName)
+
+    states = makeStates("snapshotRound", 6, body = body)
+    waitingStates = makeStates("snapshotRoundWait", 1, waitsForCallback = True, body = body)
+    transitions = makeTransitions("snapshotRoundTrans", 2)
+    fsm = _buildFsm(states + waitingStates, transitions, storeType())
+
+    #Suspends the FSM on its waiting state, in the middle of the route to the third state
+    getattr(fsm, states[0].__name__)()
+    getattr(fsm, states[5].__name__)()
+    getattr(fsm, states[2].__name__)()
+    getattr(fsm, waitingStates[0].__name__)()
+    getattr(fsm, states[1].__name__)()
+    getattr(fsm, states[3].__name__)()
+    fsm.run()
+    assert fsm.getInternalFsmState() is FSMStates.WAITING_FOR_CB
+
+    restored = FSM.restore(pickle.loads(pickle.dumps(fsm.snapshot())))
+    assert restored.getCurrentFsmState() == fsm.getCurrentFsmState()
+    assert restored.getInternalFsmState() is FSMStates.WAITING_FOR_CB
+    assert restored._destQueue.items() == fsm._destQueue.items()
+    assert restored._stateGraph == fsm._stateGraph
+
+    #The route to the third state passes through the waiting state, which is also the next destination
+    for _ in range(2):
+        del visited[:]
+        fsm.nextState()
+        originalVisits = list(visited)
+
+        del visited[:]
+        restored.nextState()
+        assert visited == originalVisits
+        assert restored.getInternalFsmState() is fsm.getInternalFsmState()
+
+    assert restored.getCurrentFsmState() == fsm.getCurrentFsmState() == states[3].__name__
+    fsm.close()
+    restored.close()
+
+def testRestoreAllSharesTheDefinitions(makeStates, makeTransitions):
+    states = makeStates("snapshotAll", 5)
+    transitions = makeTransitions("snapshotAllTrans", 2)
+    fsms = [_buildFsm(states, transitions, EagerRouteStore()) for _ in range(3)]
+    for i, fsm in enumerate(fsms):
+        getattr(fsm, states[i + 1].__name__)()
+        fsm.run()
+
+    snapshot = pickle.loads(pickle.dumps(FSM.snapshotAll()))
+    restoredFsms = [restored for restored in FSM.restoreAll(snapshot) if restored.initialState == states[0].__name__]
+    assert len(restoredFsms) >= 3
+
+    restoredFsms = restoredFsms[-3:]
+    assert [restored.getCurrentFsmState() for restored in restoredFsms] == [s.__name__ for s in states[1:4]]
+    assert restoredFsms[0]._stateGraph is restoredFsms[1]._stateGraph is restoredFsms[2]._stateGraph
+
+    getattr(restoredFsms[0], states[0].__name__)()
+    restoredFsms[0].run()
+    assert restoredFsms[0].getCurrentFsmState() == states[0].__name__
+
+    for fsm in fsms + restoredFsms:
+        fsm.close()
+
+def testUnregisteredNamesAreRejected(makeStates, makeTransitions):
+    states = makeStates("snapshotUnknown", 3)
+    fsm = _buildFsm(states, makeTransitions("snapshotUnknownTrans", 1), EagerRouteStore())
+    snapshot = fsm.snapshot()
+    snapshot["definition"]["states"] = list(snapshot["definition"]["states"]) + ["snapshotMissingState"]
+
+    with pytest.raises(KeyError):
+        FSM.restore(snapshot)
+
+    snapshot["version"] = -1
+    with pytest.raises(ValueError):
+        FSM.restore(snapshot)
+    fsm.close()
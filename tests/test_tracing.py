@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from pyFsm import tracing
+from pyFsm.fsmLib import FSM
+from pyFsm.tracing import TraceLog, TraceRecorder
+
+def _ringFsm(states:list, transitions:list) -> FSM:
+    """
+    Returns a FSM walking a ring through the passed states.
+    """
+
+    fsm = FSM(states[0])
+    fsm.createTransitions([(s, states[(i + 1) % len(states)], transitions[i % len(transitions)]) for i, s in enumerate(states)])
+    return fsm
+
+def _record(fsm, recorder, destinations:list):
+    """
+    Records the FSM walking to every passed destination state.
+    """
+
+    fsm.recordTrace(recorder)
+    for destination in destinations:
+        getattr(fsm, destination.__name__)()
+    fsm.run()
+    pass
+
+def testClosedLogReadsBackAndReplays(makeStates, makeTransitions, tmp_path):
+    states = makeStates("traceClosed", 4)
+    transitions = makeTransitions("traceClosedTrans", 2)
+    path = str(tmp_path / "closed.trace")
+
+    with TraceRecorder(path) as recorder:
+        _record(_ringFsm(states, transitions), recorder, [states[2], states[0]])
+
+    with TraceLog.open(path) as log:
+        hops = [(fromState, transition, toState) for timestamp, fromState, transition, toState, digest in log]
+        assert hops == [(states[i].__name__, transitions[i % 2].__name__, states[(i + 1) % 4].__name__) for i in range(4)]
+
+        fresh = _ringFsm(states, transitions)
+        assert log.replay(fresh) == 4
+        assert fresh.getCurrentFsmState() == states[0].__name__
+
+def testUnclosedLogIsReadUpToItsLastFlush(makeStates, makeTransitions, tmp_path):
+    states = makeStates("traceCrash", 3)
+    path = str(tmp_path / "crash.trace")
+
+    recorder = TraceRecorder(path)
+    fsm = _ringFsm(states, makeTransitions("traceCrashTrans", 1))
+    _record(fsm, recorder, [states[2]])
+    recorder.flush()
+    getattr(fsm, states[0].__name__)()
+    fsm.run()
+
+    #The recorder is never closed, as if its process crashed
+    with open(path, "rb") as logFile:
+        data = logFile.read()
+    log = TraceLog(data)
+    assert len(log) == 2
+    assert [record[3] for record in log] == [states[1].__name__, states[2].__name__]
+
+def testTruncatedFlushFallsBackToTheLastIntactFooter(makeStates, makeTransitions, tmp_path):
+    states = makeStates("traceTorn", 3)
+    path = str(tmp_path / "torn.trace")
+
+    recorder = TraceRecorder(path)
+    fsm = _ringFsm(states, makeTransitions("traceTornTrans", 1))
+    _record(fsm, recorder, [states[1]])
+    recorder.flush()
+    flushed = os.path.getsize(path)
+
+    #A second flush cut short in its footer
+    getattr(fsm, states[2].__name__)()
+    fsm.run()
+    recorder.flush()
+    with open(path, "rb") as logFile:
+        data = logFile.read()
+
+    assert len(TraceLog(data)) == 2
+    for end in range(flushed, len(data), 997):
+        assert len(TraceLog(data[:end])) == 1
+    with pytest.raises(ValueError):
+        TraceLog(data[:tracing._HEADER.size + 4])
+
+def testArgumentsDigestIsStable():
+    class Payload:
+        pass
+
+    assert tracing._digestArguments((Payload(),), {}) == tracing._digestArguments((Payload(),), {})
+    assert tracing._digestArguments((1, "a"), {"b": {2, 3}}) == tracing._digestArguments((1, "a"), {"b": {3, 2}})
+    assert tracing._digestArguments((1,), {}) != tracing._digestArguments((2,), {})
+
+    recorder = TraceRecorder()
+    recorder._nameId("traceDigestState")
+    recorder._tracedState(0, lambda payload: None)(Payload())
+
+    (timestamp, fromState, transition, toState, digest), = TraceLog(recorder.getBytes())
+    assert (toState, digest) == ("traceDigestState", tracing._digestArguments((Payload(),), {}))